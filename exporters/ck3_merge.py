@@ -0,0 +1,209 @@
+"""
+Merge generated characters into existing CK3 history files.
+
+CK3HistoryIndex scans a Paradox-script file once and maps every top-level
+"<id> = { ... }" block to its byte range. The scan only looks at braces, quoted
+strings and comments. merge_into_ck3_history renders the dynasty with the
+streaming CK3 writer and looks its IDs up in the index. It then replaces colliding
+blocks in place, appends the new ones and, with prune=True, drops this dynasty's
+blocks that the new output no longer has. The file is rewritten from the first
+changed block onward, so when no existing block changes it is only appended to.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import io
+import os
+import re
+
+from exporters.export_index import ExportIndex
+from exporters.export_to_ck3 import write_ck3_history
+from models.person import Person
+from services.instrumentation import count, timed
+
+# Braces, quoted strings and comments: everything that can change the nesting depth
+_TOKEN = re.compile(rb'[{}]|"(?:[^"\\\n]|\\.)*"|#[^\n]*')
+# "<key> =" directly before a top-level opening brace
+_KEY = re.compile(rb'([^\s={}#"]+)\s*=\s*\Z')
+_CONTENT = re.compile(rb"\S")
+
+COLLISION_MODES = ("replace", "skip", "error")
+
+
+class CK3HistoryIndex:
+    """
+    Byte ranges of the top-level blocks of a CK3 script file.
+
+    blocks maps each ID to (start, end): data[start:end] is "<id> = { ... }" from the
+    first byte of the ID to the closing brace. IDs defined more than once keep their
+    first range and are listed in duplicates.
+    """
+
+    def __init__(self, data: bytes):
+        self.size = len(data)
+        self.blocks: Dict[str, Tuple[int, int]] = {}
+        self.duplicates: List[str] = []
+
+        depth = 0
+        segment_start = 0  # first byte after the previous top-level block
+        key: Optional[str] = None
+        key_start = 0
+        for token in _TOKEN.finditer(data):
+            char = data[token.start()]
+            if char == 0x7B:  # {
+                if depth == 0:
+                    match = _KEY.search(data, segment_start, token.start())
+                    key = match.group(1).decode("utf-8") if match else None
+                    key_start = match.start(1) if match else token.start()
+                depth += 1
+            elif char == 0x7D:  # }
+                depth -= 1
+                if depth < 0:
+                    line = data.count(b"\n", 0, token.start()) + 1
+                    raise ValueError(f"Unmatched '}}' on line {line}")
+                if depth == 0:
+                    if key is not None:
+                        if key in self.blocks:
+                            self.duplicates.append(key)
+                        else:
+                            self.blocks[key] = (key_start, token.end())
+                    segment_start = token.end()
+        if depth:
+            raise ValueError(f"Unclosed '{{' at end of file ({depth} open)")
+
+    @classmethod
+    def from_file(cls, path: str) -> "CK3HistoryIndex":
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def __contains__(self, character_id: str) -> bool:
+        return character_id in self.blocks
+
+    def range(self, character_id: str) -> Tuple[int, int]:
+        return self.blocks[character_id]
+
+
+@dataclass
+class MergeResult:
+    """What merge_into_ck3_history changed, by character ID."""
+    added: List[str] = field(default_factory=list)
+    replaced: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    bytes_written: int = 0
+
+
+def _splice(data: bytes, edits: Sequence[Tuple[int, int, bytes]], start: int) -> bytes:
+    """data[start:] with each (begin, end, replacement) edit applied (edits sorted, begin >= start)."""
+    parts = []
+    position = start
+    for begin, end, replacement in edits:
+        parts.append(data[position:begin])
+        parts.append(replacement)
+        position = end
+    parts.append(data[position:])
+    return b"".join(parts)
+
+
+@timed("merge_into_ck3_history")
+def merge_into_ck3_history(
+    dynasty: Iterable[Sequence[Person]],
+    filepath: str,
+    dynasty_name: str,
+    culture: str,
+    religion: str,
+    include_death_for_living: bool = False,
+    end_date: int = None,
+    on_collision: str = "replace",
+    prune: bool = False,
+    index: Optional[ExportIndex] = None,
+) -> MergeResult:
+    """
+    Insert or replace a dynasty's character blocks in an existing CK3 history file.
+
+    Args:
+        dynasty: List of generations, each containing Person objects
+        filepath: CK3 history file to merge into (created if missing)
+        dynasty_name, culture, religion, include_death_for_living, end_date: as for export_to_ck3
+        on_collision: For IDs already in the file: 'replace' the block, 'skip' the new
+            one, or raise ValueError ('error')
+        prune: Also remove this dynasty's existing blocks ("<name>_character_<n>",
+            "<name>_wife_<n>") that the new output does not contain
+        index: Prebuilt ExportIndex of the dynasty to reuse (optional)
+
+    Returns:
+        MergeResult listing the added, replaced, skipped and removed IDs
+    """
+    if on_collision not in COLLISION_MODES:
+        raise ValueError(f"on_collision must be one of {', '.join(COLLISION_MODES)}")
+
+    buffer = io.StringIO()
+    write_ck3_history(dynasty, buffer, dynasty_name, culture, religion, include_death_for_living, end_date, index=index)
+    generated = buffer.getvalue().encode("utf-8")
+    generated_index = CK3HistoryIndex(generated)
+
+    data = b""
+    if os.path.exists(filepath):
+        with open(filepath, "rb") as f:
+            data = f.read()
+    existing = CK3HistoryIndex(data)
+
+    collisions = [character_id for character_id in generated_index.blocks if character_id in existing]
+    if collisions and on_collision == "error":
+        shown = ", ".join(collisions[:5]) + (", ..." if len(collisions) > 5 else "")
+        raise ValueError(f"{len(collisions)} character ID(s) already in {filepath}: {shown}")
+
+    result = MergeResult()
+    edits: List[Tuple[int, int, bytes]] = []
+    appended: List[bytes] = []
+    for character_id, (start, end) in generated_index.blocks.items():
+        block = generated[start:end]
+        if character_id not in existing:
+            appended.append(block)
+            result.added.append(character_id)
+        elif on_collision == "skip":
+            result.skipped.append(character_id)
+        else:
+            begin, finish = existing.range(character_id)
+            if data[begin:finish] != block:
+                edits.append((begin, finish, block))
+            result.replaced.append(character_id)
+
+    if prune:
+        pattern = re.compile(rf"{re.escape(dynasty_name.lower())}_(character|wife)_\d+\Z")
+        for character_id, (begin, finish) in existing.blocks.items():
+            if character_id not in generated_index and pattern.match(character_id):
+                # Take the whitespace before the block with it (after it, for the first block)
+                while begin > 0 and data[begin - 1] in b" \t\r\n":
+                    begin -= 1
+                if begin == 0:
+                    while finish < len(data) and data[finish] in b" \t\r\n":
+                        finish += 1
+                edits.append((begin, finish, b""))
+                result.removed.append(character_id)
+    edits.sort()
+
+    first = edits[0][0] if edits else len(data)
+    rewritten = _splice(data, edits, first)
+    if appended:
+        # New blocks go at the end, a blank line after the last existing block
+        if rewritten.strip() or _CONTENT.search(data, 0, first):
+            last = rewritten[-1:] or data[first - 1:first]
+            rewritten += b"\n" if last == b"\n" else b"\n\n"
+        rewritten += b"\n\n".join(appended) + b"\n"
+
+    if rewritten or first < len(data):
+        # Only the bytes from the first change onward are written
+        with open(filepath, "r+b" if data else "wb") as f:
+            f.seek(first)
+            f.write(rewritten)
+            f.truncate()
+    result.bytes_written = len(rewritten)
+    count("export.ck3_merge_bytes_written", result.bytes_written)
+    return result
+
+
+__all__ = ["CK3HistoryIndex", "COLLISION_MODES", "MergeResult", "merge_into_ck3_history"]
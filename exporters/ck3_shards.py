@@ -0,0 +1,193 @@
+"""
+Sharded CK3 history export.
+
+export_ck3_shards splits one dynasty's CK3 history across several files, one per
+generation or one per branch (a child of the founders and all of their
+descendants). Every wife goes in her husband's shard. IDs are numbered across the
+whole dynasty, as in a single export_to_ck3 file, so the father, mother and
+add_spouse references between shards resolve when CK3 loads them together. The
+shards are written in parallel from one shared ExportIndex. A JSON manifest lists
+every shard with its character counts and size.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence
+import json
+import os
+
+from exporters.export_index import ExportIndex
+from exporters.export_to_ck3 import CK3HistoryWriter
+from exporters.output import EXTENSIONS, open_text_output
+from models.person import Person
+from services.instrumentation import count, timed
+
+SHARD_MODES = ("generation", "branch")
+
+
+@dataclass
+class Shard:
+    """
+    One shard file. key is the generation number ('generation' mode) or the branch
+    number, 0 being the founders and their wives ('branch' mode); root is the
+    character ID the branch descends from.
+    """
+    file: str
+    key: int
+    members: int
+    wives: int
+    bytes: int = 0
+    root: Optional[str] = None
+
+
+@dataclass
+class ShardManifest:
+    """What export_ck3_shards wrote; saved as JSON at path."""
+    path: str
+    dynasty_name: str
+    by: str
+    compression: Optional[str]
+    shards: List[Shard] = field(default_factory=list)
+
+    @property
+    def characters(self) -> int:
+        return sum(shard.members + shard.wives for shard in self.shards)
+
+
+def _shard_keys(dynasty: Sequence[Sequence[Person]], index: ExportIndex, by: str) -> List[int]:
+    """Shard key of each person, by position in index.people; wives take their husband's."""
+    keys = [-1] * len(index)
+    branch = 0
+    for g, generation in enumerate(dynasty):
+        for person in generation:
+            i = index.position(person)
+            if by == "generation":
+                keys[i] = g
+            elif g == 0:
+                keys[i] = 0
+            elif g == 1:
+                branch += 1
+                keys[i] = branch
+            else:
+                # Descendants follow their father's branch, or their mother's for a daughter's line
+                parent = next(
+                    (p for p in (person.father, person.mother) if p is not None and id(p) in index.index),
+                    None,
+                )
+                keys[i] = keys[index.position(parent)] if parent is not None else 0
+            spouse = person.spouse
+            if spouse is not None and keys[index.position(spouse)] < 0:
+                keys[index.position(spouse)] = keys[i]
+    return keys
+
+
+def _previous_shards(manifest_path: str) -> List[str]:
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return [shard["file"] for shard in json.load(f).get("shards", [])]
+    except (OSError, ValueError, AttributeError, KeyError, TypeError):
+        return []
+
+
+@timed("export_ck3_shards")
+def export_ck3_shards(
+    dynasty: Sequence[Sequence[Person]],
+    directory: str,
+    dynasty_name: str,
+    culture: str,
+    religion: str,
+    by: str = "generation",
+    include_death_for_living: bool = False,
+    end_date: int = None,
+    compression: Optional[str] = None,
+    index: Optional[ExportIndex] = None,
+    max_workers: Optional[int] = None,
+) -> ShardManifest:
+    """
+    Write a dynasty's CK3 history as several files plus a manifest.
+
+    Args:
+        dynasty: List of generations, each containing Person objects
+        directory: Where to write the shards (created if missing)
+        dynasty_name, culture, religion, include_death_for_living, end_date: as for export_to_ck3
+        by: 'generation' (one file per generation) or 'branch' (the founders, then one
+            file per founders' child with all their descendants)
+        compression: 'gzip', 'bz2', 'lzma' or None for plain .txt files
+        index: Prebuilt ExportIndex of the dynasty to reuse (optional)
+        max_workers: Writer threads (default: one per shard, at most the CPU count)
+
+    Returns:
+        ShardManifest of the files written. Shard files listed in an earlier manifest
+        in the same directory that this export did not rewrite are deleted, since CK3
+        would load them alongside the new ones.
+    """
+    if by not in SHARD_MODES:
+        raise ValueError(f"Shard mode must be one of {', '.join(SHARD_MODES)}")
+    if compression is not None and compression not in EXTENSIONS:
+        raise ValueError(f"Unknown compression {compression!r} (expected one of {', '.join(EXTENSIONS)})")
+    if index is None:
+        index = ExportIndex(dynasty)
+
+    keys = _shard_keys(dynasty, index, by)
+    groups: Dict[int, List[int]] = {}
+    for i in index.members + index.wives:
+        groups.setdefault(keys[i], []).append(i)
+
+    prefix = dynasty_name.lower()
+    label = "gen" if by == "generation" else "branch"
+    extension = ".txt" + (EXTENSIONS[compression] if compression else "")
+    shards = []
+    for key in sorted(groups):
+        positions = groups[key]
+        members = sum(1 for i in positions if index.is_member[i])
+        root = None
+        if by == "branch" and key > 0:
+            root = f"{prefix}_character_{index.ordinal[positions[0]]}"
+        shards.append(Shard(
+            file=f"{prefix}_{label}_{key:03d}{extension}", key=key,
+            members=members, wives=len(positions) - members, root=root,
+        ))
+
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, f"{prefix}_manifest.json")
+    stale = set(_previous_shards(manifest_path)) - {shard.file for shard in shards}
+
+    def write(shard: Shard) -> None:
+        path = os.path.join(directory, shard.file)
+        with open_text_output(path, compression) as f:
+            with CK3HistoryWriter(
+                f, dynasty_name, culture, religion,
+                include_death_for_living=include_death_for_living, end_date=end_date,
+            ) as writer:
+                writer.write_people(index, groups[shard.key])
+        shard.bytes = os.path.getsize(path)
+
+    if shards:
+        workers = max_workers or min(len(shards), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # list() re-raises the first writer error
+            list(pool.map(write, shards))
+
+    for name in stale:
+        path = os.path.join(directory, os.path.basename(name))
+        if os.path.exists(path):
+            os.remove(path)
+
+    manifest = ShardManifest(
+        path=manifest_path, dynasty_name=dynasty_name, by=by, compression=compression, shards=shards,
+    )
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "dynasty_name": dynasty_name,
+            "by": by,
+            "compression": compression,
+            "characters": manifest.characters,
+            "shards": [asdict(shard) for shard in shards],
+        }, f, indent=2)
+        f.write("\n")
+    count("export.ck3_shards", len(shards))
+    count("export.ck3_bytes_written", sum(shard.bytes for shard in shards))
+    return manifest
+
+
+__all__ = ["SHARD_MODES", "Shard", "ShardManifest", "export_ck3_shards"]
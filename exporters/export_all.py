@@ -0,0 +1,83 @@
+"""
+Export one dynasty to several formats at once.
+
+export_all builds the ExportIndex (people, spouses and families) once and hands it
+to every format writer, then runs the writers on a thread pool so that one
+writer's file output overlaps with another's formatting.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Sequence
+
+from exporters.export_index import ExportIndex
+from exporters.export_to_ck3 import export_to_ck3
+from exporters.export_to_gedcom import export_to_gedcom
+from models.person import Person
+from services.instrumentation import timed
+
+FORMATS = ("gedcom", "ck3")
+
+
+@timed("export_all")
+def export_all(
+    dynasty: Sequence[Sequence[Person]],
+    formats: Dict[str, str],
+    dynasty_name: str,
+    culture: str,
+    religion: Optional[str] = None,
+    end_date: int = None,
+    end_year: int = None,
+    include_death_for_living: bool = False,
+    index: Optional[ExportIndex] = None,
+    max_workers: Optional[int] = None,
+    compression: Optional[str] = "infer",
+) -> Dict[str, str]:
+    """
+    Write the dynasty in every requested format, sharing one ExportIndex.
+
+    Args:
+        dynasty: List of generations, each containing Person objects
+        formats: Output path per format name ('gedcom', 'ck3')
+        dynasty_name: Dynasty/House name
+        culture: Culture name (e.g., 'chinese')
+        religion: Religion code (required for 'ck3')
+        end_date: Simulation end date in absolute days (CK3 living flags and deaths)
+        end_year: GEDCOM deaths after this year are left out
+        include_death_for_living: CK3 only; add a death the day after end_date for the living
+        index: Prebuilt ExportIndex of the dynasty to reuse (optional)
+        max_workers: Writer threads (default: one per format)
+        compression: 'gzip', 'bz2', 'lzma' or None for every file; by default taken
+            from each path's extension (e.g. 'tree.ged.gz')
+
+    Returns:
+        Dictionary mapping format name -> path written
+    """
+    unknown = sorted(set(formats) - set(FORMATS))
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)} (expected {', '.join(FORMATS)})")
+    if "ck3" in formats and not religion:
+        raise ValueError("CK3 export needs a religion")
+    if not formats:
+        return {}
+    if index is None:
+        index = ExportIndex(dynasty)
+
+    writers: Dict[str, Callable[[], object]] = {
+        "gedcom": lambda: export_to_gedcom(
+            dynasty, formats["gedcom"], end_year=end_year, culture=culture, dynasty_name=dynasty_name, index=index,
+            compression=compression,
+        ),
+        "ck3": lambda: export_to_ck3(
+            dynasty, formats["ck3"], dynasty_name, culture, religion, include_death_for_living, end_date, index=index,
+            compression=compression,
+        ),
+    }
+    with ThreadPoolExecutor(max_workers=max_workers or len(formats)) as pool:
+        futures = {name: pool.submit(writers[name]) for name in formats}
+        # result() re-raises the first writer error
+        for future in futures.values():
+            future.result()
+    return dict(formats)
+
+
+__all__ = ["FORMATS", "export_all"]
@@ -0,0 +1,120 @@
+"""
+Export index shared by the file exporters.
+
+ExportIndex flattens a dynasty once into a people list (members and their wives)
+and records, by list position, every family (a father, his wife and their
+children) and each person's spouse and child family links. Exporters can then
+write their records in one linear pass instead of searching the people list.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set
+
+from models.person import Person
+
+
+def collect_people(dynasty: Sequence[Sequence[Person]]) -> List[Person]:
+    """
+    Flatten dynasty structure into a single list of all people.
+
+    Args:
+        dynasty: List of generations, each containing a list of persons
+
+    Returns:
+        Flattened list of all persons in the dynasty
+    """
+    people = []
+    seen: Set[int] = set()
+
+    for generation in dynasty:
+        for person in generation:
+            person_id = id(person)
+            if person_id not in seen:
+                seen.add(person_id)
+                people.append(person)
+
+            # Also add spouses (they may not be in the dynasty structure)
+            if person.spouse:
+                spouse_id = id(person.spouse)
+                if spouse_id not in seen:
+                    seen.add(spouse_id)
+                    people.append(person.spouse)
+
+    return people
+
+
+@dataclass
+class Family:
+    """A father or husband, his wife (if any) and their children, as people indexes."""
+    father: int
+    wife: Optional[int]
+    children: List[int] = field(default_factory=list)
+
+
+class ExportIndex:
+    """
+    People, families and family links of one dynasty, built in one pass.
+
+    people[i] is person i (0-based, in collect_people order). families are numbered
+    in the order their fathers appear. spouse_families[i] and child_families[i] list
+    the family numbers in which person i is a parent or a child.
+
+    members lists the dynasty members in generation order and wives everyone else
+    (their spouses) in the order they are first met. ordinal[i] is person i's 1-based
+    number within that list, as in the CK3 "_character_<n>" and "_wife_<n>" IDs.
+    """
+
+    def __init__(self, dynasty: Sequence[Sequence[Person]]):
+        # Same order as collect_people, noting the members on the way
+        self.people: List[Person] = []
+        self.index: Dict[int, int] = {}
+        self.members: List[int] = []
+        for generation in dynasty:
+            for person in generation:
+                i = self.index.get(id(person))
+                if i is None:
+                    i = self.index[id(person)] = len(self.people)
+                    self.people.append(person)
+                self.members.append(i)
+                spouse = person.spouse
+                if spouse and id(spouse) not in self.index:
+                    self.index[id(spouse)] = len(self.people)
+                    self.people.append(spouse)
+        n = len(self.people)
+        self.is_member: List[bool] = [False] * n
+        for i in self.members:
+            self.is_member[i] = True
+        self.wives: List[int] = [i for i in range(n) if not self.is_member[i]]
+        self.ordinal: List[int] = [0] * n
+        for group in (self.members, self.wives):
+            for number, i in enumerate(group, start=1):
+                self.ordinal[i] = number
+        self.families: List[Family] = []
+        self.spouse_families: List[List[int]] = [[] for _ in range(n)]
+        self.child_families: List[List[int]] = [[] for _ in range(n)]
+
+        for i, person in enumerate(self.people):
+            # A family is a father with children, or a husband without any
+            if not person.children and (person.spouse is None or person.female):
+                continue
+            f = len(self.families)
+            wife = self.index[id(person.spouse)] if person.spouse else None
+            family = Family(father=i, wife=wife, children=[self.index[id(c)] for c in person.children])
+            self.families.append(family)
+            self.spouse_families[i].append(f)
+            for c in family.children:
+                self.child_families[c].append(f)
+        # Links as a wife come after any links as a father
+        for f, family in enumerate(self.families):
+            if family.wife is not None:
+                self.spouse_families[family.wife].append(f)
+
+    def __len__(self) -> int:
+        return len(self.people)
+
+    def position(self, person: Person) -> int:
+        """Index of person in people."""
+        return self.index[id(person)]
+
+
+__all__ = ["ExportIndex", "Family", "collect_people"]
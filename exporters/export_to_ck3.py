@@ -6,10 +6,17 @@ Characters are represented with full genealogy, life events (birth, marriage, de
 and proper CK3 field formatting.
 """
 
-from typing import List, Dict, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+import os
+import shutil
+import tempfile
+
+from exporters.export_index import ExportIndex
+from exporters.output import open_text_output
 from models.person import Person
+from services.instrumentation import count, is_enabled, timed
 from services.utils import convert_calendar_days_to_years
-from config.other_constants import DAYS_IN_MONTH, DAYS_IN_YEAR
+from services.calendar_table import ck3_date, day_to_date
 
 
 def convert_absolute_day_to_date(absolute_day: int) -> Tuple[int, int, int]:
@@ -22,30 +29,7 @@ def convert_absolute_day_to_date(absolute_day: int) -> Tuple[int, int, int]:
     Returns:
         Tuple of (year, month, day)
     """
-    # Convert to 0-indexed
-    day_zero_indexed = absolute_day - 1
-    
-    # Calculate year
-    year = day_zero_indexed // DAYS_IN_YEAR + 1
-    
-    # Days remaining in the year
-    days_in_year_remaining = day_zero_indexed % DAYS_IN_YEAR
-    
-    # Calculate month and day
-    month = 1
-    days_counted = 0
-    for m in range(12):
-        if days_counted + DAYS_IN_MONTH[m] > days_in_year_remaining:
-            month = m + 1
-            day = days_in_year_remaining - days_counted + 1
-            break
-        days_counted += DAYS_IN_MONTH[m]
-    else:
-        # Edge case: last day of year
-        month = 12
-        day = DAYS_IN_MONTH[11]
-    
-    return year, month, day
+    return day_to_date(absolute_day)
 
 
 def format_ck3_date(year: int, month: int, day: int) -> str:
@@ -85,14 +69,232 @@ def build_character_map(dynasty: List[List[Person]]) -> Dict[int, Tuple[Person,
     return character_map
 
 
+class _IndexIds:
+    """CK3 character IDs read from an ExportIndex (a stand-in for the writer's id() map)."""
+
+    def __init__(self, index: ExportIndex, member_prefix: str, wife_prefix: str):
+        self.index = index
+        self.member_prefix = member_prefix
+        self.wife_prefix = wife_prefix
+
+    def label(self, i: int) -> str:
+        prefix = self.member_prefix if self.index.is_member[i] else self.wife_prefix
+        return f"{prefix}{self.index.ordinal[i]}"
+
+    def get(self, key: int) -> Optional[str]:
+        i = self.index.index.get(key)
+        return self.label(i) if i is not None else None
+
+
+class CK3HistoryWriter:
+    """
+    Streams CK3 character blocks to a text stream, one generation at a time.
+
+    Members are written as their generation arrives and numbered in generation order.
+    Wives are numbered as their husbands are written; their blocks go to a temporary
+    spool file and are appended after the members by close(), so the output matches
+    the members-then-wives layout of export_to_ck3.
+
+    Only the IDs that later references can need are kept. With release_ids=True that
+    is the last generation's members and wives: fathers and mothers are always one
+    generation up, as in generate_dynasty and iter_dynasty. Otherwise every ID is kept,
+    for dynasties whose parents may be further up.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO,
+        dynasty_name: str,
+        culture: str,
+        religion: str,
+        include_death_for_living: bool = False,
+        end_date: int = None,
+        release_ids: bool = False,
+    ):
+        from config.culture_config import get_ck3_culture_code
+
+        self.stream = stream
+        self.release_ids = release_ids
+        prefix = dynasty_name.lower()
+        self._member_prefix = f"{prefix}_character_"
+        self._wife_prefix = f"{prefix}_wife_"
+        # Lines shared by every block
+        self._dynasty_line = f"\tdynasty = {prefix}_dynasty"
+        self._faith_lines = f"\treligion = {religion}\n\tculture = {get_ck3_culture_code(culture)}"
+        self._end_year = convert_calendar_days_to_years(end_date) if end_date else None
+        self._living_death = None
+        if include_death_for_living and end_date:
+            self._living_death = ck3_date(end_date + 1)
+
+        self._ids: Dict[int, str] = {}
+        # People whose IDs are in _ids, held so their id() stays unique (table views are weak)
+        self._held: List[Person] = []
+        self._members = 0
+        self._wives = 0
+        self._blocks = 0
+        self._wife_blocks = 0
+        self._spool = tempfile.SpooledTemporaryFile(max_size=1 << 20, mode="w+", encoding="utf-8")
+        self.chars_written = 0
+
+    def _block(self, person: Person, character_id: str, ids) -> str:
+        lines = [f"{character_id} = {{", f"\tname = \"{person.given_name}\""]
+        if person.female:
+            lines.append("\tfemale = yes")
+        if person.dynasty_name:
+            lines.append(self._dynasty_line)
+        lines.append(self._faith_lines)
+        father_id = ids.get(id(person.father)) if person.father is not None else None
+        if father_id is not None:
+            lines.append(f"\tfather = {father_id}")
+        mother_id = ids.get(id(person.mother)) if person.mother is not None else None
+        if mother_id is not None:
+            lines.append(f"\tmother = {mother_id}")
+
+        if person.date_of_birth:
+            birth_date = ck3_date(person.date_of_birth)
+        else:
+            birth_date = format_ck3_date(person.birth_year, 1, 1)
+        lines.append(f"\t{birth_date} = {{\n\t\tbirth = yes")
+        # Playable flag for males under 30 at the end date
+        if not person.female and self._end_year is not None and self._end_year - person.birth_year < 30:
+            lines.append("\t\teffect = { add_character_flag = do_not_generate_starting_family }")
+        lines.append("\t}")
+
+        spouse_id = ids.get(id(person.spouse)) if person.spouse is not None and person.date_of_marriage else None
+        if spouse_id is not None:
+            marriage_date = ck3_date(person.date_of_marriage)
+            lines.append(f"\t{marriage_date} = {{\n\t\tadd_spouse = {spouse_id}\n\t}}")
+
+        if person.date_of_death and not person.is_living_at_end:
+            death_date = ck3_date(person.date_of_death)
+            lines.append(f"\t{death_date} = {{\n\t\tdeath = yes\n\t}}")
+        elif self._living_death is not None and person.is_living_at_end:
+            lines.append(f"\t{self._living_death} = {{\n\t\tdeath = yes\n\t}}")
+        lines.append("}\n")
+        return "\n".join(lines)
+
+    def _write(self, stream: TextIO, block: str, first: bool) -> None:
+        # Blocks are separated by a blank line; the file ends after the last block's newline
+        if not first:
+            block = "\n" + block
+        stream.write(block)
+        self.chars_written += len(block)
+
+    def write_generation(self, generation: Sequence[Person]) -> None:
+        """Write one generation's members and spool their wives."""
+        ids = self._ids
+        registered = list(generation)
+        for person in registered:
+            self._members += 1
+            ids[id(person)] = f"{self._member_prefix}{self._members}"
+        wives = []
+        for person in registered:
+            spouse = person.spouse
+            if spouse is not None and id(spouse) not in ids:
+                self._wives += 1
+                ids[id(spouse)] = f"{self._wife_prefix}{self._wives}"
+                wives.append(spouse)
+
+        for person in registered:
+            self._write(self.stream, self._block(person, ids[id(person)], ids), self._blocks == 0)
+            self._blocks += 1
+        for wife in wives:
+            self._write(self._spool, self._block(wife, ids[id(wife)], ids), self._wife_blocks == 0)
+            self._wife_blocks += 1
+
+        registered.extend(wives)
+        if self.release_ids:
+            for person in self._held:
+                del ids[id(person)]
+            self._held = registered
+        else:
+            self._held.extend(registered)
+
+    def write_index(self, index: ExportIndex) -> None:
+        """
+        Write a whole dynasty from a prebuilt ExportIndex (see exporters.export_all).
+
+        Members and wives are written in index order, so nothing is spooled and no
+        ID map of the writer's own is built.
+        """
+        self.write_people(index, index.members + index.wives)
+
+    def write_people(self, index: ExportIndex, positions: Iterable[int]) -> None:
+        """
+        Write the people at the given index positions, in that order.
+
+        IDs and references are those of the whole dynasty, so the blocks written to
+        separate files refer to each other as in one file (see exporters.ck3_shards).
+        """
+        ids = _IndexIds(index, self._member_prefix, self._wife_prefix)
+        people = index.people
+        for i in positions:
+            self._write(self.stream, self._block(people[i], ids.label(i), ids), self._blocks == 0)
+            self._blocks += 1
+
+    def close(self) -> None:
+        """Append the spooled wives to the stream."""
+        if self._spool.closed:
+            return
+        if self._wife_blocks:
+            if self._blocks:
+                self.stream.write("\n")
+                self.chars_written += 1
+            self._spool.seek(0)
+            shutil.copyfileobj(self._spool, self.stream)
+        self._spool.close()
+
+    def __enter__(self) -> "CK3HistoryWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_ck3_history(
+    generations: Iterable[Sequence[Person]],
+    stream: TextIO,
+    dynasty_name: str,
+    culture: str,
+    religion: str,
+    include_death_for_living: bool = False,
+    end_date: int = None,
+    release_ids: bool = False,
+    index: Optional[ExportIndex] = None,
+) -> int:
+    """
+    Write a dynasty as a CK3 history file to any text stream.
+
+    generations may be a list or a generator such as iter_dynasty(...,
+    release_ancestors=True); pass release_ids=True with the latter to keep memory flat.
+    If an ExportIndex of the dynasty is given, it is written from the index instead.
+    Returns the number of characters written.
+    """
+    with CK3HistoryWriter(
+        stream, dynasty_name, culture, religion,
+        include_death_for_living=include_death_for_living,
+        end_date=end_date,
+        release_ids=release_ids,
+    ) as writer:
+        if index is not None:
+            writer.write_index(index)
+        else:
+            for generation in generations:
+                writer.write_generation(generation)
+    return writer.chars_written
+
+
+@timed("export_to_ck3")
 def export_to_ck3(
-    dynasty: List[List[Person]],
+    dynasty: Iterable[Sequence[Person]],
     filepath: str,
     dynasty_name: str,
     culture: str,
     religion: str,
     include_death_for_living: bool = False,
-    end_date: int = None
+    end_date: int = None,
+    index: Optional[ExportIndex] = None,
+    compression: Optional[str] = "infer"
 ) -> None:
     """
     Export a dynasty to a CK3 history file.
@@ -105,147 +307,11 @@ def export_to_ck3(
         religion: Religion code (e.g., 'jingxue', 'catholic', 'daoxue')
         include_death_for_living: If True, add death date (end_date + 1 day) for living characters
         end_date: Simulation end date in absolute days (needed for living character deaths)
+        index: Prebuilt ExportIndex of the dynasty to reuse (optional)
+        compression: 'gzip', 'bz2', 'lzma' or None; by default taken from the
+            extension of filepath (e.g. 'zhu.txt.gz')
     """
-    from config.culture_config import get_ck3_culture_code
-    
-    # Get the CK3 culture code (e.g., "chinese" -> "han")
-    ck3_culture = get_ck3_culture_code(culture)
-    
-    # Format dynasty name for CK3: lowercase with "_dynasty" suffix
-    ck3_dynasty_name = f"{dynasty_name.lower()}_dynasty"
-    
-    # Build character map - includes dynasty members AND their spouses
-    character_map = {}
-    people_seen = set()
-    char_num = 1
-    wife_num = 1
-    
-    # First pass: collect all dynasty members
-    for generation in dynasty:
-        for person in generation:
-            people_seen.add(id(person))
-            character_map[id(person)] = (person, char_num, None)  # (person, char_num, wife_num)
-            char_num += 1
-    
-    # Second pass: collect spouses not already in dynasty (these are wives)
-    for generation in dynasty:
-        for person in generation:
-            if person.spouse and id(person.spouse) not in people_seen:
-                people_seen.add(id(person.spouse))
-                character_map[id(person.spouse)] = (person.spouse, char_num, wife_num)  # Mark as wife
-                char_num += 1
-                wife_num += 1
-    
-    # Collect all people with their character IDs (lowercase)
-    people_with_ids = []
-    for person_id, (person, char_num, wife_num_val) in character_map.items():
-        if wife_num_val is not None:
-            # This is a wife - use special naming
-            character_id = f"{dynasty_name.lower()}_wife_{wife_num_val}"
-        else:
-            # Regular dynasty member
-            character_id = f"{dynasty_name.lower()}_character_{char_num}"
-        people_with_ids.append((person, character_id, char_num))
-    
-    # Generate CK3 entries
-    lines = []
-    
-    for person, character_id, char_num in people_with_ids:
-        lines.append(f"{character_id} = {{")
-        
-        # Name (required)
-        lines.append(f"\tname = \"{person.given_name}\"")
-        
-        # Female flag (optional, only if female)
-        if person.female:
-            lines.append(f"\tfemale = yes")
-        
-        # Dynasty (only if part of dynasty) - use lowercase dynasty name with _dynasty suffix
-        if person.dynasty_name:
-            lines.append(f"\tdynasty = {ck3_dynasty_name}")
-        
-        # Religion (required)
-        lines.append(f"\treligion = {religion}")
-        
-        # Culture (required, use CK3 culture code)
-        lines.append(f"\tculture = {ck3_culture}")
-        
-        # Father (optional)
-        if person.father and id(person.father) in character_map:
-            father_person, father_num, father_wife_num = character_map[id(person.father)]
-            if father_wife_num is not None:
-                father_id = f"{dynasty_name.lower()}_wife_{father_wife_num}"
-            else:
-                father_id = f"{dynasty_name.lower()}_character_{father_num}"
-            lines.append(f"\tfather = {father_id}")
-        
-        # Mother (optional)
-        if person.mother and id(person.mother) in character_map:
-            mother_person, mother_num, mother_wife_num = character_map[id(person.mother)]
-            if mother_wife_num is not None:
-                mother_id = f"{dynasty_name.lower()}_wife_{mother_wife_num}"
-            else:
-                mother_id = f"{dynasty_name.lower()}_character_{mother_num}"
-            lines.append(f"\tmother = {mother_id}")
-        
-        # Birth event (required)
-        if person.date_of_birth:
-            birth_year, birth_month, birth_day = convert_absolute_day_to_date(person.date_of_birth)
-            birth_date = format_ck3_date(birth_year, birth_month, birth_day)
-        else:
-            # Fallback to year if no detailed date
-            birth_date = format_ck3_date(person.birth_year, 1, 1)
-        
-        lines.append(f"\t{birth_date} = {{")
-        lines.append(f"\t\tbirth = yes")
-        
-        # Add playable flag for males under 30 at end date
-        if not person.female and end_date:
-            age_at_end = convert_calendar_days_to_years(end_date) - person.birth_year
-            if age_at_end < 30:
-                lines.append(f"\t\teffect = {{ add_character_flag = do_not_generate_starting_family }}")
-        
-        lines.append(f"\t}}")
-        
-        # Marriage event (optional)
-        if person.spouse and person.date_of_marriage and id(person.spouse) in character_map:
-            spouse_person, spouse_num, spouse_wife_num = character_map[id(person.spouse)]
-            if spouse_wife_num is not None:
-                spouse_id = f"{dynasty_name.lower()}_wife_{spouse_wife_num}"
-            else:
-                spouse_id = f"{dynasty_name.lower()}_character_{spouse_num}"
-            
-            marriage_year, marriage_month, marriage_day = convert_absolute_day_to_date(person.date_of_marriage)
-            marriage_date = format_ck3_date(marriage_year, marriage_month, marriage_day)
-            
-            lines.append(f"\t{marriage_date} = {{")
-            lines.append(f"\t\tadd_spouse = {spouse_id}")
-            lines.append(f"\t}}")
-        
-        # Death event (optional)
-        # Check is_living_at_end instead of a date threshold
-        if person.date_of_death and not person.is_living_at_end:
-            # Character died during simulation
-            death_year, death_month, death_day = convert_absolute_day_to_date(person.date_of_death)
-            death_date = format_ck3_date(death_year, death_month, death_day)
-            
-            lines.append(f"\t{death_date} = {{")
-            lines.append(f"\t\tdeath = yes")
-            lines.append(f"\t}}")
-        elif include_death_for_living and person.is_living_at_end and end_date:
-            # Living character: add death at end_date + 1 day
-            # Calculate the day after end_date
-            death_day_absolute = end_date + 1
-            death_year, death_month, death_day = convert_absolute_day_to_date(death_day_absolute)
-            death_date = format_ck3_date(death_year, death_month, death_day)
-            
-            lines.append(f"\t{death_date} = {{")
-            lines.append(f"\t\tdeath = yes")
-            lines.append(f"\t}}")
-        
-        lines.append("}")
-        lines.append("")  # Blank line between characters
-    
-    # Write to file
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+    with open_text_output(filepath, compression) as f:
+        write_ck3_history(dynasty, f, dynasty_name, culture, religion, include_death_for_living, end_date, index=index)
+    if is_enabled():
+        count("export.ck3_bytes_written", os.path.getsize(filepath))
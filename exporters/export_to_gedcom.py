@@ -11,27 +11,18 @@ Includes enhanced fields:
 """
 
 from datetime import date
-from collections import defaultdict
-from typing import List, Dict, Set, Optional
+from typing import List, Optional, TextIO
+import os
+from exporters.export_index import ExportIndex, collect_people
+from exporters.output import open_text_output
 from models.person import Person
-from config.other_constants import DAYS_IN_YEAR
+from services.calendar_table import GEDCOM_MONTHS, day_to_date, gedcom_date
+from services.instrumentation import count, is_enabled, timed
 
 
 def convert_absolute_day_to_date(absolute_day: int) -> tuple[int, int, int]:
     """Convert absolute day (CK3 format) to (year, month, day)."""
-    from config.other_constants import DAYS_IN_MONTH
-    
-    year = (absolute_day - 1) // DAYS_IN_YEAR + 1
-    day_of_year = (absolute_day - 1) % DAYS_IN_YEAR + 1
-    
-    month = 1
-    for dim in DAYS_IN_MONTH:
-        if day_of_year <= dim:
-            break
-        day_of_year -= dim
-        month += 1
-    
-    return year, month, day_of_year
+    return day_to_date(absolute_day)
 
 
 def format_gedcom_date(year: Optional[int] = None, month: Optional[int] = None, day: Optional[int] = None) -> Optional[str]:
@@ -44,120 +35,52 @@ def format_gedcom_date(year: Optional[int] = None, month: Optional[int] = None,
         return f"ABT {year}"
     
     # Full date format: DAY MON YEAR
-    months = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
-    month_name = months[month - 1] if 1 <= month <= 12 else months[0]
+    month_name = GEDCOM_MONTHS[month - 1] if 1 <= month <= 12 else GEDCOM_MONTHS[0]
     return f"{day} {month_name} {year}"
 
 
-def collect_people(dynasty: List[List[Person]]) -> List[Person]:
-    """
-    Flatten dynasty structure into a single list of all people.
-    
-    Args:
-        dynasty: List of generations, each containing a list of persons
-    
-    Returns:
-        Flattened list of all persons in the dynasty
-    """
-    people = []
-    seen: Set[int] = set()
-    
-    for generation in dynasty:
-        for person in generation:
-            person_id = id(person)
-            if person_id not in seen:
-                seen.add(person_id)
-                people.append(person)
-            
-            # Also add spouses (they may not be in the dynasty structure)
-            if person.spouse:
-                spouse_id = id(person.spouse)
-                if spouse_id not in seen:
-                    seen.add(spouse_id)
-                    people.append(person.spouse)
-    
-    return people
-
-
-def export_to_gedcom(
+def write_gedcom(
     dynasty: List[List[Person]],
-    filepath: str,
+    stream: TextIO,
     end_year: int = None,
     culture: str = "chinese",
     dynasty_name: str = None,
-    source: str = "CK3 Dynasty Generator"
-) -> str:
+    source: str = "CK3 Dynasty Generator",
+    index: Optional[ExportIndex] = None
+) -> None:
     """
-    Export dynasty to GEDCOM 5.5.1 format file.
-    
-    GEDCOM standard includes the following person fields we support:
-    - NAME: Person's name (given and surname)
-    - SEX: Male/Female
-    - BIRT: Birth date
-    - DEAT: Death date
-    - MARR: Marriage date
-    - FAMS: Family where person is spouse
-    - FAMC: Family where person is child
-    
-    Args:
-        dynasty: Dynasty structure to export
-        filepath: Path where GEDCOM file will be written
-        end_year: If set, exclude deaths beyond this year
-        culture: Culture name for naming conventions (e.g., 'chinese', 'english')
-        dynasty_name: The dynasty surname to propagate to all members
-        source: Source identifier for the GEDCOM file
-    
-    Returns:
-        Path to the created GEDCOM file
+    Write a dynasty as GEDCOM 5.5.1 to any text stream (see export_to_gedcom for the arguments).
     """
     from config.culture_config import get_culture_config
     
     culture_cfg = get_culture_config(culture)
-    people = collect_people(dynasty)
-    
-    # Create ID mappings using object id for hashability
-    person_to_index = {id(p): i for i, p in enumerate(people)}
-    indi_ids = {id(p): f"@I{i+1}@" for i, p in enumerate(people)}
-    
-    # Create family IDs and relationships
-    fam_ids = {}  # id(person) -> fid
-    fam_children = defaultdict(list)  # fid -> list of Person objects
-    fam_counter = 0
-    
-    for person in people:
-        if not person.children:
-            continue
-        fam_counter += 1
-        fid = f"@F{fam_counter}@"
-        fam_ids[id(person)] = fid
-        for child in person.children:
-            fam_children[fid].append(child)
+    if index is None:
+        index = ExportIndex(dynasty)
+    people = index.people
+    indi_ids = [f"@I{i+1}@" for i in range(len(people))]
+    fam_ids = [f"@F{f+1}@" for f in range(len(index.families))]
     
-    # Build relationship maps
-    child_famc_map: Dict[int, List[str]] = defaultdict(list)  # id(person) -> [fid]
-    father_fams_map: Dict[int, List[str]] = defaultdict(list)  # id(person) -> [fid]
-    mother_fams_map: Dict[int, List[str]] = defaultdict(list)  # id(person) -> [fid]
-    
-    for person_id, fid in fam_ids.items():
-        father = next(p for p in people if id(p) == person_id)
-        father_fams_map[person_id].append(fid)
-        
-        # Add mother to this family if the father has a spouse
-        if father.spouse:
-            mother_fams_map[id(father.spouse)].append(fid)
-        
-        # Add children to this family
-        for child in fam_children[fid]:
-            child_famc_map[id(child)].append(fid)
+    today = date.today()
+    header = [
+        "0 HEAD",
+        f"1 SOUR {source}",
+        "1 GEDC",
+        "2 VERS 5.5.1",
+        "2 FORM LINEAGE-LINKED",
+        "1 CHAR UTF-8",
+        f"1 DATE {today.strftime('%d %b %Y')}",
+        "1 SUBM @SUB1@",
+        "0 @SUB1@ SUBM",
+        "1 NAME Dynasty Generator",
+    ]
     
-    # Generate INDI blocks
-    indi_blocks: Dict[str, List[str]] = {}
+    stream.write("\n".join(header))
+    stream.write("\n")
     
-    for person in people:
-        pid = indi_ids[id(person)]
-        
+    # Individuals, in index order
+    for i, person in enumerate(people):
         lines = []
-        lines.append(f"0 {pid} INDI")
+        lines.append(f"0 {indi_ids[i]} INDI")
         
         # Determine surname for this person based on culture conventions
         # Dynasty members (those with dynasty_name set) always use that surname
@@ -198,8 +121,7 @@ def export_to_gedcom(
             lines.append("1 BIRT")
             # Use detailed date if available, otherwise just year
             if person.date_of_birth is not None:
-                year, month, day = convert_absolute_day_to_date(person.date_of_birth)
-                formatted_date = format_gedcom_date(year, month, day)
+                formatted_date = gedcom_date(person.date_of_birth)
             else:
                 formatted_date = format_gedcom_date(person.birth_year)
             if formatted_date:
@@ -210,8 +132,7 @@ def export_to_gedcom(
             lines.append("1 DEAT")
             # Use detailed date if available
             if person.date_of_death is not None:
-                year, month, day = convert_absolute_day_to_date(person.date_of_death)
-                formatted_date = format_gedcom_date(year, month, day)
+                formatted_date = gedcom_date(person.date_of_death)
             else:
                 formatted_date = format_gedcom_date(person.death_year)
             if formatted_date:
@@ -224,72 +145,90 @@ def export_to_gedcom(
         
         # MARR field (Marriage Date)
         if person.date_of_marriage is not None:
-            year, month, day = convert_absolute_day_to_date(person.date_of_marriage)
-            formatted_date = format_gedcom_date(year, month, day)
+            formatted_date = gedcom_date(person.date_of_marriage)
             if formatted_date:
                 lines.append("1 MARR")
                 lines.append(f"2 DATE {formatted_date}")
         
         # FAMS field (person as spouse/parent)
-        for fid in father_fams_map.get(id(person), []):
-            lines.append(f"1 FAMS {fid}")
-        for fid in mother_fams_map.get(id(person), []):
-            lines.append(f"1 FAMS {fid}")
+        for fam in index.spouse_families[i]:
+            lines.append(f"1 FAMS {fam_ids[fam]}")
         
         # FAMC field (person as child)
-        for fid in child_famc_map.get(id(person), []):
-            lines.append(f"1 FAMC {fid}")
+        for fam in index.child_families[i]:
+            lines.append(f"1 FAMC {fam_ids[fam]}")
         
-        indi_blocks[pid] = lines
+        lines.append("")
+        stream.write("\n".join(lines))
     
-    # Build GEDCOM output
-    today = date.today()
-    output = [
-        "0 HEAD",
-        f"1 SOUR {source}",
-        "1 GEDC",
-        "2 VERS 5.5.1",
-        "2 FORM LINEAGE-LINKED",
-        "1 CHAR UTF-8",
-        f"1 DATE {today.strftime('%d %b %Y')}",
-        "1 SUBM @SUB1@",
-        "0 @SUB1@ SUBM",
-        "1 NAME Dynasty Generator",
-    ]
-    
-    # Add individuals in order
-    for pid in sorted(indi_blocks, key=lambda s: int(s.strip("@I@"))):
-        output.extend(indi_blocks[pid])
-    
-    # Add families
-    for person_id, fid in fam_ids.items():
-        # Find the person object from indi_ids
-        father = next(p for p in people if id(p) == person_id)
-        
-        output.append(f"0 {fid} FAM")
-        output.append(f"1 HUSB {indi_ids[id(father)]}")
+    # Families
+    for fam, family in enumerate(index.families):
+        father = people[family.father]
+        lines = [f"0 {fam_ids[fam]} FAM", f"1 HUSB {indi_ids[family.father]}"]
         
         # Add spouse if exists
-        if father.spouse:
-            output.append(f"1 WIFE {indi_ids[id(father.spouse)]}")
+        if family.wife is not None:
+            lines.append(f"1 WIFE {indi_ids[family.wife]}")
         
         # Add marriage date at family level if available
         if father.date_of_marriage is not None:
-            year, month, day = convert_absolute_day_to_date(father.date_of_marriage)
-            formatted_date = format_gedcom_date(year, month, day)
+            formatted_date = gedcom_date(father.date_of_marriage)
             if formatted_date:
-                output.append("1 MARR")
-                output.append(f"2 DATE {formatted_date}")
+                lines.append("1 MARR")
+                lines.append(f"2 DATE {formatted_date}")
         
         # Add children
-        for child in fam_children[fid]:
-            output.append(f"1 CHIL {indi_ids[id(child)]}")
+        for child in family.children:
+            lines.append(f"1 CHIL {indi_ids[child]}")
+        
+        lines.append("")
+        stream.write("\n".join(lines))
     
     # Trailer
-    output.append("0 TRLR")
+    stream.write("0 TRLR")
+
+
+@timed("export_to_gedcom")
+def export_to_gedcom(
+    dynasty: List[List[Person]],
+    filepath: str,
+    end_year: int = None,
+    culture: str = "chinese",
+    dynasty_name: str = None,
+    source: str = "CK3 Dynasty Generator",
+    index: Optional[ExportIndex] = None,
+    compression: Optional[str] = "infer"
+) -> str:
+    """
+    Export dynasty to GEDCOM 5.5.1 format file.
+    
+    GEDCOM standard includes the following person fields we support:
+    - NAME: Person's name (given and surname)
+    - SEX: Male/Female
+    - BIRT: Birth date
+    - DEAT: Death date
+    - MARR: Marriage date
+    - FAMS: Family where person is spouse
+    - FAMC: Family where person is child
+    
+    Args:
+        dynasty: Dynasty structure to export
+        filepath: Path where GEDCOM file will be written
+        end_year: If set, exclude deaths beyond this year
+        culture: Culture name for naming conventions (e.g., 'chinese', 'english')
+        dynasty_name: The dynasty surname to propagate to all members
+        source: Source identifier for the GEDCOM file
+        index: Prebuilt ExportIndex of the dynasty to reuse (optional)
+        compression: 'gzip', 'bz2', 'lzma' or None; by default taken from the
+            extension of filepath (e.g. 'tree.ged.gz')
+    
+    Returns:
+        Path to the created GEDCOM file
+    """
+    with open_text_output(filepath, compression) as f:
+        write_gedcom(dynasty, f, end_year, culture, dynasty_name, source, index)
     
-    # Write to file
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write("\n".join(output))
+    if is_enabled():
+        count("export.gedcom_bytes_written", os.path.getsize(filepath))
     
     return filepath
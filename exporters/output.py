@@ -0,0 +1,55 @@
+"""
+Text output streams for the exporters, optionally compressed.
+
+open_text_output opens a UTF-8 text stream on a file, compressing on the fly with
+gzip, bz2 or lzma. The codec is named or, by default, taken from the file
+extension (.gz, .bz2, .xz/.lzma), so "tree.ged.gz" is written gzip-compressed.
+"""
+
+from typing import Optional, TextIO
+import bz2
+import gzip
+import lzma
+
+COMPRESSIONS = ("gzip", "bz2", "lzma")
+EXTENSIONS = {"gzip": ".gz", "bz2": ".bz2", "lzma": ".xz"}
+_BY_EXTENSION = {".gz": "gzip", ".bz2": "bz2", ".xz": "lzma", ".lzma": "lzma"}
+# Lower than the modules' default of 9: much faster for little size on repetitive text
+_GZIP_LEVEL = 6
+
+
+def compression_for_path(path: str) -> Optional[str]:
+    """Compression implied by a file's extension, or None for plain text."""
+    lower = path.lower()
+    for extension, compression in _BY_EXTENSION.items():
+        if lower.endswith(extension):
+            return compression
+    return None
+
+
+def open_text_output(path: str, compression: Optional[str] = "infer") -> TextIO:
+    """
+    Open a file for writing UTF-8 text.
+
+    Args:
+        path: File to write
+        compression: 'gzip', 'bz2', 'lzma', None for plain text, or 'infer' to take
+            it from the extension of path
+
+    Returns:
+        A writable text stream; close it (or use it in a with block) to finish the file
+    """
+    if compression == "infer":
+        compression = compression_for_path(path)
+    if compression is None:
+        return open(path, "w", encoding="utf-8", buffering=1 << 16)
+    if compression == "gzip":
+        return gzip.open(path, "wt", compresslevel=_GZIP_LEVEL, encoding="utf-8")
+    if compression == "bz2":
+        return bz2.open(path, "wt", encoding="utf-8")
+    if compression == "lzma":
+        return lzma.open(path, "wt", encoding="utf-8")
+    raise ValueError(f"Unknown compression {compression!r} (expected one of {', '.join(COMPRESSIONS)})")
+
+
+__all__ = ["COMPRESSIONS", "EXTENSIONS", "compression_for_path", "open_text_output"]
@@ -0,0 +1,265 @@
+"""
+GEDCOM importer.
+
+Reads a GEDCOM file line by line and rebuilds the dynasty as Person objects with
+father, mother, spouse and children links, in the generations shape that
+generate_dynasty returns. Each INDI record becomes a Person when the record ends.
+Each FAM record is linked as soon as its people exist. Families that name
+individuals defined later in the file are kept as cross-reference tuples until
+the end, so the raw text is never held.
+
+The fields written by exporters.export_to_gedcom are read back: GIVN/SURN (a
+_MARNM marks a wife who took her husband's surname, so she is not a dynasty
+member), SEX, BIRT/DEAT/MARR dates ("D MON YYYY" exactly, "ABT YYYY" as a year)
+and the "Age at death" note, which gives the death year when the death itself was
+left out. A person without a DEAT record is taken to be living at the end. The
+exporter writes DEAT for every death up to the end of the end year, so given the
+simulation end date a death dated after it also counts as living at the end.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+import re
+
+from models.person import Person
+from services.calendar_table import GEDCOM_MONTHS, date_to_day
+from services.instrumentation import count, timed
+
+_MONTH_NUMBERS = {name: i + 1 for i, name in enumerate(GEDCOM_MONTHS)}
+_FULL_DATE = re.compile(r"(\d{1,2}) ([A-Z]{3}) (\d+)\Z")
+_YEAR = re.compile(r"(\d+)\Z")
+_AGE_NOTE = re.compile(r"Age at death: (-?\d+) years")
+
+
+@dataclass
+class GedcomDynasty:
+    """
+    A dynasty read from a GEDCOM file.
+
+    generations starts from the founders: parentless people who are not anyone's
+    wife. people maps every INDI cross-reference (e.g. '@I1@') to its Person.
+    """
+    generations: List[List[Person]]
+    people: Dict[str, Person]
+    families: int = 0
+    header: Dict[str, str] = field(default_factory=dict)
+
+
+def parse_gedcom_date(value: str) -> Tuple[Optional[int], Optional[int]]:
+    """(year, absolute day) of a GEDCOM date; the day is None unless day, month and year are given."""
+    value = value.strip().upper()
+    for prefix in ("ABT ", "EST ", "CAL ", "BEF ", "AFT "):
+        if value.startswith(prefix):
+            value = value[len(prefix):]
+            break
+    match = _FULL_DATE.match(value)
+    if match and match.group(2) in _MONTH_NUMBERS:
+        year = int(match.group(3))
+        return year, date_to_day(year, _MONTH_NUMBERS[match.group(2)], int(match.group(1)))
+    match = _YEAR.search(value)
+    return (int(match.group(1)), None) if match else (None, None)
+
+
+class _Individual:
+    """Fields of the INDI record being read."""
+    __slots__ = ("given", "surname", "married_name", "female", "birth", "death", "marriage", "age_at_death")
+
+    def __init__(self):
+        self.given = ""
+        self.surname = ""
+        self.married_name = False
+        self.female = False
+        self.birth = None
+        self.death = None
+        self.marriage = None
+        self.age_at_death = None
+
+    def person(self, end_date: Optional[int] = None) -> Person:
+        birth_year, date_of_birth = parse_gedcom_date(self.birth) if self.birth else (None, None)
+        death_year, date_of_death = parse_gedcom_date(self.death) if self.death else (None, None)
+        if death_year is None and self.age_at_death is not None and birth_year is not None:
+            death_year = birth_year + self.age_at_death
+        marriage_day = parse_gedcom_date(self.marriage)[1] if self.marriage else None
+        living = self.death is None or (
+            end_date is not None and date_of_death is not None and date_of_death > end_date
+        )
+        return Person(
+            given_name=self.given,
+            female=self.female,
+            birth_year=birth_year,
+            death_year=death_year,
+            is_living_at_end=living,
+            dynasty_name=self.surname if self.surname and not self.married_name else None,
+            date_of_birth=date_of_birth,
+            date_of_death=date_of_death,
+            date_of_marriage=marriage_day,
+        )
+
+
+def _link_family(
+    people: Dict[str, Person], husband: Optional[str], wife: Optional[str], children: List[str], marriage: Optional[str]
+) -> None:
+    father = people[husband] if husband else None
+    mother = people[wife] if wife else None
+    if father is not None and mother is not None:
+        father.spouse, mother.spouse = mother, father
+        if marriage:
+            day = parse_gedcom_date(marriage)[1]
+            if father.date_of_marriage is None:
+                father.date_of_marriage = day
+            if mother.date_of_marriage is None:
+                mother.date_of_marriage = day
+    kids = [people[c] for c in children]
+    for child in kids:
+        child.father, child.mother = father, mother
+    if father is not None:
+        father.children.extend(kids)
+
+
+def _generations(people: Dict[str, Person], wives: set) -> List[List[Person]]:
+    """Founders first, then each generation's children in order."""
+    current = [
+        p for xref, p in people.items()
+        if p.father is None and p.mother is None and xref not in wives
+    ]
+    generations = []
+    seen = set()
+    while current:
+        generation = [p for p in current if id(p) not in seen]
+        if not generation:
+            break
+        seen.update(id(p) for p in generation)
+        generations.append(generation)
+        current = [child for p in generation for child in p.children]
+    return generations
+
+
+@timed("import_from_gedcom")
+def read_gedcom(lines: Iterable[str], end_date: Optional[int] = None) -> GedcomDynasty:
+    """
+    Build a GedcomDynasty from GEDCOM lines (any iterable, e.g. an open file).
+
+    end_date is the simulation end date in absolute days; people who die after it
+    are living at the end. Without it only people with no DEAT record are.
+    """
+    people: Dict[str, Person] = {}
+    wives = set()
+    pending: List[Tuple[Optional[str], Optional[str], List[str], Optional[str]]] = []
+    header: Dict[str, str] = {}
+    families = 0
+
+    kind = None        # tag of the current level-0 record
+    xref = None
+    individual: Optional[_Individual] = None
+    family = None      # [husband, wife, children, marriage] of the current FAM
+    event = None       # current level-1 tag
+
+    def finish() -> None:
+        nonlocal families
+        if kind == "INDI":
+            people[xref] = individual.person(end_date)
+        elif kind == "FAM":
+            families += 1
+            husband, wife, children, _ = family
+            if wife:
+                wives.add(wife)
+            if all(x in people for x in (husband, wife, *children) if x):
+                _link_family(people, *family)
+            else:
+                pending.append(tuple(family))
+
+    for number, raw in enumerate(lines, start=1):
+        line = raw.strip().lstrip("\ufeff")
+        if not line:
+            continue
+        parts = line.split(" ", 2)
+        try:
+            level = int(parts[0])
+        except ValueError:
+            raise ValueError(f"Line {number}: expected a level number, got {line!r}") from None
+        if len(parts) < 2:
+            raise ValueError(f"Line {number}: missing tag")
+
+        if level == 0:
+            finish()
+            if parts[1].startswith("@"):
+                xref, kind = parts[1], (parts[2] if len(parts) > 2 else "").strip()
+            else:
+                xref, kind = None, parts[1]
+            individual = _Individual() if kind == "INDI" else None
+            family = [None, None, [], None] if kind == "FAM" else None
+            event = None
+            continue
+
+        tag = parts[1]
+        value = parts[2] if len(parts) > 2 else ""
+        if level == 1:
+            event = tag
+        if kind == "INDI":
+            if level == 1:
+                if tag == "NAME" and not individual.given:
+                    given, _, rest = value.partition("/")
+                    individual.given = given.strip()
+                    individual.surname = rest.partition("/")[0].strip()
+                elif tag == "SEX":
+                    individual.female = value.strip() == "F"
+                elif tag == "NOTE":
+                    match = _AGE_NOTE.search(value)
+                    if match:
+                        individual.age_at_death = int(match.group(1))
+                elif tag == "DEAT" and individual.death is None:
+                    individual.death = ""
+            elif level == 2:
+                if tag == "GIVN":
+                    individual.given = value.strip()
+                elif tag == "SURN":
+                    individual.surname = value.strip()
+                elif tag == "_MARNM":
+                    individual.married_name = True
+                elif tag == "DATE":
+                    if event == "BIRT":
+                        individual.birth = value
+                    elif event == "DEAT":
+                        individual.death = value
+                    elif event == "MARR":
+                        individual.marriage = value
+        elif kind == "FAM":
+            if level == 1:
+                if tag == "HUSB":
+                    family[0] = value.strip()
+                elif tag == "WIFE":
+                    family[1] = value.strip()
+                elif tag == "CHIL":
+                    family[2].append(value.strip())
+            elif level == 2 and tag == "DATE" and event == "MARR":
+                family[3] = value
+        elif kind == "HEAD" and level == 1:
+            header[tag] = value
+    finish()
+
+    for husband, wife, children, marriage in pending:
+        missing = [x for x in (husband, wife, *children) if x and x not in people]
+        if missing:
+            raise ValueError(f"Family refers to unknown individual(s): {', '.join(missing)}")
+        _link_family(people, husband, wife, children, marriage)
+
+    count("import.gedcom_people", len(people))
+    return GedcomDynasty(generations=_generations(people, wives), people=people, families=families, header=header)
+
+
+def import_from_gedcom(filepath: str, end_date: Optional[int] = None) -> GedcomDynasty:
+    """
+    Read a GEDCOM file written by export_to_gedcom (or edited by hand).
+
+    Args:
+        filepath: Path of the .ged file
+        end_date: Simulation end date in absolute days (see read_gedcom)
+
+    Returns:
+        GedcomDynasty with the generations and every person by cross-reference
+    """
+    with open(filepath, "r", encoding="utf-8-sig") as f:
+        return read_gedcom(f, end_date)
+
+
+__all__ = ["GedcomDynasty", "import_from_gedcom", "parse_gedcom_date", "read_gedcom"]
@@ -4,11 +4,16 @@ CK3 Dynasty Generator - Interactive Wizard
 Generates a multi-generation dynasty with customizable parameters and statistics.
 """
 
-from services.simulation import generate_dynasty
+from services.simulation import PHASE_MALE_ONLY, PHASE_NORMAL, generate_dynasty_run, reroll_phase
+from services.descendant_index import DescendantIndex
 from services.dynasty_metrics import calculate_dynasty_stats, print_dynasty_stats, print_dynasty_tree
 from services.name_manager import NameManager
-from exporters.export_to_gedcom import export_to_gedcom
-from exporters.export_to_ck3 import export_to_ck3
+from exporters.export_all import export_all
+from exporters.export_index import ExportIndex
+from exporters.ck3_merge import merge_into_ck3_history
+from exporters.ck3_shards import SHARD_MODES, export_ck3_shards
+from exporters.output import COMPRESSIONS, EXTENSIONS, compression_for_path
+from importers.import_from_gedcom import import_from_gedcom
 from config.mortality_config import (
     NormalMortalityConfig,
     GenerousMortalityConfig,
@@ -20,7 +25,16 @@ from config.fertility_config import (
     RealisticFertilityConfig,
 )
 from config.sim_config import SimConfig
-from typing import Tuple
+from config.other_constants import convert_calendar_years_to_days
+from services.utils import convert_calendar_days_to_years
+from services.ensemble import DynastyParams, generate_dynasty_from_seed, run_ensemble
+from services.lineage_index import LineageIndex
+from services import instrumentation
+from services.search import DynastyCriteria, SearchBudget, find_dynasty
+from services.snapshot import load_snapshot, save_snapshot
+from typing import List, Optional, Tuple
+import argparse
+import json
 import random
 import os
 
@@ -219,9 +233,10 @@ def main_menu_prompt() -> str:
         'regen_same' - regenerate with current settings
         'regen_diff' - regenerate with different settings
         'exit' - exit the program
+        'reroll' - keep the mainline and reroll a later phase
     """
     while True:
-        choice = input("\nWhat would you like to do? (1 = save, 2 = regen same settings, 3 = regen diff settings, 4 = exit): ").strip()
+        choice = input("\nWhat would you like to do? (1 = save, 2 = regen same settings, 3 = regen diff settings, 4 = exit, 5 = reroll later phase): ").strip()
         if choice == "1":
             return "save"
         elif choice == "2":
@@ -230,8 +245,10 @@ def main_menu_prompt() -> str:
             return "regen_diff"
         elif choice == "4":
             return "exit"
+        elif choice == "5":
+            return "reroll"
         else:
-            print("Please enter '1', '2', '3', or '4'.")
+            print("Please enter '1', '2', '3', '4', or '5'.")
 
 
 def post_gedcom_prompt() -> str:
@@ -243,9 +260,10 @@ def post_gedcom_prompt() -> str:
         'regen_same' - regenerate with current settings
         'regen_diff' - regenerate with different settings
         'exit' - exit the program
+        'reroll' - keep the mainline and reroll a later phase
     """
     while True:
-        choice = input("\nWhat would you like to do? (1 = save CK3, 2 = regen same settings, 3 = regen diff settings, 4 = exit): ").strip()
+        choice = input("\nWhat would you like to do? (1 = save CK3, 2 = regen same settings, 3 = regen diff settings, 4 = exit, 5 = reroll later phase): ").strip()
         if choice == "1":
             return "save_ck3"
         elif choice == "2":
@@ -254,8 +272,22 @@ def post_gedcom_prompt() -> str:
             return "regen_diff"
         elif choice == "4":
             return "exit"
+        elif choice == "5":
+            return "reroll"
         else:
-            print("Please enter '1', '2', '3', or '4'.")
+            print("Please enter '1', '2', '3', '4', or '5'.")
+
+
+def get_reroll_phase() -> str:
+    """Ask which phase to reroll; everything generated before it is kept."""
+    while True:
+        choice = input("\nReroll from which phase? (1 = male-only onwards, 2 = normal only): ").strip()
+        if choice == "1":
+            return PHASE_MALE_ONLY
+        elif choice == "2":
+            return PHASE_NORMAL
+        else:
+            print("Please enter '1' or '2'.")
 
 
 def get_export_filename(dynasty_name: str, format_type: str = "gedcom") -> str:
@@ -328,7 +360,7 @@ def get_export_filename_old(dynasty_name: str) -> str:
             return filepath
 
 
-def main():
+def run_wizard():
     print("\n" + "=" * 80)
     print("WELCOME TO THE CK3 DYNASTY GENERATOR")
     print("=" * 80)
@@ -348,6 +380,10 @@ def main():
     # Note: end_year is the same as start_year from the selected bookmark/custom date
     birth_year, male_only_start, normal_start = get_dynasty_parameters(start_year)
     
+    # Set when the user asks to keep the current run's earlier phases
+    run = None
+    reroll_from = None
+    
     while True:
         # Store parameters for potential regeneration with same settings
         params_for_reuse = {
@@ -367,34 +403,48 @@ def main():
         normal_start_days = convert_calendar_years_to_days(normal_start)
         end_days = start_day_absolute  # Use the selected start date as the end date for simulation
         
-        print(f"\nGenerating {dynasty_name} dynasty from {birth_year} to {start_year}...")
-        
-        # Generate the dynasty
         rng = random.Random()
-        dynasty = generate_dynasty(
-            birth_year=birth_year,
-            male_only_start_date=male_only_start_days,
-            normal_start_date=normal_start_days,
-            end_date=end_days,
-            cfg=cfg,
-            rng=rng,
-            dynasty_name=dynasty_name,
-            culture=culture,
-        )
+        if run is not None and reroll_from is not None:
+            # Only resample the chosen phase and later ones
+            print(f"\nRerolling {dynasty_name} dynasty from the {reroll_from.replace('_', '-')} phase...")
+            run = reroll_phase(run, reroll_from, rng=rng)
+        else:
+            print(f"\nGenerating {dynasty_name} dynasty from {birth_year} to {start_year}...")
+            
+            # Generate the dynasty
+            run = generate_dynasty_run(
+                birth_year=birth_year,
+                male_only_start_date=male_only_start_days,
+                normal_start_date=normal_start_days,
+                end_date=end_days,
+                cfg=cfg,
+                rng=rng,
+                dynasty_name=dynasty_name,
+                culture=culture,
+            )
+        reroll_from = None
+        dynasty = run.generations
         
         # Calculate and print statistics
-        stats = calculate_dynasty_stats(dynasty, end_days)
+        index = DescendantIndex(dynasty)
+        stats = calculate_dynasty_stats(dynasty, end_days, index)
         print_dynasty_stats(stats)
-        print_dynasty_tree(dynasty, depth=2)
+        print_dynasty_tree(dynasty, depth=2, index=index)
         
         # Main menu: Ask what to do next
         choice = main_menu_prompt()
         
         if choice == "save":
+            # One index serves both the GEDCOM and a later CK3 save. The menu saves the
+            # GEDCOM before offering CK3, so these are two one-format export_all calls and
+            # their writers do not overlap; --gedcom/--ck3 on the command line write both
+            # in one call (export_from_args)
+            export_index = ExportIndex(dynasty)
+            
             # Save GEDCOM
             filepath = get_export_filename(dynasty_name, format_type="gedcom")
             try:
-                export_to_gedcom(dynasty, filepath, end_year=start_year, culture=culture, dynasty_name=dynasty_name)
+                export_all(dynasty, {"gedcom": filepath}, dynasty_name, culture, end_year=start_year, index=export_index)
                 print(f"\n✓ Dynasty saved to: {filepath}")
             except Exception as e:
                 import traceback
@@ -409,7 +459,10 @@ def main():
                 include_death = get_ck3_death_choice()
                 filepath = get_export_filename(dynasty_name, format_type="ck3")
                 try:
-                    export_to_ck3(dynasty, filepath, dynasty_name, culture, religion, include_death, end_days)
+                    export_all(
+                        dynasty, {"ck3": filepath}, dynasty_name, culture, religion,
+                        end_date=end_days, include_death_for_living=include_death, index=export_index,
+                    )
                     print(f"\n✓ Dynasty saved to: {filepath}")
                 except Exception as e:
                     import traceback
@@ -418,8 +471,11 @@ def main():
                 # Continue to next prompt
                 post_choice = post_gedcom_prompt()
             
-            # Handle post-GEDCOM choices (regen_same, regen_diff, exit)
-            if post_choice == "regen_same":
+            # Handle post-GEDCOM choices (regen_same, regen_diff, reroll, exit)
+            if post_choice == "reroll":
+                reroll_from = get_reroll_phase()
+                continue
+            elif post_choice == "regen_same":
                 print("\nRegenerating dynasty with current settings...\n")
                 # Loop back to generation with same parameters
                 continue
@@ -438,6 +494,10 @@ def main():
                 print("\nThank you for using the CK3 Dynasty Generator!")
                 break
         
+        elif choice == "reroll":
+            reroll_from = get_reroll_phase()
+            continue
+        
         elif choice == "regen_same":
             print("\nRegenerating dynasty with current settings...\n")
             # Loop back to generation with same parameters
@@ -460,5 +520,302 @@ def main():
             break
 
 
+MORTALITY_CONFIGS = {
+    "normal": NormalMortalityConfig,
+    "generous": GenerousMortalityConfig,
+    "realistic": RealisticMortalityConfig,
+}
+FERTILITY_CONFIGS = {
+    "normal": NormalFertilityConfig,
+    "generous": GenerousFertilityConfig,
+    "realistic": RealisticFertilityConfig,
+}
+
+
+def add_dynasty_arguments(parser: argparse.ArgumentParser) -> None:
+    """Arguments describing the dynasty to generate (shared by non-interactive commands)."""
+    parser.add_argument("--mortality", choices=sorted(MORTALITY_CONFIGS), default="normal")
+    parser.add_argument("--fertility", choices=sorted(FERTILITY_CONFIGS), default="normal")
+    parser.add_argument("--culture", default="chinese")
+    parser.add_argument("--dynasty-name", default="Dynasty")
+    parser.add_argument("--birth-year", type=int, required=True, help="Patriarch birth year")
+    parser.add_argument("--male-only-start", type=int, required=True, help="Year the male-only strategy starts")
+    parser.add_argument("--normal-start", type=int, required=True, help="Year the normal strategy starts")
+    parser.add_argument("--end-year", type=int, required=True, help="Simulation end year")
+
+
+def dynasty_settings_from_args(args: argparse.Namespace) -> Tuple[SimConfig, DynastyParams]:
+    """Build the SimConfig and DynastyParams described by add_dynasty_arguments."""
+    if not (args.birth_year <= args.male_only_start <= args.normal_start <= args.end_year):
+        raise SystemExit("Years must satisfy birth-year <= male-only-start <= normal-start <= end-year")
+    cfg = SimConfig(
+        mortality=MORTALITY_CONFIGS[args.mortality](),
+        fertility=FERTILITY_CONFIGS[args.fertility](),
+    )
+    params = DynastyParams(
+        birth_year=args.birth_year,
+        male_only_start_date=convert_calendar_years_to_days(args.male_only_start),
+        normal_start_date=convert_calendar_years_to_days(args.normal_start),
+        end_date=convert_calendar_years_to_days(args.end_year),
+        dynasty_name=args.dynasty_name,
+        culture=args.culture,
+    )
+    return cfg, params
+
+
+def run_ensemble_command(args: argparse.Namespace) -> None:
+    """Run an ensemble, stream each run's stats as JSON lines and report their distribution."""
+    # NumPy is only needed for the aggregate report
+    try:
+        from services.ensemble_stats import EnsembleAggregator
+    except ImportError as e:
+        raise SystemExit(f"The ensemble report needs NumPy ({e}); install it with: pip install -r requirements.txt")
+    
+    cfg, params = dynasty_settings_from_args(args)
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    aggregator = EnsembleAggregator()
+    try:
+        for run in run_ensemble(cfg, args.runs, args.seed, args.workers, params=params):
+            aggregator.add(run.stats)
+            if out:
+                out.write(json.dumps({"index": run.index, "seed": run.seed, "stats": run.stats}) + "\n")
+    finally:
+        if out:
+            out.close()
+
+    if aggregator.runs:
+        print(f"Completed {aggregator.runs} runs (master seed {args.seed})")
+        print(aggregator.format_report())
+    if args.output:
+        print(f"  Per-run stats written to: {args.output}")
+    if args.report:
+        aggregator.save(args.report)
+        print(f"  Distribution report written to: {args.report}")
+
+
+def add_export_arguments(parser: argparse.ArgumentParser) -> None:
+    """Output files for a dynasty found or loaded by a non-interactive command."""
+    parser.add_argument("--gedcom", default=None, help="Save the dynasty as GEDCOM to this file")
+    parser.add_argument("--ck3", default=None, help="Save the dynasty as a CK3 history file to this file")
+    parser.add_argument("--religion", default=None, help="Religion code for --ck3 (e.g., 'jingxue')")
+    parser.add_argument(
+        "--merge", action="store_true",
+        help="Merge into an existing --ck3 file: replace blocks with the same IDs, drop this dynasty's stale ones, keep the rest",
+    )
+    parser.add_argument("--ck3-shards", default=None, metavar="DIR", help="Save the CK3 history split over several files in DIR, with a manifest")
+    parser.add_argument("--shard-by", choices=SHARD_MODES, default="generation", help="One --ck3-shards file per generation or per founder's child branch")
+    parser.add_argument(
+        "--compress", choices=COMPRESSIONS, default=None,
+        help="Compress every output file (default: by file extension, e.g. tree.ged.gz)",
+    )
+
+
+def export_from_args(dynasty, dynasty_name: str, culture: str, end_date: int, args: argparse.Namespace) -> None:
+    """Write the files requested with add_export_arguments."""
+    formats = {name: path for name, path in (("gedcom", args.gedcom), ("ck3", args.ck3)) if path}
+    if args.compress:
+        extension = EXTENSIONS[args.compress]
+        formats = {name: path if path.endswith(extension) else path + extension for name, path in formats.items()}
+    if not formats and not args.ck3_shards:
+        return
+    index = ExportIndex(dynasty)
+    end_year = convert_calendar_days_to_years(end_date)
+    try:
+        if (args.ck3_shards or (args.merge and "ck3" in formats)) and not args.religion:
+            raise ValueError("CK3 export needs a religion")
+        if args.ck3_shards:
+            manifest = export_ck3_shards(
+                dynasty, args.ck3_shards, dynasty_name, culture, args.religion, by=args.shard_by,
+                end_date=end_date, compression=args.compress, index=index,
+            )
+            print(f"\n✓ {manifest.characters} characters saved in {len(manifest.shards)} files, listed in {manifest.path}")
+        if args.merge and "ck3" in formats:
+            if args.compress or compression_for_path(formats["ck3"]):
+                raise ValueError("--merge needs an uncompressed --ck3 file")
+            merged = merge_into_ck3_history(
+                dynasty, formats.pop("ck3"), dynasty_name, culture, args.religion,
+                end_date=end_date, prune=True, index=index,
+            )
+            print(f"\n✓ Merged into {args.ck3}: {len(merged.added)} added, {len(merged.replaced)} replaced, {len(merged.removed)} removed")
+        export_all(
+            dynasty, formats, dynasty_name, culture, args.religion,
+            end_date=end_date, end_year=end_year, index=index, compression=args.compress or "infer",
+        )
+    except ValueError as e:
+        raise SystemExit(str(e))
+    for path in formats.values():
+        print(f"\n✓ Dynasty saved to: {path}")
+
+
+def run_search_command(args: argparse.Namespace) -> None:
+    """Search for a dynasty meeting the given criteria and optionally export it."""
+    cfg, params = dynasty_settings_from_args(args)
+    criteria = DynastyCriteria(
+        min_playable_males=args.min_playable_males,
+        min_surviving_branches=args.min_branches,
+        min_total_people=args.min_people,
+        max_total_people=args.max_people,
+        min_generations=args.min_generations,
+        min_alive_at_end=args.min_alive,
+    )
+    budget = SearchBudget(max_candidates=args.budget, time_limit=args.time_limit)
+    result = find_dynasty(criteria, budget, cfg=cfg, params=params, seed=args.seed, workers=args.workers)
+
+    print(f"Evaluated {result.candidates} candidates in {result.elapsed:.1f}s (master seed {result.master_seed})")
+    print(f"  Acceptance rate: {result.acceptance_rate:.1%} ({result.accepted} matched)")
+    if result.matched:
+        print(f"  Match: candidate {result.best.index}, seed {result.best.seed}")
+    else:
+        print(f"  No match (stopped by {result.stopped_by}); closest: candidate {result.best.index}, seed {result.best.seed}")
+    print(f"  Measures: {result.best.measures}")
+
+    stats = calculate_dynasty_stats(result.dynasty, params.end_date)
+    print_dynasty_stats(stats)
+    export_from_args(result.dynasty, params.dynasty_name, params.culture, params.end_date, args)
+    if args.snapshot:
+        save_snapshot(result.dynasty, args.snapshot, cfg=cfg, params=params, seed=result.best.seed)
+        print(f"\n✓ Snapshot saved to: {args.snapshot}")
+
+
+def run_snapshot_command(args: argparse.Namespace) -> None:
+    """Print the stats of a saved snapshot and re-export it without regenerating."""
+    try:
+        snapshot = load_snapshot(args.path)
+    except (OSError, ValueError) as e:
+        raise SystemExit(str(e))
+    with snapshot:
+        params = snapshot.params
+        dynasty = snapshot.generations()
+        print(f"Snapshot {args.path}: {len(snapshot)} people over {len(dynasty)} generations (seed {snapshot.seed})")
+        if params is None:
+            raise SystemExit("Snapshot has no dynasty parameters to export or compute stats with")
+        print_dynasty_stats(calculate_dynasty_stats(dynasty, params.end_date))
+        export_from_args(dynasty, params.dynasty_name, params.culture, params.end_date, args)
+
+
+def run_import_command(args: argparse.Namespace) -> None:
+    """Load a GEDCOM file, print its stats and re-export it."""
+    end_date = convert_calendar_years_to_days(args.end_year)
+    try:
+        imported = import_from_gedcom(args.path, end_date)
+    except (OSError, ValueError) as e:
+        raise SystemExit(str(e))
+    dynasty = imported.generations
+    if not dynasty:
+        raise SystemExit(f"{args.path} has no individuals")
+    dynasty_name = args.dynasty_name or dynasty[0][0].dynasty_name or "Dynasty"
+    print(f"Imported {args.path}: {len(imported.people)} people, {imported.families} families, {len(dynasty)} generations")
+    print_dynasty_stats(calculate_dynasty_stats(dynasty, end_date))
+    export_from_args(dynasty, dynasty_name, args.culture, end_date, args)
+
+
+def run_lineage_command(args: argparse.Namespace) -> None:
+    """Regenerate a dynasty from its seed and answer lineage queries about its members."""
+    cfg, params = dynasty_settings_from_args(args)
+    dynasty = generate_dynasty_from_seed(cfg, params, args.seed)
+    index = LineageIndex(dynasty)
+    print(f"Dynasty from seed {args.seed}: {len(index)} members over {len(dynasty)} generations")
+    
+    def label(person) -> str:
+        return f"#{index.number(person)} {person.name} ({person.birth_year}-{person.death_year})"
+    
+    try:
+        if args.relate:
+            a, b = (index.person(n) for n in args.relate)
+            relationship = index.relationship(a, b)
+            print(f"\n{label(a)} is the {relationship.describe()} of {label(b)}")
+            if relationship.related:
+                print(f"  Common ancestor: {label(relationship.ancestor)}")
+                print(f"  Degree of kinship: {relationship.degree}")
+        if args.descendants_of is not None:
+            person = index.person(args.descendants_of)
+            year = args.on_year if args.on_year is not None else args.end_year
+            alive = index.descendants_alive_on(person, convert_calendar_years_to_days(year))
+            print(f"\n{label(person)}: {index.descendant_count(person)} descendants, {len(alive)} alive at the start of {year}")
+            for descendant in alive:
+                print(f"  {label(descendant)}")
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="CK3 Dynasty Generator. Runs the interactive wizard when no command is given.")
+    parser.add_argument("--profile", action="store_true", help="Print per-stage timings and counters when done")
+    parser.add_argument("--profile-json", default=None, help="Also write the timings and counters as JSON to this file")
+    subparsers = parser.add_subparsers(dest="command")
+
+    ensemble = subparsers.add_parser("ensemble", help="Generate many dynasties from one master seed")
+    add_dynasty_arguments(ensemble)
+    ensemble.add_argument("--runs", type=int, required=True, help="Number of dynasties to generate")
+    ensemble.add_argument("--seed", type=int, default=0, help="Master seed")
+    ensemble.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 1 = in-process)")
+    ensemble.add_argument("--output", default=None, help="Write per-run stats as JSON lines to this file")
+    ensemble.add_argument("--report", default=None, help="Write quantiles, means and histograms as JSON to this file")
+
+    search = subparsers.add_parser("search", help="Generate candidates in parallel until one meets the criteria")
+    add_dynasty_arguments(search)
+    search.add_argument(
+        "--min-playable-males", "--min-living-males", type=int, default=None,
+        help="Living male dynasty members younger than the playable age limit at the end",
+    )
+    search.add_argument("--min-branches", type=int, default=None, help="Surviving branches in some generation")
+    search.add_argument("--min-people", type=int, default=None, help="Minimum dynasty members")
+    search.add_argument("--max-people", type=int, default=None, help="Maximum dynasty members")
+    search.add_argument("--min-generations", type=int, default=None)
+    search.add_argument("--min-alive", type=int, default=None, help="Living dynasty members at the end")
+    search.add_argument("--budget", type=int, default=1000, help="Maximum candidates to generate")
+    search.add_argument("--time-limit", type=float, default=None, help="Stop after this many seconds")
+    search.add_argument("--seed", type=int, default=None, help="Master seed (default: random)")
+    search.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 1 = in-process)")
+    add_export_arguments(search)
+    search.add_argument("--snapshot", default=None, help="Save the found dynasty as a binary snapshot to this file")
+
+    snapshot = subparsers.add_parser("snapshot", help="Show the stats of a saved snapshot and re-export it")
+    snapshot.add_argument("path", help="Snapshot file written by search --snapshot")
+    add_export_arguments(snapshot)
+
+    gedcom_import = subparsers.add_parser("import", help="Load a GEDCOM file, show its stats and re-export it")
+    gedcom_import.add_argument("path", help="GEDCOM file (e.g. one written by the wizard)")
+    gedcom_import.add_argument("--end-year", type=int, required=True, help="Simulation end year the tree was generated to")
+    gedcom_import.add_argument("--dynasty-name", default=None, help="Dynasty name for CK3 IDs (default: the founder's surname)")
+    gedcom_import.add_argument("--culture", default="chinese")
+    add_export_arguments(gedcom_import)
+
+    lineage = subparsers.add_parser("lineage", help="Query ancestry and relationships in the dynasty a seed generates")
+    add_dynasty_arguments(lineage)
+    lineage.add_argument("--seed", type=int, required=True, help="Run seed (as printed by search or ensemble)")
+    lineage.add_argument("--relate", type=int, nargs=2, metavar=("A", "B"), help="Describe how member A relates to member B")
+    lineage.add_argument("--descendants-of", type=int, default=None, metavar="N", help="List member N's descendants alive in --on-year")
+    lineage.add_argument("--on-year", type=int, default=None, help="Year for --descendants-of (default: end year)")
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    args = build_arg_parser().parse_args(argv)
+    profiling = args.profile or args.profile_json
+    if profiling:
+        instrumentation.enable()
+    try:
+        if args.command == "ensemble":
+            run_ensemble_command(args)
+        elif args.command == "search":
+            run_search_command(args)
+        elif args.command == "lineage":
+            run_lineage_command(args)
+        elif args.command == "snapshot":
+            run_snapshot_command(args)
+        elif args.command == "import":
+            run_import_command(args)
+        else:
+            run_wizard()
+    finally:
+        if profiling:
+            print(instrumentation.format_report())
+            if args.profile_json:
+                instrumentation.save(args.profile_json)
+                print(f"Profile written to: {args.profile_json}")
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,10 @@
 from .person import Person
 from .generation_type import GenerationType
+from .person_table import PersonTable, PersonView
 
 __all__ = [
     "Person",
     "GenerationType",
+    "PersonTable",
+    "PersonView",
 ]
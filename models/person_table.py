@@ -0,0 +1,327 @@
+"""
+Columnar person storage.
+
+PersonTable keeps every person of a dynasty in typed arrays (one column per Person
+field, parent/spouse/children links as row indices) with interned name strings.
+PersonView is a two-slot handle onto one row that exposes the same attribute API as
+models.person.Person, so generation, metrics and exporters run on either.
+
+Views are cached weakly per row: while any view of a row is alive, table.view(row)
+returns that same object, so code keying dicts by id(person) keeps working.
+"""
+
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import weakref
+
+from models.person import Person
+
+NO_ROW = -1
+# Sentinel for Optional[int] day columns (date_of_birth, date_of_death, date_of_marriage)
+MISSING_DAY = -(2 ** 31)
+
+# column name -> array typecode
+_COLUMNS = {
+    "given_name": "i",      # index into PersonTable.strings
+    "dynasty_name": "i",    # index into PersonTable.strings, NO_ROW for None
+    "female": "b",
+    "birth_year": "i",
+    "death_year": "i",
+    "is_living_at_end": "b",
+    "skip_generation": "b",
+    "father": "i",
+    "mother": "i",
+    "spouse": "i",
+    "date_of_birth": "i",
+    "date_of_death": "i",
+    "date_of_marriage": "i",
+    "mother_age_at_first_child": "h",
+    # children are a singly linked list: first/last child of a row, next sibling of a row
+    "first_child": "i",
+    "last_child": "i",
+    "next_sibling": "i",
+}
+
+
+def _day_in(value: Optional[int]) -> int:
+    return MISSING_DAY if value is None else value
+
+
+def _day_out(value: int) -> Optional[int]:
+    return None if value == MISSING_DAY else value
+
+
+class PersonTable:
+    """Struct-of-arrays store for Person records."""
+
+    def __init__(self):
+        for name, typecode in _COLUMNS.items():
+            setattr(self, name, array(typecode))
+        self.strings: List[str] = []
+        self._string_index: Dict[str, int] = {}
+        self._views: "weakref.WeakValueDictionary[int, PersonView]" = weakref.WeakValueDictionary()
+
+    def __len__(self) -> int:
+        return len(self.birth_year)
+
+    def __iter__(self) -> Iterator[PersonView]:
+        for row in range(len(self)):
+            yield self.view(row)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_views"]
+        del state["_string_index"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._string_index = {s: i for i, s in enumerate(self.strings)}
+        self._views = weakref.WeakValueDictionary()
+
+    def intern(self, value: Optional[str]) -> int:
+        """Return the string-table index for `value` (NO_ROW for None)."""
+        if value is None:
+            return NO_ROW
+        index = self._string_index.get(value)
+        if index is None:
+            index = len(self.strings)
+            self.strings.append(value)
+            self._string_index[value] = index
+        return index
+
+    def view(self, row: int) -> PersonView:
+        """Return the (cached) view of a row."""
+        view = self._views.get(row)
+        if view is None:
+            view = PersonView(self, row)
+            self._views[row] = view
+        return view
+
+    def row_of(self, person: Optional[PersonView]) -> int:
+        """Row index of a view of this table (NO_ROW for None)."""
+        if person is None:
+            return NO_ROW
+        if not isinstance(person, PersonView) or person._table is not self:
+            raise TypeError("Only views of the same PersonTable can be linked")
+        return person._row
+
+    def add(
+        self,
+        given_name: str,
+        female: bool,
+        birth_year: int,
+        death_year: int,
+        is_living_at_end: bool,
+        dynasty_name: str | None = None,
+        skip_generation: bool = False,
+        father: PersonView | None = None,
+        mother: PersonView | None = None,
+        spouse: PersonView | None = None,
+        date_of_birth: Optional[int] = None,
+        date_of_death: Optional[int] = None,
+        date_of_marriage: Optional[int] = None,
+        mother_age_at_first_child: int = -1,
+        children: Sequence[PersonView] = (),
+    ) -> PersonView:
+        """Append a person (same arguments as the Person dataclass) and return its view."""
+        row = len(self)
+        self.given_name.append(self.intern(given_name))
+        self.dynasty_name.append(self.intern(dynasty_name))
+        self.female.append(bool(female))
+        self.birth_year.append(birth_year)
+        self.death_year.append(death_year)
+        self.is_living_at_end.append(bool(is_living_at_end))
+        self.skip_generation.append(bool(skip_generation))
+        self.father.append(self.row_of(father))
+        self.mother.append(self.row_of(mother))
+        self.spouse.append(self.row_of(spouse))
+        self.date_of_birth.append(_day_in(date_of_birth))
+        self.date_of_death.append(_day_in(date_of_death))
+        self.date_of_marriage.append(_day_in(date_of_marriage))
+        self.mother_age_at_first_child.append(mother_age_at_first_child)
+        self.first_child.append(NO_ROW)
+        self.last_child.append(NO_ROW)
+        self.next_sibling.append(NO_ROW)
+        view = self.view(row)
+        if children:
+            view.children = children
+        return view
+
+    def children_rows(self, row: int) -> List[int]:
+        rows = []
+        child = self.first_child[row]
+        while child != NO_ROW:
+            rows.append(child)
+            child = self.next_sibling[child]
+        return rows
+
+    def set_children_rows(self, row: int, rows: Sequence[int]) -> None:
+        for child, sibling in zip(rows, list(rows[1:]) + [NO_ROW]):
+            self.next_sibling[child] = sibling
+        self.first_child[row] = rows[0] if rows else NO_ROW
+        self.last_child[row] = rows[-1] if rows else NO_ROW
+
+    @classmethod
+    def from_dynasty(cls, dynasty: List[List[Person]]) -> Tuple[PersonTable, List[List[PersonView]]]:
+        """
+        Copy a Person-object dynasty (members and their spouses) into a new table.
+
+        Returns the table and the same dynasty shape made of views.
+        """
+        table = cls()
+        rows: Dict[int, int] = {}
+        people: List[Person] = []
+
+        def add(person: Person) -> None:
+            if id(person) not in rows:
+                rows[id(person)] = len(people)
+                people.append(person)
+                table.add(
+                    given_name=person.given_name,
+                    female=person.female,
+                    birth_year=person.birth_year,
+                    death_year=person.death_year,
+                    is_living_at_end=person.is_living_at_end,
+                    dynasty_name=person.dynasty_name,
+                    skip_generation=person.skip_generation,
+                    date_of_birth=person.date_of_birth,
+                    date_of_death=person.date_of_death,
+                    date_of_marriage=person.date_of_marriage,
+                    mother_age_at_first_child=person.mother_age_at_first_child,
+                )
+
+        for generation in dynasty:
+            for person in generation:
+                add(person)
+                if person.spouse is not None:
+                    add(person.spouse)
+
+        def row(person: Optional[Person]) -> int:
+            return NO_ROW if person is None else rows.get(id(person), NO_ROW)
+
+        for r, person in enumerate(people):
+            table.father[r] = row(person.father)
+            table.mother[r] = row(person.mother)
+            table.spouse[r] = row(person.spouse)
+            table.set_children_rows(r, [rows[id(c)] for c in person.children if id(c) in rows])
+
+        view_dynasty = [[table.view(rows[id(p)]) for p in generation] for generation in dynasty]
+        return table, view_dynasty
+
+
+def _view_of(table: PersonTable, row: int) -> PersonView:
+    return table.view(row)
+
+
+def _link_property(column: str) -> property:
+    def getter(self: PersonView) -> Optional[PersonView]:
+        row = getattr(self._table, column)[self._row]
+        return None if row == NO_ROW else self._table.view(row)
+
+    def setter(self: PersonView, value: Optional[PersonView]) -> None:
+        getattr(self._table, column)[self._row] = self._table.row_of(value)
+
+    return property(getter, setter)
+
+
+def _value_property(column: str, cast=None) -> property:
+    def getter(self: PersonView):
+        value = getattr(self._table, column)[self._row]
+        return cast(value) if cast else value
+
+    def setter(self: PersonView, value) -> None:
+        getattr(self._table, column)[self._row] = value
+
+    return property(getter, setter)
+
+
+def _day_property(column: str) -> property:
+    def getter(self: PersonView) -> Optional[int]:
+        return _day_out(getattr(self._table, column)[self._row])
+
+    def setter(self: PersonView, value: Optional[int]) -> None:
+        getattr(self._table, column)[self._row] = _day_in(value)
+
+    return property(getter, setter)
+
+
+def _string_property(column: str) -> property:
+    def getter(self: PersonView) -> Optional[str]:
+        index = getattr(self._table, column)[self._row]
+        return None if index == NO_ROW else self._table.strings[index]
+
+    def setter(self: PersonView, value: Optional[str]) -> None:
+        getattr(self._table, column)[self._row] = self._table.intern(value)
+
+    return property(getter, setter)
+
+
+class PersonView:
+    """
+    Lightweight handle onto one PersonTable row with the Person attribute API.
+
+    `children` returns a tuple: assign a whole new sequence to change it.
+    """
+
+    __slots__ = ("_table", "_row", "__weakref__")
+
+    def __init__(self, table: PersonTable, row: int):
+        self._table = table
+        self._row = row
+
+    def __reduce__(self):
+        return (_view_of, (self._table, self._row))
+
+    def __repr__(self) -> str:
+        return f"PersonView(row={self._row}, name={self.name!r})"
+
+    @property
+    def table(self) -> PersonTable:
+        return self._table
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    given_name = _string_property("given_name")
+    dynasty_name = _string_property("dynasty_name")
+    female = _value_property("female", bool)
+    birth_year = _value_property("birth_year")
+    death_year = _value_property("death_year")
+    is_living_at_end = _value_property("is_living_at_end", bool)
+    skip_generation = _value_property("skip_generation", bool)
+
+    father = _link_property("father")
+    mother = _link_property("mother")
+    spouse = _link_property("spouse")
+
+    date_of_birth = _day_property("date_of_birth")
+    date_of_death = _day_property("date_of_death")
+    date_of_marriage = _day_property("date_of_marriage")
+
+    mother_age_at_first_child = _value_property("mother_age_at_first_child")
+
+    @property
+    def children(self) -> Tuple[PersonView, ...]:
+        return tuple(self._table.view(r) for r in self._table.children_rows(self._row))
+
+    @children.setter
+    def children(self, value: Sequence[PersonView]) -> None:
+        self._table.set_children_rows(self._row, [self._table.row_of(c) for c in value])
+
+    @property
+    def name(self) -> str:
+        """Return full name combining given name and dynasty name."""
+        if self.dynasty_name:
+            return f"{self.given_name} {self.dynasty_name}"
+        return self.given_name
+
+    @property
+    def part_of_dynasty(self) -> bool:
+        """Check if person is part of the main dynasty."""
+        return self.dynasty_name is not None
+
+
+__all__ = ["PersonTable", "PersonView"]
@@ -1,9 +1,10 @@
-from .simulation import generate_dynasty
+from .simulation import generate_dynasty, iter_dynasty
 from .factory import PersonFactory
 from .utils import draw_age_at_death
 
 __all__ = [
     "generate_dynasty",
+    "iter_dynasty",
     "PersonFactory",
     "children_gen_utils",
     "draw_age_at_death",
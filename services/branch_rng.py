@@ -0,0 +1,41 @@
+"""
+Counter-based RNG keys for people in a dynasty tree.
+
+Every person has a 64-bit key derived from their path from the founder
+(founder -> child index -> ...). A father's children are drawn from an RNG seeded
+by (phase seed, father's key, branch salt), so they do not depend on the order in
+which fathers are expanded. Any subtree can be regenerated, or generated in another
+process, on its own and gives the same people.
+
+The mixing function is SplitMix64's finalizer: cheap in pure Python and good enough
+to decorrelate neighbouring keys.
+"""
+
+from __future__ import annotations
+
+_MASK64 = (1 << 64) - 1
+
+# Key of the founder, and the salt of branches that were never rerolled
+ROOT_KEY = 0
+DEFAULT_SALT = 0
+
+
+def mix64(x: int) -> int:
+    """SplitMix64 finalizer: a bijective 64-bit hash."""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def child_key(parent_key: int, index: int) -> int:
+    """Key of the child at `index` (birth order) of the person with parent_key."""
+    return mix64(mix64(parent_key) ^ (index + 1))
+
+
+def person_seed(phase_seed: int, key: int, salt: int = DEFAULT_SALT) -> int:
+    """Seed for the RNG that generates the children (and wife) of the person with key."""
+    return mix64(phase_seed ^ mix64(key ^ mix64(salt)))
+
+
+__all__ = ["DEFAULT_SALT", "ROOT_KEY", "child_key", "mix64", "person_seed"]
@@ -0,0 +1,68 @@
+"""
+Precomputed calendar for absolute days (day 1 is 1 January of year 1, no leap years).
+
+The (month, day) of each of the DAYS_IN_YEAR days of the year, and the formatted
+CK3 (".M.D") and GEDCOM ("D MON ") pieces, are tables built at import. A
+conversion is then a divmod and a lookup. days_to_dates converts a whole array
+of days at once with NumPy, which is only needed for that function.
+"""
+
+from __future__ import annotations
+from typing import Tuple
+
+from config.other_constants import DAYS_IN_MONTH, DAYS_IN_YEAR
+
+GEDCOM_MONTHS = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC")
+
+# Indexed by 0-based day of the year
+MONTH_OF_DAY: Tuple[int, ...] = tuple(m + 1 for m, dim in enumerate(DAYS_IN_MONTH) for _ in range(dim))
+DAY_OF_MONTH: Tuple[int, ...] = tuple(d + 1 for dim in DAYS_IN_MONTH for d in range(dim))
+# 0-based day of the year on which each month starts
+_MONTH_START = tuple(sum(DAYS_IN_MONTH[:m]) for m in range(12))
+_CK3_SUFFIX = tuple(f".{m}.{d}" for m, d in zip(MONTH_OF_DAY, DAY_OF_MONTH))
+_GEDCOM_PREFIX = tuple(f"{d} {GEDCOM_MONTHS[m - 1]} " for m, d in zip(MONTH_OF_DAY, DAY_OF_MONTH))
+
+
+def date_to_day(year: int, month: int, day: int) -> int:
+    """Absolute day of a (year, month, day) date."""
+    return (year - 1) * DAYS_IN_YEAR + _MONTH_START[month - 1] + day
+
+
+def day_to_date(absolute_day: int) -> Tuple[int, int, int]:
+    """(year, month, day) of an absolute day."""
+    year, day_of_year = divmod(absolute_day - 1, DAYS_IN_YEAR)
+    return year + 1, MONTH_OF_DAY[day_of_year], DAY_OF_MONTH[day_of_year]
+
+
+def ck3_date(absolute_day: int) -> str:
+    """CK3 date string of an absolute day, e.g. '1066.9.15'."""
+    year, day_of_year = divmod(absolute_day - 1, DAYS_IN_YEAR)
+    return f"{year + 1}{_CK3_SUFFIX[day_of_year]}"
+
+
+def gedcom_date(absolute_day: int) -> str:
+    """GEDCOM date string of an absolute day, e.g. '15 SEP 1066'."""
+    year, day_of_year = divmod(absolute_day - 1, DAYS_IN_YEAR)
+    return f"{_GEDCOM_PREFIX[day_of_year]}{year + 1}"
+
+
+def days_to_dates(absolute_days):
+    """Vectorized day_to_date: (years, months, days) int arrays for an array of absolute days."""
+    import numpy as np
+
+    years, day_of_year = np.divmod(np.asarray(absolute_days, dtype=np.int64) - 1, DAYS_IN_YEAR)
+    months = np.asarray(MONTH_OF_DAY, dtype=np.int64)[day_of_year]
+    days = np.asarray(DAY_OF_MONTH, dtype=np.int64)[day_of_year]
+    return years + 1, months, days
+
+
+__all__ = [
+    "DAY_OF_MONTH",
+    "GEDCOM_MONTHS",
+    "MONTH_OF_DAY",
+    "ck3_date",
+    "date_to_day",
+    "day_to_date",
+    "days_to_dates",
+    "gedcom_date",
+]
@@ -1,101 +1,193 @@
 from __future__ import annotations
-from typing import List
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Sequence, Tuple
+import math
 import random
 
 from config.other_constants import CHILD_BY_MOTHER_AGE_PD, MOTHER_FERTILITY_WINDOW, MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS, DAYS_IN_YEAR
+from services.instrumentation import count, timed
 from services.utils import convert_years_to_days_duration, convert_calendar_years_to_days
 
-"""
-Takes in start and stop ages of the mother and a k number of children to generate and returns a sorted list of absolute birth days for the children.
-This mirrors draw_children_birth_years_simple: returns absolute days with proper sibling gap enforcement.
-"""
-def draw_children_birth_years_exact_k(
-    *,
-    rng: random.Random,
-    k: int,
-    start_age: int,
-    stop_age: int,
-    mother_birth_year: int,
-) -> List[int]:
+# Number of (start_age, stop_age, k, gap) tables kept by get_exact_k_table
+EXACT_K_TABLE_CACHE_SIZE = 512
+
+_NEG_INF = float("-inf")
+
+
+def _logaddexp(a: float, b: float) -> float:
+    if a == _NEG_INF:
+        return b
+    if b == _NEG_INF:
+        return a
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+class ExactKTable(NamedTuple):
     """
-    Draw exactly k child birth ages within [start_age, stop_age], enforcing a minimum
-    gap of MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS between sibling births.
+    Precompiled tables for the exact-k sibling sampler.
 
-    Sampling is exact from the conditional distribution:
-      P(S) ∝ ∏_{age in S} CHILD_BY_MOTHER_AGE_PD[age]
-    over all valid sets S of size k satisfying the gap constraint.
+    ages:      ordered ages in the window with positive weight
+    next_idx:  index of the first age allowed after taking ages[i] (enforces the gap)
+    log_dp:    log_dp[i][t] = log of the total weight of choosing t children from ages[i:]
+    take_prob: take_prob[i][t] = probability of taking ages[i] when t children remain
+    """
+    ages: Tuple[int, ...]
+    next_idx: Tuple[int, ...]
+    log_dp: Tuple[Tuple[float, ...], ...]
+    take_prob: Tuple[Tuple[float, ...], ...]
+
+
+@lru_cache(maxsize=EXACT_K_TABLE_CACHE_SIZE)
+def get_exact_k_table(start_age: int, stop_age: int, k: int, min_gap_years: int = MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS) -> ExactKTable:
+    """
+    Build (or fetch from the LRU cache) the exact-k sampling table for a window.
+
+    The DP runs in log space, so long windows or large k cannot underflow to zero.
+    Raises ValueError if the window is empty or k children cannot be placed in it.
     """
     if k < 0:
         raise ValueError("k must be >= 0")
+    # Only reached on a cache miss
+    count("exact_k.tables_built")
 
     # Build ordered age list and weights for the allowed window.
     ages = [a for a in range(start_age, stop_age + 1) if a in CHILD_BY_MOTHER_AGE_PD and CHILD_BY_MOTHER_AGE_PD[a] > 0.0]
     n = len(ages)
 
-    if k == 0:
-        return []
-
     if n == 0:
         raise ValueError("No ages available in the given window with positive probability.")
 
-    w = [CHILD_BY_MOTHER_AGE_PD[a] for a in ages]
+    log_w = [math.log(CHILD_BY_MOTHER_AGE_PD[a]) for a in ages]
 
     # Precompute "next index" after taking age i (enforces the gap).
     next_idx = [0] * n
     for i, a in enumerate(ages):
-        cutoff = a + MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS
+        cutoff = a + min_gap_years
         j = i + 1
         while j < n and ages[j] < cutoff:
             j += 1
         next_idx[i] = j
 
-    # DP[i][t] = total weight of choosing t children from suffix starting at i.
+    # log_dp[i][t] = log total weight of choosing t children from suffix starting at i.
     # Recurrence:
     #   DP[i][t] = DP[i+1][t] + w[i] * DP[next_idx[i]][t-1]
-    DP = [[0.0] * (k + 1) for _ in range(n + 1)]
-    DP[n][0] = 1.0
+    log_dp = [[_NEG_INF] * (k + 1) for _ in range(n + 1)]
+    take_prob = [[0.0] * (k + 1) for _ in range(n)]
+    log_dp[n][0] = 0.0
     for i in range(n - 1, -1, -1):
-        DP[i][0] = 1.0
+        log_dp[i][0] = 0.0
         for t in range(1, k + 1):
-            skip = DP[i + 1][t]
-            take = w[i] * DP[next_idx[i]][t - 1]
-            DP[i][t] = skip + take
+            log_take = log_w[i] + log_dp[next_idx[i]][t - 1]
+            log_dp[i][t] = _logaddexp(log_dp[i + 1][t], log_take)
+            if log_dp[i][t] != _NEG_INF:
+                take_prob[i][t] = math.exp(log_take - log_dp[i][t])
 
-    total = DP[0][k]
-    if total == 0.0:
+    if log_dp[0][k] == _NEG_INF:
         raise ValueError(
             f"Impossible to place {k} children in [{start_age}, {stop_age}] "
-            f"with MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS={MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS}."
+            f"with MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS={min_gap_years}."
         )
 
-    # Sample using the DP as exact choice probabilities.
+    return ExactKTable(
+        ages=tuple(ages),
+        next_idx=tuple(next_idx),
+        log_dp=tuple(tuple(row) for row in log_dp),
+        take_prob=tuple(tuple(row) for row in take_prob),
+    )
+
+
+def sample_ages_from_table(table: ExactKTable, k: int, uniform: Callable[[], float]) -> List[int]:
+    """
+    Walk an ExactKTable and return k chosen ages in increasing order.
+    `uniform` is called once per visited age and must return a float in [0, 1).
+    """
+    ages, next_idx, take_prob = table.ages, table.next_idx, table.take_prob
+    n = len(ages)
+
+    # Sample using the DP as exact choice probabilities. Every reachable state with t > 0
+    # still has positive weight, so the walk always places exactly k children.
     chosen: List[int] = []
     i, t = 0, k
     while t > 0 and i < n:
-        skip = DP[i + 1][t]
-        take = w[i] * DP[next_idx[i]][t - 1]
-        denom = skip + take
-
-        # denom should be > 0 here, but guard anyway.
-        if denom <= 0.0:
-            break
-
-        if rng.random() < (take / denom):
+        if uniform() < take_prob[i][t]:
             chosen.append(ages[i])
             i = next_idx[i]
             t -= 1
         else:
             i += 1
 
-    # At this point, we should have exactly k.
-    if len(chosen) != k:
-        # This should be extremely rare unless floating-point underflow occurs.
-        raise RuntimeError(f"Sampling failed: expected {k} children, got {len(chosen)}")
+    return chosen
+
+
+"""
+Takes in start and stop ages of the mother and a k number of children to generate and returns a sorted list of absolute birth days for the children.
+This mirrors draw_children_birth_years_simple: returns absolute days with proper sibling gap enforcement.
+"""
+@timed("draw_children_birth_years_exact_k")
+def draw_children_birth_years_exact_k(
+    *,
+    rng: random.Random,
+    k: int,
+    start_age: int,
+    stop_age: int,
+    mother_birth_year: int,
+) -> List[int]:
+    """
+    Draw exactly k child birth ages within [start_age, stop_age], enforcing a minimum
+    gap of MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS between sibling births.
+
+    Sampling is exact from the conditional distribution:
+      P(S) ∝ ∏_{age in S} CHILD_BY_MOTHER_AGE_PD[age]
+    over all valid sets S of size k satisfying the gap constraint.
+    """
+    if k < 0:
+        raise ValueError("k must be >= 0")
+
+    if k == 0:
+        return []
+
+    table = get_exact_k_table(start_age, stop_age, k)
+    chosen = sample_ages_from_table(table, k, rng.random)
+    count("exact_k.samples")
 
     # Convert ages to actual birth years and then to absolute days with gap enforcement
-    birth_years = [mother_birth_year + age for age in sorted(chosen)]
+    birth_years = [mother_birth_year + age for age in chosen]
     return generate_birth_days_from_birth_years(birth_years, rng)
 
+
+"""
+Draws many families that share one (start_age, stop_age, k) key with a single table lookup.
+"""
+def draw_children_birth_years_exact_k_batch(
+    *,
+    rng: random.Random,
+    k: int,
+    start_age: int,
+    stop_age: int,
+    mother_birth_years: Sequence[int],
+) -> List[List[int]]:
+    """
+    Batch version of draw_children_birth_years_exact_k: one sorted list of absolute birth
+    days per entry of mother_birth_years. Consumes the RNG exactly like calling the single
+    version once per family, in order.
+    """
+    if k < 0:
+        raise ValueError("k must be >= 0")
+
+    if k == 0:
+        return [[] for _ in mother_birth_years]
+
+    table = get_exact_k_table(start_age, stop_age, k)
+    uniform = rng.random
+    families: List[List[int]] = []
+    for mother_birth_year in mother_birth_years:
+        chosen = sample_ages_from_table(table, k, uniform)
+        families.append(generate_birth_days_from_birth_years([mother_birth_year + age for age in chosen], rng))
+    return families
+
+
 """
 Takes in start and stop ages of the mother and a child_multiplier (the approximat number of children to generate) and returns a sortd list of birth days (ages) for the children.
 """
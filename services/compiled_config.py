@@ -0,0 +1,165 @@
+"""
+Compiled simulation config.
+
+compile_sim_config turns a SimConfig (with its FertilityConfig and MortalityConfig) plus
+the fixed distributions in config.other_constants into a CompiledSimConfig: validated
+ranges, Walker alias tables for every per-family draw, and a stable fingerprint.
+
+A CompiledSimConfig exposes `mortality`, `fertility` and `playable_character_age_max`
+like SimConfig, so PersonFactory and draw_age_at_death accept either.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, fields
+from typing import Dict, Union
+import hashlib
+import json
+
+from config.sim_config import SimConfig
+from config.fertility_config import FertilityConfig
+from config.mortality_config import MortalityConfig, MainlineMortalityConfig, NonMainlineMortilityConfig
+from config.other_constants import (
+    FATHER_AGE_OFFSET_PD,
+    MOTHER_AGE_AT_FIRST_CHILD_PD,
+    NUM_MAINLINE_CHILD_PD,
+)
+from services.sampling import AliasTable
+
+# Mortality profiles every compiled config carries
+MORTALITY_DEFAULT = "default"
+MORTALITY_MAINLINE = "mainline"
+MORTALITY_NON_MAINLINE = "non_mainline"
+
+
+@dataclass(frozen=True)
+class CompiledMortality:
+    """Validated copy of a MortalityConfig (same field names, so draw_age_at_death accepts it)."""
+    early_range: tuple[int, int]
+    normal_range: tuple[int, int]
+    early_probability: float
+
+    @classmethod
+    def compile(cls, mcfg: MortalityConfig) -> CompiledMortality:
+        name = type(mcfg).__name__
+        if not 0.0 <= mcfg.early_probability <= 1.0:
+            raise ValueError(f"{name}.early_probability must be in [0, 1], got {mcfg.early_probability}")
+        low, high = mcfg.normal_range
+        if not 0 <= low <= high:
+            raise ValueError(f"{name}.normal_range must satisfy 0 <= low <= high, got {mcfg.normal_range}")
+        low, high = mcfg.early_range
+        if mcfg.early_probability > 0.0 and not 0 <= low <= high:
+            raise ValueError(f"{name}.early_range must satisfy 0 <= low <= high, got {mcfg.early_range}")
+        return cls(
+            early_range=tuple(mcfg.early_range),
+            normal_range=tuple(mcfg.normal_range),
+            early_probability=float(mcfg.early_probability),
+        )
+
+
+@dataclass(frozen=True, eq=False)
+class CompiledSimConfig:
+    """
+    SimConfig compiled for sampling. Equality and hashing use the fingerprint.
+
+    mortality_profiles maps MORTALITY_* names to the config variant using that mortality;
+    all variants share the same alias tables and fingerprint.
+    """
+    source: SimConfig
+    mortality: CompiledMortality
+    fertility: FertilityConfig
+    playable_character_age_max: int
+    num_children: AliasTable
+    num_mainline_children: AliasTable
+    father_age_offset: AliasTable
+    mother_age_at_first_child: AliasTable
+    fingerprint: str
+    mortality_profiles: Dict[str, "CompiledSimConfig"]
+
+    def with_mortality_profile(self, profile: str) -> CompiledSimConfig:
+        """Return the variant of this config that uses the given MORTALITY_* profile."""
+        return self.mortality_profiles[profile]
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CompiledSimConfig) and other.fingerprint == self.fingerprint and other.mortality == self.mortality
+
+    def __hash__(self) -> int:
+        return hash((self.fingerprint, self.mortality))
+
+    def __repr__(self) -> str:
+        return f"CompiledSimConfig(fingerprint={self.fingerprint[:12]}, mortality={self.mortality})"
+
+
+def _describe(obj) -> dict:
+    """Canonical JSON-able description of a config dataclass (class name plus field values)."""
+    values = {}
+    for f in fields(obj):
+        value = getattr(obj, f.name)
+        if isinstance(value, dict):
+            value = sorted([k, v] for k, v in value.items())
+        elif hasattr(value, "__dataclass_fields__"):
+            value = _describe(value)
+        elif isinstance(value, tuple):
+            value = list(value)
+        values[f.name] = value
+    return {"class": type(obj).__name__, "fields": values}
+
+
+def config_fingerprint(cfg: SimConfig) -> str:
+    """Stable SHA-256 fingerprint of a SimConfig and the fixed distributions it is compiled with."""
+    description = {
+        "sim": _describe(cfg),
+        "num_mainline_child_pd": sorted(NUM_MAINLINE_CHILD_PD.items()),
+        "father_age_offset_pd": sorted(FATHER_AGE_OFFSET_PD.items()),
+        "mother_age_at_first_child_pd": sorted(MOTHER_AGE_AT_FIRST_CHILD_PD.items()),
+    }
+    encoded = json.dumps(description, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def compile_sim_config(cfg: SimConfig) -> CompiledSimConfig:
+    """
+    Validate a SimConfig and precompute its samplers.
+
+    Raises:
+        ValueError: If a distribution or mortality range is invalid
+    """
+    if cfg.playable_character_age_max <= 0:
+        raise ValueError(f"playable_character_age_max must be positive, got {cfg.playable_character_age_max}")
+
+    shared = dict(
+        source=cfg,
+        fertility=cfg.fertility,
+        playable_character_age_max=cfg.playable_character_age_max,
+        num_children=AliasTable.from_pd(cfg.fertility.num_children_pd),
+        num_mainline_children=AliasTable.from_pd(NUM_MAINLINE_CHILD_PD),
+        father_age_offset=AliasTable.from_pd(FATHER_AGE_OFFSET_PD),
+        mother_age_at_first_child=AliasTable.from_pd(MOTHER_AGE_AT_FIRST_CHILD_PD),
+        fingerprint=config_fingerprint(cfg),
+    )
+    profiles: Dict[str, CompiledSimConfig] = {}
+    for profile, mcfg in (
+        (MORTALITY_DEFAULT, cfg.mortality),
+        (MORTALITY_MAINLINE, MainlineMortalityConfig()),
+        (MORTALITY_NON_MAINLINE, NonMainlineMortilityConfig()),
+    ):
+        profiles[profile] = CompiledSimConfig(mortality=CompiledMortality.compile(mcfg), mortality_profiles=profiles, **shared)
+    return profiles[MORTALITY_DEFAULT]
+
+
+def ensure_compiled(cfg: Union[SimConfig, CompiledSimConfig]) -> CompiledSimConfig:
+    """Return cfg if it is already compiled, otherwise compile it."""
+    if isinstance(cfg, CompiledSimConfig):
+        return cfg
+    return compile_sim_config(cfg)
+
+
+__all__ = [
+    "CompiledMortality",
+    "CompiledSimConfig",
+    "MORTALITY_DEFAULT",
+    "MORTALITY_MAINLINE",
+    "MORTALITY_NON_MAINLINE",
+    "compile_sim_config",
+    "config_fingerprint",
+    "ensure_compiled",
+]
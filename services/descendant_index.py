@@ -0,0 +1,88 @@
+"""
+Descendant index for a generated dynasty.
+
+DescendantIndex is built bottom-up in one pass over the generations in reverse, so
+each person's figures come from their children's and nothing is rescanned. Lookups
+are by identity and O(1); there is no recursion, so deep lines are fine.
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Sequence
+
+from models.person import Person
+
+
+class DescendantIndex:
+    """
+    Per-person descendant figures for one dynasty.
+
+    For every person: living descendants at the end date (not counting themselves),
+    subtree size (counting themselves) and max depth (generations below them, 0 for
+    people without children). A person heads a surviving branch if they have at least
+    one living descendant.
+
+    Every child of an indexed person must be in the dynasty, as generate_dynasty's
+    output is.
+    """
+
+    __slots__ = ("_slot", "_living", "_size", "_depth")
+
+    def __init__(self, dynasty: Sequence[Sequence[Person]]):
+        self._slot: Dict[int, int] = {}
+        for generation in dynasty:
+            for person in generation:
+                self._slot[id(person)] = len(self._slot)
+
+        n = len(self._slot)
+        self._living: List[int] = [0] * n
+        self._size: List[int] = [1] * n
+        self._depth: List[int] = [0] * n
+
+        slot, living, size, depth = self._slot, self._living, self._size, self._depth
+        # Children are finished before their parents
+        for generation in reversed(dynasty):
+            for person in generation:
+                children = person.children
+                if not children:
+                    continue
+                i = slot[id(person)]
+                person_living = person_size = person_depth = 0
+                for child in children:
+                    c = slot[id(child)]
+                    person_living += living[c] + (1 if child.is_living_at_end else 0)
+                    person_size += size[c]
+                    if depth[c] >= person_depth:
+                        person_depth = depth[c] + 1
+                living[i] = person_living
+                size[i] += person_size
+                depth[i] = person_depth
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def __contains__(self, person: Person) -> bool:
+        return id(person) in self._slot
+
+    def living_descendants(self, person: Person) -> int:
+        """Descendants of person alive at the end date (not counting person)."""
+        return self._living[self._slot[id(person)]]
+
+    def subtree_size(self, person: Person) -> int:
+        """Number of people in person's subtree, person included."""
+        return self._size[self._slot[id(person)]]
+
+    def max_depth(self, person: Person) -> int:
+        """Generations below person (0 if they have no children)."""
+        return self._depth[self._slot[id(person)]]
+
+    def has_living_descendant(self, person: Person) -> bool:
+        """True if person heads a surviving branch."""
+        return self._living[self._slot[id(person)]] > 0
+
+    def surviving_branches(self, generation: Sequence[Person]) -> int:
+        """How many people in generation have a living descendant."""
+        living, slot = self._living, self._slot
+        return sum(1 for p in generation if living[slot[id(p)]] > 0)
+
+
+__all__ = ["DescendantIndex"]
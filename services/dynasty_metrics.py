@@ -5,9 +5,11 @@ Provides functions to calculate comprehensive statistics about a generated dynas
 including generational breakdowns, age gaps, and character counts.
 """
 
-from typing import List
+from typing import List, Optional
 from models.person import Person
 from config.other_constants import DAYS_IN_YEAR
+from services.descendant_index import DescendantIndex
+from services.instrumentation import timed
 from services.utils import convert_calendar_days_to_years
 
 
@@ -16,30 +18,34 @@ def has_living_descendant(person: Person) -> bool:
     Check if a person has at least one living descendant (child) at the end of the simulation.
     This does NOT count the person themselves - only their actual descendants.
     
+    For many people at once, build a DescendantIndex instead.
+    
     Args:
         person: The person to check
     
     Returns:
         True if the person has at least one living descendant, False otherwise
     """
-    # Check if any child is alive
-    for child in person.children:
-        if child.is_living_at_end:
-            return True
-        # Check if this child has living descendants
-        if has_living_descendant(child):
+    # Explicit stack: deep lines would exceed the recursion limit
+    stack = list(person.children)
+    while stack:
+        descendant = stack.pop()
+        if descendant.is_living_at_end:
             return True
+        stack.extend(descendant.children)
     
     return False
 
 
-def calculate_dynasty_stats(dynasty: List[List[Person]], end_date: int) -> dict:
+@timed("calculate_dynasty_stats")
+def calculate_dynasty_stats(dynasty: List[List[Person]], end_date: int, index: Optional[DescendantIndex] = None) -> dict:
     """
     Calculate comprehensive statistics from the dynasty structure.
     
     Args:
         dynasty: List of generations, each containing a list of persons
         end_date: Simulation end date (in absolute days) used to determine character ages
+        index: DescendantIndex of the dynasty (built here if not given)
     
     Returns:
         Dictionary containing overall and generation-level statistics
@@ -64,6 +70,9 @@ def calculate_dynasty_stats(dynasty: List[List[Person]], end_date: int) -> dict:
     total_births = 0
     total_deaths = 0
     
+    if index is None:
+        index = DescendantIndex(dynasty)
+    
     # Track young males (< 30 years old at end_date) across all generations
     end_year = convert_calendar_days_to_years(end_date)
     
@@ -103,7 +112,7 @@ def calculate_dynasty_stats(dynasty: List[List[Person]], end_date: int) -> dict:
             gen_stats["max_age_gap"] = 0
         
         # Count surviving branches (people with at least one living descendant)
-        surviving_branches = sum(1 for p in generation if has_living_descendant(p))
+        surviving_branches = index.surviving_branches(generation)
         gen_stats["surviving_branches"] = surviving_branches
         
         # Count young males in this generation
@@ -161,12 +170,15 @@ def print_dynasty_stats(stats: dict):
     print("=" * 80)
 
 
-def print_dynasty_tree(dynasty: List[List[Person]], depth: int = 2):
-    """Print a simplified dynasty tree structure."""
+def print_dynasty_tree(dynasty: List[List[Person]], depth: int = 2, index: Optional[DescendantIndex] = None):
+    """Print a simplified dynasty tree structure, with descendant counts from index."""
     print("\n" + "=" * 80)
     print("DYNASTY TREE (limited depth for readability)")
     print("=" * 80)
     
+    if index is None:
+        index = DescendantIndex(dynasty)
+    
     def print_person(person: Person, indent: int, max_depth: int):
         if indent > max_depth:
             return
@@ -175,7 +187,11 @@ def print_dynasty_tree(dynasty: List[List[Person]], depth: int = 2):
         living = "[D]" if person.death_year < 10000 else "[L]"
         gender = "[M]" if not person.female else "[F]"
         
-        print(f"{prefix}{person.name} {gender} ({person.birth_year}-{person.death_year}) {living}")
+        descendants = ""
+        if person.children:
+            descendants = f" - {index.subtree_size(person) - 1} descendants, {index.living_descendants(person)} living"
+        
+        print(f"{prefix}{person.name} {gender} ({person.birth_year}-{person.death_year}) {living}{descendants}")
         
         for child in person.children[:3]:  # Limit to 3 children for readability
             print_person(child, indent + 1, max_depth)
@@ -0,0 +1,158 @@
+"""
+Ensemble runs: many independent dynasties from one master seed.
+
+Each run gets its own seed derived from (master_seed, run_index), so results do not
+depend on how runs are spread across worker processes. Results are streamed back in
+run order as compact records (a stats dict or a pickled dynasty).
+"""
+
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Iterator, List, Optional
+import hashlib
+import os
+import pickle
+import random
+
+from config.sim_config import SimConfig
+from models.person import Person
+from services.simulation import generate_dynasty, iter_dynasty
+from services.observers import StatsAccumulator
+
+RESULT_STATS = "stats"
+RESULT_DYNASTY = "dynasty"
+
+
+@dataclass(frozen=True)
+class DynastyParams:
+    """Everything generate_dynasty needs besides the config and the RNG."""
+    birth_year: int
+    male_only_start_date: int
+    normal_start_date: int
+    end_date: int
+    dynasty_name: str = "Dynasty"
+    culture: str = "chinese"
+
+
+@dataclass
+class EnsembleResult:
+    """One ensemble run. `stats` is set for RESULT_STATS, `dynasty_bytes` for RESULT_DYNASTY."""
+    index: int
+    seed: int
+    stats: Optional[dict] = None
+    dynasty_bytes: Optional[bytes] = None
+
+    def load_dynasty(self) -> List[List[Person]]:
+        """Unpickle the dynasty of a RESULT_DYNASTY run."""
+        if self.dynasty_bytes is None:
+            raise ValueError(f"Run {self.index} did not keep its dynasty")
+        return pickle.loads(self.dynasty_bytes)
+
+
+def derive_seed(master_seed: int, index: int) -> int:
+    """Derive an independent 64-bit seed for run `index` from the master seed."""
+    digest = hashlib.sha256(f"{master_seed}:{index}".encode("ascii")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def generate_dynasty_from_seed(cfg: SimConfig, params: DynastyParams, seed: int) -> List[List[Person]]:
+    """Generate the dynasty a given run seed produces."""
+    return generate_dynasty(
+        birth_year=params.birth_year,
+        male_only_start_date=params.male_only_start_date,
+        normal_start_date=params.normal_start_date,
+        end_date=params.end_date,
+        cfg=cfg,
+        rng=random.Random(seed),
+        dynasty_name=params.dynasty_name,
+        culture=params.culture,
+    )
+
+
+def stats_from_seed(cfg: SimConfig, params: DynastyParams, seed: int) -> dict:
+    """
+    calculate_dynasty_stats for the dynasty a run seed produces, without keeping it.
+
+    Stats are accumulated while generating and ancestors are released as the frontier
+    moves on, so memory follows the widest generation rather than the whole dynasty.
+    """
+    accumulator = StatsAccumulator(params.end_date)
+    for _ in iter_dynasty(
+        birth_year=params.birth_year,
+        male_only_start_date=params.male_only_start_date,
+        normal_start_date=params.normal_start_date,
+        end_date=params.end_date,
+        cfg=cfg,
+        rng=random.Random(seed),
+        dynasty_name=params.dynasty_name,
+        culture=params.culture,
+        max_generations=1000,
+        release_ancestors=True,
+        observers=(accumulator,),
+    ):
+        pass
+    return accumulator.result()
+
+
+def _run_one(index: int, *, cfg: SimConfig, params: DynastyParams, master_seed: int, result: str) -> EnsembleResult:
+    seed = derive_seed(master_seed, index)
+    if result == RESULT_DYNASTY:
+        dynasty = generate_dynasty_from_seed(cfg, params, seed)
+        return EnsembleResult(index=index, seed=seed, dynasty_bytes=pickle.dumps(dynasty, protocol=pickle.HIGHEST_PROTOCOL))
+    return EnsembleResult(index=index, seed=seed, stats=stats_from_seed(cfg, params, seed))
+
+
+def run_ensemble(
+    cfg: SimConfig,
+    n: int,
+    seed: int,
+    workers: Optional[int] = None,
+    *,
+    params: DynastyParams,
+    result: str = RESULT_STATS,
+    chunksize: Optional[int] = None,
+) -> Iterator[EnsembleResult]:
+    """
+    Run `n` independent dynasties and yield their results in run order.
+
+    Args:
+        cfg: Simulation config shared by every run
+        n: Number of runs
+        seed: Master seed; run i uses derive_seed(seed, i)
+        workers: Worker processes. None uses os.cpu_count(); 0 or 1 runs in-process
+        params: Dates, dynasty name and culture for every run
+        result: RESULT_STATS (calculate_dynasty_stats dict) or RESULT_DYNASTY (pickled dynasty)
+        chunksize: Runs handed to a worker at a time (default spreads ~4 chunks per worker)
+
+    Output is bit-identical for a given (cfg, params, n, seed) regardless of `workers`.
+    """
+    if result not in (RESULT_STATS, RESULT_DYNASTY):
+        raise ValueError(f"Unknown result kind '{result}'")
+    if n <= 0:
+        return
+
+    run = partial(_run_one, cfg=cfg, params=params, master_seed=seed, result=result)
+    if workers is not None and workers <= 1:
+        for index in range(n):
+            yield run(index)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, n // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(run, range(n), chunksize=chunksize)
+
+
+__all__ = [
+    "DynastyParams",
+    "EnsembleResult",
+    "RESULT_DYNASTY",
+    "RESULT_STATS",
+    "derive_seed",
+    "generate_dynasty_from_seed",
+    "stats_from_seed",
+    "run_ensemble",
+]
@@ -0,0 +1,233 @@
+"""
+Distribution statistics over many ensemble runs.
+
+EnsembleAggregator folds the stats dict of each run (see calculate_dynasty_stats)
+into fixed-size NumPy state: running moments and a bounded histogram per metric.
+Memory does not grow with the number of runs. Values are buffered and folded in
+chunks, so the per-run cost is a list append.
+
+Histograms are integer-valued with a fixed number of bins. When a value does not fit,
+neighbouring bins are merged pairwise and the bin width doubles. Quantiles are read
+from the histogram: exact while the width is 1, otherwise interpolated within a bin
+(error below one bin width).
+"""
+
+from __future__ import annotations
+import json
+import math
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Metrics taken from the top level of every stats dict
+RUN_METRICS = ("total_people", "total_alive_at_end", "young_males_count", "total_generations")
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+DEFAULT_BINS = 256
+CHUNK_SIZE = 4096
+# Two-sided 95% normal quantile for the mean's confidence interval
+Z_95 = 1.959963984540054
+
+
+class MetricDistribution:
+    """Running moments and a bounded integer histogram of one metric."""
+
+    def __init__(self, bins: int = DEFAULT_BINS):
+        if bins < 2 or bins % 2:
+            raise ValueError("bins must be an even number >= 2")
+        self._counts = np.zeros(bins, dtype=np.int64)
+        self._width = 1
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min: Optional[int] = None
+        self._max: Optional[int] = None
+        self._buffer: List[int] = []
+
+    def add(self, value: int) -> None:
+        self._buffer.append(value)
+        if len(self._buffer) >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Fold buffered values into the moments and histogram."""
+        if not self._buffer:
+            return
+        values = np.asarray(self._buffer, dtype=np.int64)
+        self._buffer.clear()
+        if values.min() < 0:
+            raise ValueError("Metric values must be non-negative")
+
+        # Chan et al.'s pairwise update of mean and sum of squared deviations
+        n_b = len(values)
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n = self._n + n_b
+        delta = mean_b - self._mean
+        self._mean += delta * n_b / n
+        self._m2 += m2_b + delta * delta * self._n * n_b / n
+        self._n = n
+
+        lo, hi = int(values.min()), int(values.max())
+        self._min = lo if self._min is None else min(self._min, lo)
+        self._max = hi if self._max is None else max(self._max, hi)
+
+        bins = len(self._counts)
+        while hi >= bins * self._width:
+            merged = self._counts.reshape(-1, 2).sum(axis=1)
+            self._counts = np.concatenate([merged, np.zeros(bins // 2, dtype=np.int64)])
+            self._width *= 2
+        self._counts += np.bincount(values // self._width, minlength=bins)
+
+    # Reading any figure folds pending values in first
+
+    @property
+    def n(self) -> int:
+        self.flush()
+        return self._n
+
+    @property
+    def mean(self) -> float:
+        self.flush()
+        return self._mean
+
+    @property
+    def std(self) -> float:
+        self.flush()
+        return math.sqrt(self._m2 / (self._n - 1)) if self._n > 1 else 0.0
+
+    @property
+    def min(self) -> Optional[int]:
+        self.flush()
+        return self._min
+
+    @property
+    def max(self) -> Optional[int]:
+        self.flush()
+        return self._max
+
+    @property
+    def width(self) -> int:
+        self.flush()
+        return self._width
+
+    @property
+    def counts(self) -> np.ndarray:
+        self.flush()
+        return self._counts
+
+    def mean_ci(self, z: float = Z_95) -> float:
+        """Half-width of the normal confidence interval of the mean."""
+        n = self.n
+        return z * self.std / math.sqrt(n) if n else 0.0
+
+    def quantiles(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> List[float]:
+        """Quantiles read from the histogram (exact while the bin width is 1)."""
+        n, counts, width = self.n, self._counts, self._width
+        if not n:
+            return [math.nan for _ in qs]
+        cumulative = np.cumsum(counts)
+        result = []
+        for q in qs:
+            rank = q * (n - 1)
+            b = int(np.searchsorted(cumulative, rank, side="right"))
+            if width == 1:
+                result.append(float(b))
+                continue
+            before = cumulative[b - 1] if b else 0
+            fraction = (rank - before + 0.5) / counts[b]
+            result.append(min(b * width + fraction * width, float(self._max)))
+        return result
+
+    def histogram(self) -> Dict[str, list]:
+        """Bin edges and counts, without the empty bins above the maximum."""
+        counts = self.counts
+        used = int(np.flatnonzero(counts)[-1]) + 1 if self._n else 0
+        return {
+            "edges": [i * self._width for i in range(used + 1)],
+            "counts": counts[:used].tolist(),
+        }
+
+    def summary(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> dict:
+        return {
+            "n": self.n,
+            "mean": self.mean,
+            "mean_ci95": self.mean_ci(),
+            "std": self.std,
+            "min": self.min,
+            "max": self.max,
+            "quantiles": dict(zip((f"p{round(q * 100)}" for q in qs), self.quantiles(qs))),
+        }
+
+
+class EnsembleAggregator:
+    """
+    Distributions of run-level metrics and per-generation sizes across an ensemble.
+
+    Run metrics are RUN_METRICS. Generation g's size distribution covers the runs that
+    reached generation g; `reached` in its summary says how many did.
+    """
+
+    def __init__(self, metrics: Sequence[str] = RUN_METRICS, bins: int = DEFAULT_BINS):
+        self.bins = bins
+        self.runs = 0
+        self.metrics: Dict[str, MetricDistribution] = {name: MetricDistribution(bins) for name in metrics}
+        self.generation_sizes: List[MetricDistribution] = []
+
+    def add(self, stats: dict) -> None:
+        """Fold one run's stats dict in."""
+        self.runs += 1
+        for name, distribution in self.metrics.items():
+            distribution.add(stats[name])
+        for gen_stats in stats["generations"]:
+            g = gen_stats["generation"]
+            while len(self.generation_sizes) <= g:
+                self.generation_sizes.append(MetricDistribution(self.bins))
+            self.generation_sizes[g].add(gen_stats["count"])
+
+    def add_all(self, stats_iter: Iterable[dict]) -> None:
+        for stats in stats_iter:
+            self.add(stats)
+
+    def summary(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> dict:
+        """Moments and quantiles of every metric and generation size."""
+        return {
+            "runs": self.runs,
+            "metrics": {name: d.summary(qs) for name, d in self.metrics.items()},
+            "generation_sizes": [dict(d.summary(qs), generation=g, reached=d.n) for g, d in enumerate(self.generation_sizes)],
+        }
+
+    def to_dict(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> dict:
+        """summary() plus the histograms, for saving."""
+        report = self.summary(qs)
+        for name, d in self.metrics.items():
+            report["metrics"][name]["histogram"] = d.histogram()
+        for entry, d in zip(report["generation_sizes"], self.generation_sizes):
+            entry["histogram"] = d.histogram()
+        return report
+
+    def save(self, path: str, qs: Sequence[float] = DEFAULT_QUANTILES) -> None:
+        """Write the report with histograms as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(qs), f, indent=2)
+
+    def format_report(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> str:
+        """Compact text report: one line per metric and per generation."""
+        labels = [f"p{round(q * 100)}" for q in qs]
+        header = f"{'Metric':<22} {'Mean':>10} {'±95%':>8} {'Std':>9} " + " ".join(f"{l:>8}" for l in labels) + f" {'Max':>8}"
+        lines = [f"Ensemble of {self.runs} runs", "-" * len(header), header, "-" * len(header)]
+
+        def row(label: str, d: MetricDistribution) -> str:
+            quantiles = " ".join(f"{v:>8.1f}" for v in d.quantiles(qs))
+            return f"{label:<22} {d.mean:>10.1f} {d.mean_ci():>8.1f} {d.std:>9.1f} {quantiles} {d.max if d.max is not None else '-':>8}"
+
+        for name, d in self.metrics.items():
+            lines.append(row(name, d))
+        if self.generation_sizes:
+            lines.append("-" * len(header))
+            for g, d in enumerate(self.generation_sizes):
+                lines.append(row(f"gen {g} size (n={d.n})", d))
+        lines.append("-" * len(header))
+        return "\n".join(lines)
+
+
+__all__ = ["DEFAULT_QUANTILES", "EnsembleAggregator", "MetricDistribution", "RUN_METRICS"]
@@ -3,10 +3,12 @@ import random
 from typing import Optional
 
 from models.person import Person
+from models.person_table import PersonTable
 from config.sim_config import SimConfig
 from config.other_constants import FATHER_AGE_OFFSET_PD, DAYS_IN_YEAR
 from services.utils import draw_age_at_death, sample_key_by_weights, convert_calendar_years_to_days, convert_calendar_days_to_years, generate_calendar_day_in_year
-from services.name_manager import NameManager
+from services.instrumentation import count
+from services.name_manager import NameManager, NameProvider
 
 
 @dataclass
@@ -15,12 +17,16 @@ class PersonFactory:
     rng: random.Random = field(default_factory=random.Random)
     culture: str = 'chinese'
     dynasty_name: Optional[str] = None
+    person_table: Optional[PersonTable] = None  # store people as PersonTable rows instead of Person objects
+    name_provider: Optional[NameProvider] = None  # defaults to the provider for `culture`
 
     def __post_init__(self):
-        """Load the name provider for the configured culture."""
-        self.name_provider = NameManager.load_culture(self.culture)
+        """Load the name provider for the configured culture unless one was given."""
+        if self.name_provider is None:
+            self.name_provider = NameManager.load_culture(self.culture)
 
     def create_person(self, birth_date: int, end_date: int, female: bool = False, father: Person = None, mother: Person = None) -> Person:
+        count("persons_created")
         age_at_death = draw_age_at_death(self.cfg.mortality, self.rng)
         birth_year = convert_calendar_days_to_years(birth_date)
         death_year = birth_year + age_at_death
@@ -34,7 +40,8 @@ class PersonFactory:
 
         # Recordkeeping dates
         date_of_death = generate_calendar_day_in_year(death_year, self.rng)
-        return Person(
+        make_person = self.person_table.add if self.person_table is not None else Person
+        return make_person(
             given_name=given_name,
             dynasty_name=self.dynasty_name,
             female=female,
@@ -0,0 +1,111 @@
+"""
+Process-parallel expansion of one dynasty's frontier.
+
+Every father's children are drawn from his own seed (see services.branch_rng), so the
+fathers of a generation can be expanded in any order or process. FrontierPool splits
+a large frontier into chunks and sends each father to a worker as a detached copy
+without his parent, spouse or child links. The workers send the copies back with
+their wife and children attached. The results are merged in frontier order, so
+the dynasty is identical to the serial one for a given seed.
+"""
+
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+
+from models.person import Person
+from services.compiled_config import CompiledSimConfig
+from services.generation_context import GenerationContext
+from services.instrumentation import count, stage
+
+# Frontiers smaller than this are expanded in-process; pickling costs more than it saves
+DEFAULT_MIN_FRONTIER = 2000
+
+# Worker-side context, built once per worker process by _init_worker
+_worker_ctx: Optional[GenerationContext] = None
+
+
+def _init_worker(cfg: CompiledSimConfig, end_date: int, culture: str, dynasty_name: Optional[str]) -> None:
+    global _worker_ctx
+    from services.simulation import _load_strategies
+    _load_strategies()
+    _worker_ctx = GenerationContext.create(cfg=cfg, end_date=end_date, culture=culture, dynasty_name=dynasty_name)
+
+
+def _expand_chunk(chunk: List[Tuple[Person, str, int, int]], *, phase_seeds: Dict[str, int]) -> List[Person]:
+    from services.simulation import expand_fathers
+    expand_fathers(chunk, _worker_ctx, phase_seeds)
+    return [father for father, _, _, _ in chunk]
+
+
+class FrontierPool:
+    """
+    Worker processes for expanding large frontiers of one dynasty.
+
+    The executor is started on the first frontier of at least min_frontier fathers, so
+    small dynasties never pay for it. Use as a context manager, or call close().
+    """
+
+    def __init__(self, ctx: GenerationContext, workers: Optional[int] = None, min_frontier: int = DEFAULT_MIN_FRONTIER):
+        if ctx.person_table is not None:
+            raise ValueError("Parallel frontier expansion does not support a person table")
+        self.ctx = ctx
+        self.workers = workers or os.cpu_count() or 1
+        self.min_frontier = min_frontier
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> FrontierPool:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _start(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            ctx = self.ctx
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(ctx.cfg, ctx.end_date, ctx.culture, ctx.dynasty_name),
+            )
+        return self._executor
+
+    def expand(self, fathers: Sequence[Tuple[Person, str, int, int]], phase_seeds: Dict[str, int]) -> None:
+        """Generate children for each (father, phase, key, salt) like expand_fathers."""
+        with stage("frontier_pool.expand"):
+            self._expand(fathers, phase_seeds)
+        count("frontier_pool.fathers", len(fathers))
+
+    def _expand(self, fathers: Sequence[Tuple[Person, str, int, int]], phase_seeds: Dict[str, int]) -> None:
+        # Detached copies keep the rest of the tree out of the pickles
+        detached = [
+            (replace(father, father=None, mother=None, spouse=None, children=[]), phase, key, salt)
+            for father, phase, key, salt in fathers
+        ]
+        chunksize = max(1, len(detached) // (4 * self.workers))
+        chunks = [detached[i:i + chunksize] for i in range(0, len(detached), chunksize)]
+
+        expanded = (
+            copy
+            for chunk in self._start().map(partial(_expand_chunk, phase_seeds=phase_seeds), chunks)
+            for copy in chunk
+        )
+        for (father, _, _, _), copy in zip(fathers, expanded):
+            father.spouse = copy.spouse
+            if copy.spouse is not None:
+                copy.spouse.spouse = father
+            father.date_of_marriage = copy.date_of_marriage
+            for child in copy.children:
+                child.father = father
+            father.children = copy.children
+
+
+__all__ = ["DEFAULT_MIN_FRONTIER", "FrontierPool"]
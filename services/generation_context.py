@@ -0,0 +1,92 @@
+"""
+Per-run generation context.
+
+iter_dynasty builds one GenerationContext per dynasty and hands it to every strategy.
+It owns the compiled config, the RNG, the end date, the name provider and one
+PersonFactory per mortality profile, so nothing in the per-family loop has to
+construct factories or configs or look up a culture again.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Union
+import random
+
+from config.sim_config import SimConfig
+from models.person_table import PersonTable
+from services.compiled_config import (
+    CompiledSimConfig,
+    MORTALITY_DEFAULT,
+    MORTALITY_MAINLINE,
+    MORTALITY_NON_MAINLINE,
+    ensure_compiled,
+)
+from services.factory import PersonFactory
+from services.name_manager import NameManager, NameProvider
+
+
+@dataclass
+class GenerationContext:
+    """
+    Shared state for generating one dynasty.
+
+    factories maps each MORTALITY_* profile to a factory for dynasty members;
+    wife_factory creates wives (default mortality, no dynasty name). All factories share
+    the context's RNG, name provider and person table.
+    """
+    cfg: CompiledSimConfig
+    rng: random.Random
+    end_date: int
+    culture: str = "chinese"
+    dynasty_name: Optional[str] = None
+    person_table: Optional[PersonTable] = None
+    name_provider: NameProvider = field(init=False)
+    factories: Dict[str, PersonFactory] = field(init=False)
+    wife_factory: PersonFactory = field(init=False)
+
+    def __post_init__(self):
+        self.cfg = ensure_compiled(self.cfg)
+        self.name_provider = NameManager.load_culture(self.culture)
+        self.factories = {
+            profile: self._make_factory(self.cfg.with_mortality_profile(profile), self.dynasty_name)
+            for profile in (MORTALITY_DEFAULT, MORTALITY_MAINLINE, MORTALITY_NON_MAINLINE)
+        }
+        self.wife_factory = self._make_factory(self.cfg, None)
+
+    @classmethod
+    def create(
+        cls,
+        *,
+        cfg: Union[SimConfig, CompiledSimConfig],
+        end_date: int,
+        rng: Optional[random.Random] = None,
+        culture: str = "chinese",
+        dynasty_name: Optional[str] = None,
+        person_table: Optional[PersonTable] = None,
+    ) -> GenerationContext:
+        """Build a context, compiling cfg if needed and creating an RNG if none is given."""
+        return cls(
+            cfg=ensure_compiled(cfg),
+            rng=rng or random.Random(),
+            end_date=end_date,
+            culture=culture,
+            dynasty_name=dynasty_name,
+            person_table=person_table,
+        )
+
+    def _make_factory(self, cfg: CompiledSimConfig, dynasty_name: Optional[str]) -> PersonFactory:
+        return PersonFactory(
+            cfg=cfg,
+            rng=self.rng,
+            culture=self.culture,
+            dynasty_name=dynasty_name,
+            person_table=self.person_table,
+            name_provider=self.name_provider,
+        )
+
+    def factory(self, profile: str = MORTALITY_DEFAULT) -> PersonFactory:
+        """Factory for dynasty members using the given MORTALITY_* profile."""
+        return self.factories[profile]
+
+
+__all__ = ["GenerationContext"]
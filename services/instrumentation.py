@@ -0,0 +1,152 @@
+"""
+Opt-in timing and counter instrumentation for the generation pipeline.
+
+Disabled by default. While disabled, stage() returns one shared no-op context manager
+and count() returns after a single flag check, so instrumented code runs at about
+its normal speed. After enable(), stage(name) records calls, wall time
+(perf_counter) and CPU time (process_time) per named stage, and count(name, n)
+accumulates counters. Stage times are inclusive: a nested stage's time is also part
+of its parent's.
+
+Only the current process is measured: work done in ensemble, search or frontier
+worker processes is not included.
+"""
+
+from __future__ import annotations
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, TypeVar
+import json
+import time
+
+_enabled = False
+_stages: Dict[str, List[float]] = {}  # name -> [calls, wall seconds, cpu seconds]
+_counters: Dict[str, int] = {}
+
+F = TypeVar("F", bound=Callable)
+
+
+class _NoOpStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_OP_STAGE = _NoOpStage()
+
+
+def enable() -> None:
+    """Start recording (existing figures are kept; see reset)."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Clear every stage and counter."""
+    _stages.clear()
+    _counters.clear()
+
+
+@contextmanager
+def _timed_stage(name: str) -> Iterator[None]:
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        record = _stages.get(name)
+        if record is None:
+            record = _stages[name] = [0, 0.0, 0.0]
+        record[0] += 1
+        record[1] += time.perf_counter() - wall
+        record[2] += time.process_time() - cpu
+
+
+def stage(name: str):
+    """Context manager timing one run of stage `name` (a no-op while disabled)."""
+    if not _enabled:
+        return _NO_OP_STAGE
+    return _timed_stage(name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator running every call of the function as stage `name`."""
+    def decorate(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _timed_stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add n to counter `name` (a no-op while disabled)."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def report() -> dict:
+    """Every stage (calls, wall and CPU seconds) and counter recorded so far."""
+    return {
+        "stages": {
+            name: {"calls": int(calls), "wall_seconds": wall, "cpu_seconds": cpu}
+            for name, (calls, wall, cpu) in sorted(_stages.items())
+        },
+        "counters": dict(sorted(_counters.items())),
+    }
+
+
+def format_report() -> str:
+    """Text summary: stages by wall time, then counters."""
+    data = report()
+    lines = ["=" * 80, "PROFILE", "=" * 80]
+    if data["stages"]:
+        lines.append(f"{'Stage':<40} {'Calls':>10} {'Wall (s)':>12} {'CPU (s)':>12}")
+        lines.append("-" * 80)
+        by_wall = sorted(data["stages"].items(), key=lambda item: -item[1]["wall_seconds"])
+        for name, s in by_wall:
+            lines.append(f"{name:<40} {s['calls']:>10} {s['wall_seconds']:>12.4f} {s['cpu_seconds']:>12.4f}")
+    if data["counters"]:
+        lines.append("-" * 80)
+        lines.append(f"{'Counter':<40} {'Value':>10}")
+        lines.append("-" * 80)
+        for name, value in data["counters"].items():
+            lines.append(f"{name:<40} {value:>10}")
+    lines.append("=" * 80)
+    return "\n".join(lines)
+
+
+def save(path: str) -> None:
+    """Write report() as JSON (sorted keys, so files diff cleanly between versions)."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report(), f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+__all__ = [
+    "count",
+    "disable",
+    "enable",
+    "format_report",
+    "is_enabled",
+    "report",
+    "reset",
+    "save",
+    "stage",
+    "timed",
+]
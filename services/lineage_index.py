@@ -0,0 +1,231 @@
+"""
+Lineage queries over a generated dynasty.
+
+LineageIndex is built once from the generations. An iterative DFS gives every member
+an Euler-tour interval [tin, tout]: A is an ancestor of B exactly when B's interval
+lies inside A's, which is an O(1) test. Each subtree is also a contiguous slice of
+the DFS order. Binary lifting tables (the 2^k-th ancestor of everyone) answer k-th
+ancestor and lowest-common-ancestor queries in O(log depth).
+
+Members are numbered in generation order from 1, the same numbering export_to_ck3
+uses for "<dynasty>_character_<n>", so the CLI can refer to people by that number.
+Wives are not members and are not indexed.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from models.person import Person
+
+
+@dataclass(frozen=True)
+class Relationship:
+    """
+    How person a relates to person b through their lowest common ancestor.
+
+    up_a and up_b are the generations from a and b up to `ancestor` (None and -1 if
+    they share no ancestor in the dynasty).
+    """
+    a: Person
+    b: Person
+    ancestor: Optional[Person]
+    up_a: int
+    up_b: int
+
+    @property
+    def related(self) -> bool:
+        return self.ancestor is not None
+
+    @property
+    def degree(self) -> int:
+        """Degree of kinship: number of parent-child steps between a and b."""
+        return self.up_a + self.up_b if self.related else -1
+
+    @property
+    def cousin_degree(self) -> int:
+        """1 for first cousins, 2 for second cousins, ... (0 for siblings)."""
+        return min(self.up_a, self.up_b) - 1
+
+    @property
+    def removed(self) -> int:
+        """Generations between a and b ("once removed" is 1)."""
+        return abs(self.up_a - self.up_b)
+
+    def describe(self) -> str:
+        """What a is to b, e.g. 'grandfather', 'niece', '2nd cousin once removed'."""
+        if not self.related:
+            return "unrelated"
+        up_a, up_b, female = self.up_a, self.up_b, self.a.female
+        if up_a == 0 and up_b == 0:
+            return "self"
+        if up_a == 0:
+            return _with_generations("mother" if female else "father", up_b)
+        if up_b == 0:
+            return _with_generations("daughter" if female else "son", up_a)
+        if up_a == 1 and up_b == 1:
+            return "sister" if female else "brother"
+        if up_a == 1:
+            return "great-" * (up_b - 2) + ("aunt" if female else "uncle")
+        if up_b == 1:
+            return _with_generations("niece" if female else "nephew", up_a - 1)
+        removed = {0: "", 1: " once removed", 2: " twice removed"}.get(self.removed, f" {self.removed} times removed")
+        return f"{_ordinal(self.cousin_degree)} cousin{removed}"
+
+
+def _with_generations(word: str, generations: int) -> str:
+    """father, grandfather, great-grandfather, ... for 1, 2, 3, ... generations."""
+    if generations == 1:
+        return word
+    return "great-" * (generations - 2) + "grand" + word
+
+
+def _ordinal(n: int) -> str:
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+class LineageIndex:
+    """
+    Ancestor, descendant and relationship queries for one dynasty.
+
+    Queries take the Person objects of the dynasty (or use person(number) to look one
+    up by its 1-based member number).
+    """
+
+    def __init__(self, dynasty: Sequence[Sequence[Person]]):
+        self.people: List[Person] = [p for generation in dynasty for p in generation]
+        slot: Dict[int, int] = {id(p): i for i, p in enumerate(self.people)}
+        self._slot = slot
+        n = len(self.people)
+
+        self.parent: List[int] = [slot.get(id(p.father), -1) for p in self.people]
+        self.depth: List[int] = [0] * n
+        self.tin: List[int] = [0] * n
+        self.tout: List[int] = [0] * n
+        # Slots in DFS order: the subtree of s is order[tin[s]:tout[s] + 1]
+        self.order: List[int] = []
+
+        # Iterative DFS from every root; deep lines would exceed the recursion limit
+        for root in range(n):
+            if self.parent[root] != -1:
+                continue
+            stack = [(root, False)]
+            while stack:
+                s, done = stack.pop()
+                if done:
+                    self.tout[s] = len(self.order) - 1
+                    continue
+                self.tin[s] = len(self.order)
+                self.order.append(s)
+                stack.append((s, True))
+                for child in reversed(self.people[s].children):
+                    c = slot.get(id(child))
+                    if c is not None:
+                        self.depth[c] = self.depth[s] + 1
+                        stack.append((c, False))
+
+        # up[k][s] is the 2^k-th ancestor of s (-1 past the root)
+        self.up: List[List[int]] = [self.parent]
+        for _ in range(max(self.depth, default=0).bit_length() - 1):
+            prev = self.up[-1]
+            self.up.append([prev[p] if p != -1 else -1 for p in prev])
+
+    def __len__(self) -> int:
+        return len(self.people)
+
+    def __contains__(self, person: Person) -> bool:
+        return id(person) in self._slot
+
+    def _s(self, person: Person) -> int:
+        try:
+            return self._slot[id(person)]
+        except KeyError:
+            raise ValueError(f"{person.name} is not a member of this dynasty") from None
+
+    def person(self, number: int) -> Person:
+        """Member by 1-based number in generation order (as in the CK3 character ids)."""
+        if not 1 <= number <= len(self.people):
+            raise ValueError(f"No member number {number} (dynasty has {len(self.people)})")
+        return self.people[number - 1]
+
+    def number(self, person: Person) -> int:
+        """1-based member number of person."""
+        return self._s(person) + 1
+
+    def generation_of(self, person: Person) -> int:
+        """Generations below the person's root (the founder is 0)."""
+        return self.depth[self._s(person)]
+
+    def is_ancestor(self, a: Person, b: Person) -> bool:
+        """True if a is a proper ancestor of b. O(1)."""
+        sa, sb = self._s(a), self._s(b)
+        return sa != sb and self.tin[sa] <= self.tin[sb] and self.tout[sb] <= self.tout[sa]
+
+    def _kth(self, s: int, k: int) -> int:
+        level = 0
+        while k and s != -1:
+            if k & 1:
+                s = self.up[level][s] if level < len(self.up) else -1
+            k >>= 1
+            level += 1
+        return s
+
+    def kth_ancestor(self, person: Person, k: int) -> Optional[Person]:
+        """Ancestor k generations up (k=1 is the father), or None. O(log k)."""
+        s = self._kth(self._s(person), k)
+        return self.people[s] if s != -1 else None
+
+    def _lca(self, sa: int, sb: int) -> int:
+        tin, tout = self.tin, self.tout
+        if tin[sa] <= tin[sb] and tout[sb] <= tout[sa]:
+            return sa
+        if tin[sb] <= tin[sa] and tout[sa] <= tout[sb]:
+            return sb
+        # Lift a to just below the lowest ancestor that also covers b
+        for level in range(len(self.up) - 1, -1, -1):
+            u = self.up[level][sa]
+            if u != -1 and not (tin[u] <= tin[sb] and tout[sb] <= tout[u]):
+                sa = u
+        return self.parent[sa]
+
+    def lowest_common_ancestor(self, a: Person, b: Person) -> Optional[Person]:
+        """Deepest person who is an ancestor of (or equal to) both, or None. O(log depth)."""
+        s = self._lca(self._s(a), self._s(b))
+        return self.people[s] if s != -1 else None
+
+    def relationship(self, a: Person, b: Person) -> Relationship:
+        """How a relates to b (see Relationship.describe)."""
+        sa, sb = self._s(a), self._s(b)
+        s = self._lca(sa, sb)
+        if s == -1:
+            return Relationship(a=a, b=b, ancestor=None, up_a=-1, up_b=-1)
+        return Relationship(
+            a=a,
+            b=b,
+            ancestor=self.people[s],
+            up_a=self.depth[sa] - self.depth[s],
+            up_b=self.depth[sb] - self.depth[s],
+        )
+
+    def descendants(self, person: Person) -> Iterator[Person]:
+        """Every descendant of person, in DFS order."""
+        s = self._s(person)
+        for d in self.order[self.tin[s] + 1:self.tout[s] + 1]:
+            yield self.people[d]
+
+    def descendant_count(self, person: Person) -> int:
+        """Number of descendants of person. O(1)."""
+        s = self._s(person)
+        return self.tout[s] - self.tin[s]
+
+    def descendants_alive_on(self, person: Person, day: int) -> List[Person]:
+        """Descendants born on or before `day` (absolute days) and not yet dead on it."""
+        alive = []
+        for d in self.descendants(person):
+            if d.date_of_birth <= day and (d.date_of_death is None or day < d.date_of_death):
+                alive.append(d)
+        return alive
+
+
+__all__ = ["LineageIndex", "Relationship"]
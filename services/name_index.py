@@ -0,0 +1,173 @@
+"""
+Compiled name lists.
+
+A name list text file (one name per line) is compiled once into an offset-indexed
+binary file in a cache directory next to it, then memory-mapped. Opening a list
+therefore reads only its header. A name is decoded from the mapped bytes the
+first time it is looked up, so a culture with 100k names costs no Python objects
+until names are drawn. NameList is a read-only sequence: rng.choice(names) draws
+the same name for the same seed as it would from the list of lines.
+
+File layout (version 1, little-endian):
+
+    magic (8 bytes) | version (u32) | name count (u32) | source size (u64)
+    | source mtime in ns (u64) | count + 1 name offsets (u32) | UTF-8 name data
+
+A compiled file whose recorded size or mtime no longer matches its source is
+rebuilt. If the cache directory cannot be written, the list is compiled in memory.
+"""
+
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterator, Optional, Sequence
+import mmap
+import operator
+import os
+import struct
+import sys
+import tempfile
+
+MAGIC = b"NAMELST\x00"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIQQ")
+CACHE_DIRNAME = ".compiled"
+NAME_FILE_SUFFIXES = {"male": "_names_male.txt", "female": "_names_female.txt"}
+
+
+def _read_names(source: str) -> list:
+    with open(source, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def compile_name_list(source: str) -> bytes:
+    """Compiled form of a name list text file (blank lines skipped, names stripped)."""
+    stat = os.stat(source)
+    encoded = [name.encode("utf-8") for name in _read_names(source)]
+    offsets = array("I", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    header = _HEADER.pack(MAGIC, VERSION, len(encoded), stat.st_size, stat.st_mtime_ns)
+    return header + offsets.tobytes() + b"".join(encoded)
+
+
+class NameList(Sequence):
+    """Read-only sequence of the names in a compiled name list."""
+
+    def __init__(self, source: str, buffer, mapped: Optional[mmap.mmap] = None):
+        self.source = source
+        self._mmap = mapped
+        self._buffer = memoryview(buffer)
+        magic, version, count, _, _ = _HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Compiled name list for {source} is not version {VERSION}")
+        self._count = count
+        raw = self._buffer[_HEADER.size:_HEADER.size + (count + 1) * 4]
+        if sys.byteorder == "little":
+            self._offsets = raw.cast("I")
+        else:
+            self._offsets = array("I", raw)
+            self._offsets.byteswap()
+        self._data = self._buffer[_HEADER.size + (count + 1) * 4:]
+        # Names decoded so far; only the names actually drawn are ever decoded
+        self._decoded: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        # Also accepts numpy integers (see services.batch_simulation)
+        i = operator.index(index)
+        name = self._decoded.get(i)
+        if name is None:
+            if i < 0:
+                i += self._count
+            if not 0 <= i < self._count:
+                raise IndexError("name index out of range")
+            name = self._decoded[i] = str(self._data[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+        return name
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self[i]
+
+    def __reduce__(self):
+        # Reopened from the source (and its cache) in another process
+        return open_name_list, (self.source,)
+
+    def close(self) -> None:
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._data.release()
+        self._buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+
+def _is_current(path: str, stat: os.stat_result) -> bool:
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+    except OSError:
+        return False
+    if len(header) < _HEADER.size:
+        return False
+    magic, version, _, size, mtime_ns = _HEADER.unpack(header)
+    return magic == MAGIC and version == VERSION and size == stat.st_size and mtime_ns == stat.st_mtime_ns
+
+
+def open_name_list(source: str, cache_dir: Optional[str] = None) -> NameList:
+    """
+    Map the compiled form of a name list, compiling it first if needed.
+
+    Args:
+        source: Name list text file
+        cache_dir: Where compiled lists are kept (default: a '.compiled' directory
+            next to source)
+
+    Raises:
+        FileNotFoundError: If source does not exist
+    """
+    stat = os.stat(source)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(source), CACHE_DIRNAME)
+    compiled = os.path.join(cache_dir, os.path.basename(source) + ".idx")
+    if not _is_current(compiled, stat):
+        data = compile_name_list(source)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Written under a temporary name and renamed, so concurrent readers never see half a file
+            fd, temp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(temp, 0o644)
+            os.replace(temp, compiled)
+        except OSError:
+            return NameList(source, data)
+    with open(compiled, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return NameList(source, mapped, mapped)
+
+
+def discover_name_files(base_path: str) -> Dict[str, Dict[str, str]]:
+    """
+    Name list files in base_path by file prefix, e.g. {'han': {'male': ..., 'female': ...}}.
+
+    Only prefixes with both a male and a female list are returned.
+    """
+    found: Dict[str, Dict[str, str]] = {}
+    try:
+        entries = sorted(os.scandir(base_path), key=lambda e: e.name)
+    except FileNotFoundError:
+        return {}
+    for entry in entries:
+        for sex, suffix in NAME_FILE_SUFFIXES.items():
+            if entry.name.endswith(suffix) and entry.is_file():
+                found.setdefault(entry.name[:-len(suffix)], {})[sex] = entry.path
+    return {prefix: files for prefix, files in found.items() if len(files) == len(NAME_FILE_SUFFIXES)}
+
+
+__all__ = ["NameList", "compile_name_list", "discover_name_files", "open_name_list"]
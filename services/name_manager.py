@@ -1,25 +1,29 @@
 """
 Name management system for dynasty generation.
 
-Handles loading and providing names for different cultures. Names are loaded once
-per application run and cached in memory.
+Handles loading and providing names for different cultures. Cultures are
+discovered from the name list files present, and each list is compiled once into
+a memory-mapped index that names are drawn from.
 """
 
-from typing import Dict, List
+from typing import Dict, List, Sequence
 import os
 import random
 
+from config.culture_config import CULTURE_CONFIGS
+from services.name_index import discover_name_files, open_name_list
+
 
 class NameProvider:
     """Provides names for a specific culture."""
     
-    def __init__(self, male_names: List[str], female_names: List[str]):
+    def __init__(self, male_names: Sequence[str], female_names: Sequence[str]):
         """
         Initialize the provider with lists of male and female names.
         
         Args:
-            male_names: List of male given names
-            female_names: List of female given names
+            male_names: Male given names (a list or a compiled NameList)
+            female_names: Female given names (a list or a compiled NameList)
         """
         self.male_names = male_names
         self.female_names = female_names
@@ -33,14 +37,51 @@ class NameProvider:
         return rng.choice(self.female_names)
 
 
+def _culture_for_prefix(prefix: str) -> str:
+    """Culture whose CK3 culture code is the file prefix (e.g. 'han' -> 'chinese'), else the prefix."""
+    if prefix in CULTURE_CONFIGS:
+        return prefix
+    for culture, config in CULTURE_CONFIGS.items():
+        if config.ck3_culture_code == prefix:
+            return culture
+    return prefix
+
+
 class NameManager:
     """
     Singleton-like manager for loading and caching name providers for different cultures.
     
-    Ensures names are only loaded once per application run.
+    Ensures names are only loaded once per application run. Cultures are found by
+    scanning the namelists directory for <prefix>_names_male.txt and
+    <prefix>_names_female.txt pairs; the prefix is a culture name or its CK3 culture
+    code. Name lists are opened through their compiled, memory-mapped form (see
+    services.name_index).
     """
     
     _providers: Dict[str, NameProvider] = {}
+    _cultures: Dict[str, Dict[str, Dict[str, str]]] = {}
+    
+    @staticmethod
+    def _default_path() -> str:
+        return os.path.join(os.path.dirname(__file__), '..', 'namelists')
+    
+    @classmethod
+    def discover_cultures(cls, base_path: str = None) -> Dict[str, Dict[str, str]]:
+        """
+        Name list files per culture in a namelists directory. Cached per directory.
+        
+        Returns:
+            Dictionary mapping culture -> {'male': path, 'female': path}
+        """
+        if base_path is None:
+            base_path = cls._default_path()
+        key = os.path.abspath(base_path)
+        if key not in cls._cultures:
+            cls._cultures[key] = {
+                _culture_for_prefix(prefix): files
+                for prefix, files in discover_name_files(base_path).items()
+            }
+        return cls._cultures[key]
     
     @classmethod
     def load_culture(cls, culture: str, base_path: str = None) -> NameProvider:
@@ -49,7 +90,7 @@ class NameManager:
         
         Args:
             culture: Culture name (e.g., 'chinese', 'english')
-            base_path: Path to namelists directory. If None, uses current working directory.
+            base_path: Path to namelists directory. If None, uses the namelists directory of the package.
         
         Returns:
             NameProvider for the specified culture
@@ -62,35 +103,18 @@ class NameManager:
         if culture in cls._providers:
             return cls._providers[culture]
         
-        # Determine file paths
         if base_path is None:
-            base_path = os.path.join(os.path.dirname(__file__), '..', 'namelists')
-        
-        # Map culture to file prefixes
-        culture_prefix_map = {
-            'chinese': 'han',
-            'english': 'english',
-            'french': 'french',
-            'german': 'german',
-        }
-        
-        prefix = culture_prefix_map.get(culture.lower(), culture.lower())
-        male_file = os.path.join(base_path, f"{prefix}_names_male.txt")
-        female_file = os.path.join(base_path, f"{prefix}_names_female.txt")
-        
-        # Load names
-        try:
-            with open(male_file, 'r', encoding='utf-8') as f:
-                male_names = [line.strip() for line in f if line.strip()]
-            
-            with open(female_file, 'r', encoding='utf-8') as f:
-                female_names = [line.strip() for line in f if line.strip()]
-        except FileNotFoundError as e:
+            base_path = cls._default_path()
+        files = cls.discover_cultures(base_path).get(culture.lower())
+        if files is None:
+            available = ", ".join(sorted(cls.discover_cultures(base_path))) or "none"
             raise FileNotFoundError(
-                f"Could not find name files for culture '{culture}'. "
-                f"Expected: {male_file} and {female_file}"
-            ) from e
+                f"Could not find name files for culture '{culture}' in {base_path}. "
+                f"Expected <prefix>_names_male.txt and <prefix>_names_female.txt (available: {available})"
+            )
         
+        male_names = open_name_list(files["male"])
+        female_names = open_name_list(files["female"])
         if not male_names or not female_names:
             raise ValueError(
                 f"Name files for culture '{culture}' are empty. "
@@ -104,11 +128,12 @@ class NameManager:
         return provider
     
     @classmethod
-    def get_available_cultures(cls) -> List[str]:
-        """Get list of available cultures."""
-        return ['chinese', 'english', 'french', 'german']
+    def get_available_cultures(cls, base_path: str = None) -> List[str]:
+        """Get list of available cultures (those with both name lists), sorted."""
+        return sorted(cls.discover_cultures(base_path))
     
     @classmethod
     def reset(cls):
-        """Reset all cached providers. Useful for testing."""
+        """Reset all cached providers and discovered cultures. Useful for testing."""
         cls._providers.clear()
+        cls._cultures.clear()
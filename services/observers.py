@@ -0,0 +1,164 @@
+"""
+Observers notified while a dynasty is being generated.
+
+iter_dynasty and generate_dynasty accept observers and notify them as each
+generation is finished. By then every person in it has their children, spouse and
+marriage date set, and their father is still linked even with release_ancestors.
+StatsAccumulator builds calculate_dynasty_stats' result this way. Its stats are ready
+as soon as generation ends, and the dynasty itself never has to be kept.
+"""
+
+from __future__ import annotations
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from models.person import Person
+from services.utils import convert_calendar_days_to_years
+
+
+class DynastyObserver:
+    """
+    Base class for generation observers; override the hooks you need.
+
+    on_person is called for every person created with a finished generation: each
+    dynasty member with member=True, followed by their spouse from outside the dynasty
+    (a wife or husband who is not a member), if any, with member=False. Then
+    on_generation is called once for the generation's members as a whole.
+    """
+
+    def on_person(self, person: Person, generation: int, member: bool = True) -> None:
+        pass
+
+    def on_generation(self, generation: int, people: Sequence[Person]) -> None:
+        pass
+
+
+def wants_people(observer: DynastyObserver) -> bool:
+    """True if the observer overrides on_person (so per-person calls can be skipped)."""
+    return type(observer).on_person is not DynastyObserver.on_person
+
+
+def notify_generation(observers: Sequence[DynastyObserver], generation: int, people: Sequence[Person]) -> None:
+    """Notify observers of a finished generation."""
+    for observer in observers:
+        if wants_people(observer):
+            members = {id(person) for person in people}
+            for person in people:
+                observer.on_person(person, generation, member=True)
+                spouse = person.spouse
+                if spouse is not None and id(spouse) not in members:
+                    observer.on_person(spouse, generation, member=False)
+        observer.on_generation(generation, people)
+
+
+class StatsAccumulator(DynastyObserver):
+    """
+    Online version of calculate_dynasty_stats.
+
+    Per-generation counts, lifespans, age gaps, young males and alive-at-end are summed
+    as generations finish. Surviving branches depend on later generations, so each
+    generation only records its people's father slots and living flags (a few bytes per
+    person). result() resolves the branches in one pass over those arrays. With the same
+    end_date, result() equals calculate_dynasty_stats(dynasty, end_date).
+    """
+
+    def __init__(self, end_date: int):
+        self.end_year = convert_calendar_days_to_years(end_date)
+        self.founder_name: Optional[str] = None
+        self._generations: List[dict] = []
+        self._deaths: List[int] = []
+        # Per generation: each person's father's slot in the previous generation, and living flags
+        self._father_slots: List[array] = []
+        self._living: List[bytearray] = []
+        self._previous_slots: Dict[int, int] = {}
+
+    def on_generation(self, generation: int, people: Sequence[Person]) -> None:
+        if not people:
+            return
+        if self.founder_name is None:
+            self.founder_name = people[0].name
+
+        count = len(people)
+        males = skipped = alive = young_males = total_children = 0
+        lifespans = birth_years = death_years = deaths = 0
+        oldest = youngest = people[0].birth_year
+        father_slots = array("l")
+        living = bytearray(count)
+        previous_slots = self._previous_slots
+        slots: Dict[int, int] = {}
+
+        for slot, p in enumerate(people):
+            slots[id(p)] = slot
+            father_slots.append(previous_slots.get(id(p.father), -1))
+            if not p.female:
+                males += 1
+                if (self.end_year - p.birth_year) < 30:
+                    young_males += 1
+            if p.skip_generation:
+                skipped += 1
+            if p.is_living_at_end:
+                alive += 1
+                living[slot] = 1
+            birth_years += p.birth_year
+            death_years += p.death_year
+            lifespans += p.death_year - p.birth_year
+            if p.death_year < 10000:
+                deaths += 1
+            total_children += len(p.children)
+            oldest = min(oldest, p.birth_year)
+            youngest = max(youngest, p.birth_year)
+
+        self._previous_slots = slots
+        self._father_slots.append(father_slots)
+        self._living.append(living)
+        self._generations.append({
+            "generation": generation,
+            "count": count,
+            "males": males,
+            "females": count - males,
+            "avg_lifespan": lifespans / count,
+            "avg_birth_year": birth_years / count,
+            "avg_death_year": death_years / count,
+            "skip_generation_count": skipped,
+            "alive_at_end": alive,
+            "total_children": total_children,
+            "avg_children": total_children / count,
+            "max_age_gap": youngest - oldest if count > 1 else 0,
+            "surviving_branches": 0,  # resolved in result()
+            "young_males_count": young_males,
+        })
+        self._deaths.append(deaths)
+
+    def _surviving_branches(self) -> List[int]:
+        """People per generation with a living descendant, resolved bottom-up."""
+        has_living = [bytearray(len(living)) for living in self._living]
+        for g in range(len(has_living) - 1, 0, -1):
+            parent_flags = has_living[g - 1]
+            for slot, father_slot in enumerate(self._father_slots[g]):
+                if father_slot >= 0 and (self._living[g][slot] or has_living[g][slot]):
+                    parent_flags[father_slot] = 1
+        return [sum(flags) for flags in has_living]
+
+    def result(self) -> dict:
+        """The stats dict calculate_dynasty_stats would return for the observed dynasty."""
+        stats = {
+            "total_generations": len(self._generations),
+            "total_people": sum(g["count"] for g in self._generations),
+            "founder_name": self.founder_name or "Unknown",
+            "young_males_count": 0,
+            "max_age_gap_overall": 0,
+            "total_alive_at_end": 0,
+            "generations": [],
+        }
+        for gen, branches in zip(self._generations, self._surviving_branches()):
+            gen_stats = dict(gen, surviving_branches=branches)
+            stats["young_males_count"] += gen_stats["young_males_count"]
+            stats["max_age_gap_overall"] = max(stats["max_age_gap_overall"], gen_stats["max_age_gap"])
+            stats["total_alive_at_end"] += gen_stats["alive_at_end"]
+            stats["generations"].append(gen_stats)
+        stats["total_births"] = stats["total_people"]
+        stats["total_deaths"] = sum(self._deaths)
+        return stats
+
+
+__all__ = ["DynastyObserver", "StatsAccumulator", "notify_generation"]
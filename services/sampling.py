@@ -0,0 +1,78 @@
+"""
+Precomputed samplers for discrete distributions.
+
+AliasTable implements Walker's alias method (Vose's construction): O(n) setup, then
+O(1) draws from a {key: weight} distribution using a single rng.random() call.
+"""
+
+from __future__ import annotations
+from typing import Dict, Tuple
+import random
+
+
+class AliasTable:
+    """Walker alias table for a discrete {key: weight} distribution."""
+
+    __slots__ = ("keys", "prob", "alias", "_n")
+
+    def __init__(self, keys: Tuple[int, ...], prob: Tuple[float, ...], alias: Tuple[int, ...]):
+        self.keys = keys
+        self.prob = prob
+        self.alias = alias
+        self._n = len(keys)
+
+    @classmethod
+    def from_pd(cls, pd: Dict[int, float]) -> AliasTable:
+        """
+        Build the table from a probability (or unnormalized weight) dict.
+
+        Raises:
+            ValueError: If the dict is empty, has negative weights, or sums to zero
+        """
+        if not pd:
+            raise ValueError("Cannot build an alias table from an empty distribution")
+        keys = tuple(pd.keys())
+        weights = [float(w) for w in pd.values()]
+        if any(w < 0.0 for w in weights):
+            raise ValueError(f"Distribution has negative weights: {pd}")
+        total = sum(weights)
+        if total <= 0.0:
+            raise ValueError(f"Distribution weights sum to zero: {pd}")
+
+        n = len(keys)
+        scaled = [w * n / total for w in weights]
+        prob = [0.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+        # Leftovers are 1.0 up to rounding
+        for i in small + large:
+            prob[i] = 1.0
+
+        return cls(keys, tuple(prob), tuple(alias))
+
+    def sample(self, rng: random.Random) -> int:
+        """Draw one key using a single uniform."""
+        u = rng.random() * self._n
+        i = int(u)
+        if u - i < self.prob[i]:
+            return self.keys[i]
+        return self.keys[self.alias[i]]
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __repr__(self) -> str:
+        return f"AliasTable(keys={self.keys})"
+
+
+__all__ = ["AliasTable"]
@@ -0,0 +1,214 @@
+"""
+Search for a dynasty that meets target criteria.
+
+find_dynasty generates candidates from seeds derived from one master seed (as in
+services.ensemble), measures each one in the worker that generated it, and only ships
+the measures back. Candidates are judged in index order, so the dynasty found for a
+given master seed does not depend on the number of workers. The winner is regenerated
+from its seed in the calling process.
+"""
+
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from functools import partial
+from typing import Dict, List, Optional
+import os
+import random
+import time
+
+from config.other_constants import DAYS_IN_YEAR
+from config.sim_config import SimConfig
+from models.person import Person
+from services.dynasty_metrics import calculate_dynasty_stats
+from services.ensemble import DynastyParams, derive_seed, generate_dynasty_from_seed
+
+
+@dataclass(frozen=True)
+class DynastyCriteria:
+    """
+    Targets a dynasty must meet. None means "no constraint".
+
+    min_playable_males:      living male dynasty members younger than the config's
+                             playable_character_age_max at the end date (the
+                             playable characters of the CK3 export)
+    min_surviving_branches:  most people in any one generation with a living descendant
+    min_total_people / max_total_people: dynasty size (members, not wives)
+    min_generations:         number of generations
+    min_alive_at_end:        living dynasty members at the end date
+    """
+    min_playable_males: Optional[int] = None
+    min_surviving_branches: Optional[int] = None
+    min_total_people: Optional[int] = None
+    max_total_people: Optional[int] = None
+    min_generations: Optional[int] = None
+    min_alive_at_end: Optional[int] = None
+
+    def measure(
+        self,
+        dynasty: List[List[Person]],
+        end_date: int,
+        playable_age_max: int = SimConfig.playable_character_age_max,
+    ) -> Dict[str, int]:
+        """Compute every value the criteria can test."""
+        stats = calculate_dynasty_stats(dynasty, end_date)
+        playable_days = playable_age_max * DAYS_IN_YEAR
+        return {
+            "playable_males": sum(
+                1 for gen in dynasty for p in gen
+                if not p.female and p.is_living_at_end and end_date - p.date_of_birth < playable_days
+            ),
+            "surviving_branches": max((g["surviving_branches"] for g in stats["generations"]), default=0),
+            "total_people": stats["total_people"],
+            "generations": stats["total_generations"],
+            "alive_at_end": stats["total_alive_at_end"],
+        }
+
+    def shortfall(self, measures: Dict[str, int]) -> float:
+        """How far measures are from meeting the criteria (0.0 means they match)."""
+        total = 0.0
+        for f in fields(self):
+            target = getattr(self, f.name)
+            if target is None:
+                continue
+            # "min_total_people" tests measures["total_people"], and so on
+            bound, key = f.name.split("_", 1)
+            value = measures[key]
+            if bound == "min" and value < target:
+                total += (target - value) / max(target, 1)
+            elif bound == "max" and value > target:
+                total += (value - target) / max(target, 1)
+        return total
+
+    def matches(self, measures: Dict[str, int]) -> bool:
+        return self.shortfall(measures) == 0.0
+
+
+@dataclass(frozen=True)
+class SearchBudget:
+    """Limits for a search: number of candidates and optional wall-clock seconds."""
+    max_candidates: int = 1000
+    time_limit: Optional[float] = None
+
+
+@dataclass
+class Candidate:
+    """Measures of one generated candidate."""
+    index: int
+    seed: int
+    measures: Dict[str, int]
+    shortfall: float
+
+    @property
+    def matched(self) -> bool:
+        return self.shortfall == 0.0
+
+
+@dataclass
+class SearchResult:
+    """
+    Outcome of find_dynasty. `best` is the first match, or the closest candidate if none
+    matched; `dynasty` is best regenerated from its seed.
+    """
+    best: Optional[Candidate]
+    dynasty: Optional[List[List[Person]]]
+    candidates: int
+    accepted: int
+    elapsed: float
+    master_seed: int
+    stopped_by: str  # "match", "candidates" or "time"
+
+    @property
+    def matched(self) -> bool:
+        return self.best is not None and self.best.matched
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.candidates if self.candidates else 0.0
+
+
+def _evaluate(index: int, *, cfg: SimConfig, params: DynastyParams, master_seed: int, criteria: DynastyCriteria) -> Candidate:
+    seed = derive_seed(master_seed, index)
+    dynasty = generate_dynasty_from_seed(cfg, params, seed)
+    measures = criteria.measure(dynasty, params.end_date, cfg.playable_character_age_max)
+    return Candidate(index=index, seed=seed, measures=measures, shortfall=criteria.shortfall(measures))
+
+
+def find_dynasty(
+    criteria: DynastyCriteria,
+    budget: SearchBudget,
+    *,
+    cfg: SimConfig,
+    params: DynastyParams,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> SearchResult:
+    """
+    Generate candidates until one matches `criteria` or the budget runs out.
+
+    Args:
+        criteria: Targets the dynasty must meet
+        budget: Maximum candidates and optional time limit in seconds
+        cfg: Simulation config
+        params: Dates, dynasty name and culture
+        seed: Master seed (random if None); candidate i uses derive_seed(seed, i)
+        workers: Worker processes. None uses os.cpu_count(); 0 or 1 searches in-process
+        batch_size: Candidates evaluated between budget checks (default 4 per worker)
+
+    Returns the lowest-index match, else the candidate with the smallest shortfall.
+    """
+    if budget.max_candidates <= 0:
+        raise ValueError("budget.max_candidates must be positive")
+    if seed is None:
+        seed = random.randrange(2 ** 63)
+
+    start = time.perf_counter()
+    evaluate = partial(_evaluate, cfg=cfg, params=params, master_seed=seed, criteria=criteria)
+    in_process = workers is not None and workers <= 1
+    workers = 1 if in_process else (workers or os.cpu_count() or 1)
+    batch_size = batch_size or 4 * workers
+
+    best: Optional[Candidate] = None
+    evaluated = 0
+    accepted = 0
+    stopped_by = "candidates"
+    executor = None if in_process else ProcessPoolExecutor(max_workers=workers)
+    try:
+        while evaluated < budget.max_candidates:
+            indices = range(evaluated, min(evaluated + batch_size, budget.max_candidates))
+            batch = map(evaluate, indices) if executor is None else executor.map(evaluate, indices)
+            for candidate in batch:
+                evaluated += 1
+                accepted += candidate.matched
+                if best is None or candidate.shortfall < best.shortfall:
+                    best = candidate
+            if best.matched:
+                stopped_by = "match"
+                break
+            if budget.time_limit is not None and time.perf_counter() - start >= budget.time_limit:
+                stopped_by = "time"
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    dynasty = generate_dynasty_from_seed(cfg, params, best.seed) if best is not None else None
+    return SearchResult(
+        best=best,
+        dynasty=dynasty,
+        candidates=evaluated,
+        accepted=accepted,
+        elapsed=time.perf_counter() - start,
+        master_seed=seed,
+        stopped_by=stopped_by,
+    )
+
+
+__all__ = [
+    "Candidate",
+    "DynastyCriteria",
+    "SearchBudget",
+    "SearchResult",
+    "find_dynasty",
+]
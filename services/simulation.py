@@ -1,11 +1,18 @@
 from __future__ import annotations
-from typing import Optional, List
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, List, Sequence, Tuple
 import random
 
 from config.sim_config import SimConfig
 from config.other_constants import DAYS_IN_YEAR, MOTHER_AGE_AT_FIRST_CHILD_PD, FATHER_AGE_OFFSET_PD
 from models.person import Person
-from services.factory import PersonFactory
+from models.person_table import PersonTable
+from services.branch_rng import DEFAULT_SALT, ROOT_KEY, child_key, person_seed
+from services.compiled_config import CompiledSimConfig
+from services.frontier_pool import DEFAULT_MIN_FRONTIER, FrontierPool
+from services.generation_context import GenerationContext
+from services.instrumentation import stage
+from services.observers import DynastyObserver, notify_generation
 from services.utils import generate_calendar_day_in_year, convert_calendar_days_to_years, sample_key_by_weights
 # Defer importing strategies to runtime to avoid circular import problems
 gen_children_mainline = None
@@ -13,60 +20,488 @@ gen_children_normal = None
 gen_children_male_only = None
 gen_wife = None
 
-def generate_dynasty(
-	*,
-	birth_year: int,
-	male_only_start_date: int,
-	normal_start_date: int,
-	end_date: int,
-	cfg: SimConfig,
-	rng: Optional[random.Random] = None,
-	dynasty_name: str = "Dynasty",
-	culture: str = "chinese",
-) -> List[List['Person']]:
-	rng = rng or random.Random()
-	factory = PersonFactory(cfg=cfg, rng=rng, culture=culture, dynasty_name=dynasty_name)
+# Strategy phases, in date order. A father's phase is fixed by his birth date.
+PHASE_MAINLINE = "mainline"
+PHASE_MALE_ONLY = "male_only"
+PHASE_NORMAL = "normal"
+PHASES = (PHASE_MAINLINE, PHASE_MALE_ONLY, PHASE_NORMAL)
+# Instrumentation stage of each phase's strategy
+_STRATEGY_STAGES = {phase: f"strategy.{phase}" for phase in PHASES}
+
 
+def _load_strategies() -> None:
 	# import strategies here to avoid circular imports at module import time
 	from strategies import gen_children_mainline as _gcm, gen_children as _gc, gen_wife as _gw
-	global gen_children_mainline, gen_children_male_only, gen_wife
+	global gen_children_mainline, gen_children_male_only, gen_children_normal, gen_wife
 	gen_children_mainline = _gcm.gen_children_mainline
 	gen_children_male_only = _gc.gen_children_male_only
 	gen_children_normal = _gc.gen_children_normal
 	gen_wife = _gw.gen_wife
 
-	founder: Person = factory.create_male(birth_date=generate_calendar_day_in_year(birth_year, rng), end_date=end_date)
-	# Outer list is generations, inner list is people in that generation
-	dynasty: List[List['Person']] = [[founder]]
-	max_generations = 1000  # Limit to prevent infinite loops
+
+def phase_of(person: Person, male_only_start_date: int, normal_start_date: int) -> str:
+	"""Return the strategy phase that generates this person's children."""
+	if person.date_of_birth < male_only_start_date:
+		return PHASE_MAINLINE
+	if person.date_of_birth < normal_start_date:
+		return PHASE_MALE_ONLY
+	return PHASE_NORMAL
+
+
+def draw_phase_seeds(rng: random.Random) -> Dict[str, int]:
+	"""Draw one seed per phase from the run's RNG."""
+	return {phase: rng.getrandbits(64) for phase in PHASES}
+
+
+def branch_context(ctx: GenerationContext) -> GenerationContext:
+	"""
+	A copy of ctx with its own RNG, reseeded for every father that is expanded.
+
+	Each father's children are drawn from person_seed(phase seed, his key, branch salt),
+	so they depend only on where he sits in the tree, not on expansion order. The
+	caller's RNG is only used for the founder and the phase seeds.
+	"""
+	return GenerationContext(
+		cfg=ctx.cfg,
+		rng=random.Random(),
+		end_date=ctx.end_date,
+		culture=ctx.culture,
+		dynasty_name=ctx.dynasty_name,
+		person_table=ctx.person_table,
+	)
+
+
+def create_founder(ctx: GenerationContext, birth_year: int) -> Person:
+	"""Create the dynasty founder from the run's context."""
+	return ctx.factory().create_male(birth_date=generate_calendar_day_in_year(birth_year, ctx.rng), end_date=ctx.end_date)
+
+
+def expand_father(father: Person, phase: str, ctx: GenerationContext) -> List[Person]:
+	"""Generate a father's children with the strategy of his phase, drawing from ctx.rng."""
+	with stage(_STRATEGY_STAGES[phase]):
+		if phase == PHASE_MAINLINE:
+			return gen_children_mainline(ctx=ctx, father=father)
+		if phase == PHASE_MALE_ONLY:
+			return gen_children_male_only(ctx=ctx, father=father)
+		return gen_children_normal(ctx=ctx, father=father)
+
+
+def expand_fathers(
+	fathers: Sequence[Tuple[Person, str, int, int]],
+	ctx: GenerationContext,
+	phase_seeds: Dict[str, int],
+) -> None:
+	"""Generate children for each (father, phase, key, salt), each from his own seed."""
+	for father, phase, key, salt in fathers:
+		# Drop anything a previous run of this branch left behind
+		father.spouse = None
+		father.date_of_marriage = None
+		ctx.rng.seed(person_seed(phase_seeds[phase], key, salt))
+		father.children = expand_father(father, phase, ctx)
+
+
+def _iter_generations(
+	root: Person,
+	ctx: GenerationContext,
+	phase_seeds: Dict[str, int],
+	*,
+	male_only_start_date: int,
+	normal_start_date: int,
+	max_generations: Optional[int],
+	release_ancestors: bool = False,
+	kept_phases: Sequence[str] = (),
+	root_key: int = ROOT_KEY,
+	root_salt: int = DEFAULT_SALT,
+	branch_salts: Optional[Dict[int, int]] = None,
+	pool: Optional[FrontierPool] = None,
+) -> Iterator[List[Person]]:
+	"""
+	Expand the tree below root generation by generation.
+
+	root_key and root_salt are root's RNG key and inherited branch salt (the founder's
+	by default). branch_salts maps the keys of rerolled branches to their salt; a person
+	uses the salt of the nearest such ancestor (or himself).
+
+	Fathers whose phase is in kept_phases already have their children and keep them.
+	Every other father is (re)expanded from his own seed. With a pool, generations with
+	at least pool.min_frontier such fathers are expanded across its worker processes.
+	"""
+	branch_salts = branch_salts or {}
+	current: List[Person] = [root]
+	# (key, salt) of each person in current
+	current_keys: List[Tuple[int, int]] = [(root_key, branch_salts.get(root_key, root_salt))]
 	generation = 0
 
-	while generation < len(dynasty) and generation < max_generations:
-		next_generation: List[Person] = []
-		
-		for father in dynasty[generation]:
+	while current:
+		if max_generations is not None and generation >= max_generations:
+			yield current
+			return
+
+		# Fathers of this generation that need their children (re)generated
+		pending: List[Tuple[Person, str, int, int]] = []
+		for father, (key, salt) in zip(current, current_keys):
 			if father.skip_generation:
 				continue
 
-			if father.date_of_birth < male_only_start_date:
-				# Mainline strategy
-				father.children = gen_children_mainline(fcfg=cfg.fertility, father=father, end_date=end_date, rng=rng, factory=factory)
-			elif father.date_of_birth < normal_start_date:
-				# Male-only strategy
-				father.children = gen_children_male_only(cfg=cfg, father=father, end_date=end_date, rng=rng, factory=factory)
-			else:
-				# Normal strategy
-				father.children = gen_children_normal(cfg=cfg, father=father, end_date=end_date, rng=rng, factory=factory)
-			
+			# Mainline, male-only or normal strategy depending on the father's birth date
+			phase = phase_of(father, male_only_start_date, normal_start_date)
+			if phase not in kept_phases:
+				pending.append((father, phase, key, salt))
+
+		if pool is not None and len(pending) >= pool.min_frontier:
+			pool.expand(pending, phase_seeds)
+		else:
+			expand_fathers(pending, ctx, phase_seeds)
+
+		next_generation: List[Person] = []
+		next_keys: List[Tuple[int, int]] = []
+		for father, (key, salt) in zip(current, current_keys):
+			for index, child in enumerate(father.children):
+				ck = child_key(key, index)
+				next_keys.append((ck, branch_salts.get(ck, salt)))
 			next_generation.extend(father.children)
-		
-		# Only add the next generation if there are children
-		if next_generation:
-			dynasty.append(next_generation)
-		
+
+		yield current
+
+		if release_ancestors:
+			# The previous generation is no longer needed for parent/spouse linkage
+			for person in current:
+				person.father = None
+				person.mother = None
+
+		current = next_generation
+		current_keys = next_keys
 		generation += 1
 
-	return dynasty
+
+def _walk(
+	root: Person,
+	branch_salts: Dict[int, int],
+	root_key: int = ROOT_KEY,
+	root_salt: int = DEFAULT_SALT,
+) -> Iterator[Tuple[Person, int, int, int]]:
+	"""Yield (person, depth, key, salt) for everyone below root, breadth first."""
+	current = [(root, root_key, branch_salts.get(root_key, root_salt))]
+	depth = 0
+	while current:
+		next_generation = []
+		for person, key, salt in current:
+			yield person, depth, key, salt
+			for index, child in enumerate(person.children):
+				ck = child_key(key, index)
+				next_generation.append((child, ck, branch_salts.get(ck, salt)))
+		current = next_generation
+		depth += 1
+
+
+def _collect_generations(founder: Person, max_generations: Optional[int]) -> List[List[Person]]:
+	"""Generations of an already expanded tree, without drawing anything."""
+	generations: List[List[Person]] = []
+	current: List[Person] = [founder]
+	while current:
+		generations.append(current)
+		if max_generations is not None and len(generations) > max_generations:
+			break
+		current = [child for person in current for child in person.children]
+	return generations
+
+
+def iter_dynasty(
+	*,
+	birth_year: int,
+	male_only_start_date: int,
+	normal_start_date: int,
+	end_date: int,
+	cfg: SimConfig | CompiledSimConfig,
+	rng: Optional[random.Random] = None,
+	dynasty_name: str = "Dynasty",
+	culture: str = "chinese",
+	person_table: Optional[PersonTable] = None,
+	max_generations: Optional[int] = None,
+	release_ancestors: bool = False,
+	workers: int = 1,
+	min_parallel_frontier: int = DEFAULT_MIN_FRONTIER,
+	observers: Sequence[DynastyObserver] = (),
+) -> Iterator[List['Person']]:
+	"""
+	Generate a dynasty lazily, yielding each generation once it is finished.
+
+	A generation is finished when every father in it has had his children (and wife)
+	generated, so the yielded people already have their children, spouse and marriage
+	dates set. Only the current generation and the one being built are held here.
+
+	With release_ancestors=True, once the caller moves past generation g its people drop
+	their father/mother references into generation g-1. Nothing then keeps earlier
+	generations alive except the caller, so peak memory follows the frontier width.
+	Callers that need the whole tree afterwards must not use this option.
+
+	max_generations limits how many generations are expanded (None for no limit).
+
+	With workers > 1, generations with at least min_parallel_frontier fathers are split
+	across that many worker processes. The output is identical to the serial one for a
+	given seed. This cannot be combined with person_table.
+
+	observers are notified of each generation (and each of its people) just before it
+	is yielded; see services.observers.
+	"""
+	# One context per dynasty: compiled config, factories and names are set up once
+	ctx = GenerationContext.create(
+		cfg=cfg, end_date=end_date, rng=rng, culture=culture, dynasty_name=dynasty_name, person_table=person_table,
+	)
+	_load_strategies()
+
+	founder: Person = create_founder(ctx, birth_year)
+	phase_seeds = draw_phase_seeds(ctx.rng)
+	branch_ctx = branch_context(ctx)
+	pool = FrontierPool(branch_ctx, workers, min_parallel_frontier) if workers > 1 else None
+	try:
+		generations = _iter_generations(
+			founder,
+			branch_ctx,
+			phase_seeds,
+			male_only_start_date=male_only_start_date,
+			normal_start_date=normal_start_date,
+			max_generations=max_generations,
+			release_ancestors=release_ancestors,
+			pool=pool,
+		)
+		for index, generation in enumerate(generations):
+			notify_generation(observers, index, generation)
+			yield generation
+	finally:
+		if pool is not None:
+			pool.close()
+
+
+@dataclass
+class DynastyRun:
+	"""
+	A generated dynasty plus the checkpoints needed to reroll its later phases or branches.
+
+	phase_seeds holds the seed of each strategy phase and branch_salts the salt of every
+	rerolled branch (by RNG key). Together with the tree below founder this is the
+	dynasty and RNG state at every phase boundary and every person: people outside the
+	rerolled part are kept as they are, and the rest is replayed or resampled from seeds.
+	"""
+	generations: List[List[Person]]
+	founder: Person
+	phase_seeds: Dict[str, int]
+	ctx: GenerationContext
+	male_only_start_date: int
+	normal_start_date: int
+	max_generations: Optional[int] = 1000
+	branch_salts: Dict[int, int] = field(default_factory=dict)
+
+
+def generate_dynasty_run(
+	*,
+	birth_year: int,
+	male_only_start_date: int,
+	normal_start_date: int,
+	end_date: int,
+	cfg: SimConfig | CompiledSimConfig,
+	rng: Optional[random.Random] = None,
+	dynasty_name: str = "Dynasty",
+	culture: str = "chinese",
+	person_table: Optional[PersonTable] = None,
+	max_generations: int = 1000,
+) -> DynastyRun:
+	"""
+	Generate a dynasty like generate_dynasty, keeping its phase checkpoints.
+
+	For the same rng the generations are the same as generate_dynasty's. Pass the result
+	to reroll_phase or reroll_branch to resample part of it.
+	"""
+	ctx = GenerationContext.create(
+		cfg=cfg, end_date=end_date, rng=rng, culture=culture, dynasty_name=dynasty_name, person_table=person_table,
+	)
+	_load_strategies()
+
+	founder: Person = create_founder(ctx, birth_year)
+	phase_seeds = draw_phase_seeds(ctx.rng)
+	branch_ctx = branch_context(ctx)
+	generations = list(_iter_generations(
+		founder,
+		branch_ctx,
+		phase_seeds,
+		male_only_start_date=male_only_start_date,
+		normal_start_date=normal_start_date,
+		max_generations=max_generations,
+	))
+	return DynastyRun(
+		generations=generations,
+		founder=founder,
+		phase_seeds=phase_seeds,
+		ctx=branch_ctx,
+		male_only_start_date=male_only_start_date,
+		normal_start_date=normal_start_date,
+		max_generations=max_generations,
+	)
+
+
+def reroll_phase(
+	run: DynastyRun,
+	phase: str,
+	rng: Optional[random.Random] = None,
+	phase_seeds: Optional[Dict[str, int]] = None,
+) -> DynastyRun:
+	"""
+	Resample `phase` and every later phase, keeping everything earlier phases generated.
+
+	New seeds for the rerolled phases are drawn from rng (a fresh RNG if None), or taken
+	from phase_seeds where given. Only fathers of the rerolled phases are expanded again,
+	so rerolling the normal phase skips the mainline and male-only work entirely.
+
+	The kept people are shared with run and relinked to the new children, so run's own
+	generations should not be used afterwards. With a person table, the rows of the
+	replaced people stay in the table but are no longer reachable from the founder.
+	"""
+	if phase not in PHASES:
+		raise ValueError(f"Unknown phase '{phase}', expected one of {PHASES}")
+	_load_strategies()
+
+	kept_phases = PHASES[:PHASES.index(phase)]
+	rng = rng or random.Random()
+	seeds = dict(run.phase_seeds)
+	for rerolled in PHASES[len(kept_phases):]:
+		seeds[rerolled] = rng.getrandbits(64)
+		if phase_seeds and rerolled in phase_seeds:
+			seeds[rerolled] = phase_seeds[rerolled]
+
+	generations = list(_iter_generations(
+		run.founder,
+		run.ctx,
+		seeds,
+		male_only_start_date=run.male_only_start_date,
+		normal_start_date=run.normal_start_date,
+		max_generations=run.max_generations,
+		kept_phases=kept_phases,
+		branch_salts=run.branch_salts,
+	))
+	return DynastyRun(
+		generations=generations,
+		founder=run.founder,
+		phase_seeds=seeds,
+		ctx=run.ctx,
+		male_only_start_date=run.male_only_start_date,
+		normal_start_date=run.normal_start_date,
+		max_generations=run.max_generations,
+		branch_salts=dict(run.branch_salts),
+	)
+
+
+def reroll_branch(
+	run: DynastyRun,
+	person: Person,
+	rng: Optional[random.Random] = None,
+	salt: Optional[int] = None,
+) -> DynastyRun:
+	"""
+	Resample everyone descended from `person`, keeping the person and the rest of the tree.
+
+	The branch gets a new salt drawn from rng (a fresh RNG if None) unless salt is given;
+	passing the branch's current salt replays it. Only the branch is expanded again: its
+	fathers' seeds depend on their keys, not on the rest of the tree. As with
+	reroll_phase, run's own generations should not be used afterwards.
+	"""
+	_load_strategies()
+
+	found = None
+	for candidate, depth, key, _ in _walk(run.founder, run.branch_salts):
+		if candidate is person:
+			found = (depth, key)
+			break
+	if found is None:
+		raise ValueError(f"{person.name} is not part of this dynasty")
+	depth, key = found
+
+	# Salts set inside the old branch belong to people that are about to be replaced
+	branch_salts = dict(run.branch_salts)
+	for _, _, old_key, _ in _walk(person, {}, root_key=key):
+		branch_salts.pop(old_key, None)
+	branch_salts[key] = (rng or random.Random()).getrandbits(64) if salt is None else salt
+
+	max_generations = None if run.max_generations is None else run.max_generations - depth
+	for _ in _iter_generations(
+		person,
+		run.ctx,
+		run.phase_seeds,
+		male_only_start_date=run.male_only_start_date,
+		normal_start_date=run.normal_start_date,
+		max_generations=max_generations,
+		root_key=key,
+		branch_salts=branch_salts,
+	):
+		pass
+
+	return DynastyRun(
+		generations=_collect_generations(run.founder, run.max_generations),
+		founder=run.founder,
+		phase_seeds=dict(run.phase_seeds),
+		ctx=run.ctx,
+		male_only_start_date=run.male_only_start_date,
+		normal_start_date=run.normal_start_date,
+		max_generations=run.max_generations,
+		branch_salts=branch_salts,
+	)
+
+
+def generate_dynasty(
+	*,
+	birth_year: int,
+	male_only_start_date: int,
+	normal_start_date: int,
+	end_date: int,
+	cfg: SimConfig | CompiledSimConfig,
+	rng: Optional[random.Random] = None,
+	dynasty_name: str = "Dynasty",
+	culture: str = "chinese",
+	person_table: Optional[PersonTable] = None,
+	max_generations: int = 1000,
+	workers: int = 1,
+	min_parallel_frontier: int = DEFAULT_MIN_FRONTIER,
+	observers: Sequence[DynastyObserver] = (),
+) -> List[List['Person']]:
+	"""
+	Generate a dynasty generation by generation from a single founder.
+
+	Outer list is generations, inner list is people in that generation. See iter_dynasty
+	for a streaming variant.
+
+	If person_table is given, every person (members and wives) is stored as a row of that
+	table and the returned generations hold PersonView objects instead of Person objects.
+
+	workers > 1 expands large generations in worker processes (see iter_dynasty); the
+	result is the same as with workers=1. observers are notified as in iter_dynasty.
+	"""
+	with stage("generate_dynasty"):
+		return list(iter_dynasty(
+			birth_year=birth_year,
+			male_only_start_date=male_only_start_date,
+			normal_start_date=normal_start_date,
+			end_date=end_date,
+			cfg=cfg,
+			rng=rng,
+			dynasty_name=dynasty_name,
+			culture=culture,
+			person_table=person_table,
+			max_generations=max_generations,
+			workers=workers,
+			min_parallel_frontier=min_parallel_frontier,
+			observers=observers,
+		))
 
 
-__all__ = ["generate_dynasty"]
\ No newline at end of file
+__all__ = [
+	"DynastyRun",
+	"PHASES",
+	"PHASE_MAINLINE",
+	"PHASE_MALE_ONLY",
+	"PHASE_NORMAL",
+	"generate_dynasty",
+	"generate_dynasty_run",
+	"iter_dynasty",
+	"phase_of",
+	"reroll_branch",
+	"reroll_phase",
+]
\ No newline at end of file
@@ -0,0 +1,265 @@
+"""
+Binary dynasty snapshots.
+
+save_snapshot writes a dynasty (members, their wives, every link and name) plus the
+config, parameters and seed that produced it to one file. The people are stored
+in PersonTable's column layout. load_snapshot maps the file with mmap and wraps the
+columns as zero-copy memoryviews, so opening a snapshot reads only its header.
+People are decoded when they are accessed, through read-only PersonView handles
+that the exporters and metrics accept like Person objects.
+
+File layout (version 1, native byte order recorded in the header):
+
+    magic (8 bytes) | version (u32) | metadata length (u32) | metadata (UTF-8 JSON)
+    | 8-byte aligned blocks: one per PersonTable column, the generations' member rows
+      and start offsets, the string offsets and the UTF-8 string data
+
+The metadata records each block's offset, typecode and length.
+"""
+
+from __future__ import annotations
+from array import array
+from dataclasses import asdict
+from typing import Dict, Iterator, List, Optional, Sequence
+import json
+import mmap
+import struct
+import sys
+import weakref
+
+import config.fertility_config as fertility_config
+import config.mortality_config as mortality_config
+from config.sim_config import SimConfig
+from models.person import Person
+from models.person_table import _COLUMNS, PersonTable, PersonView
+from services.ensemble import DynastyParams
+
+MAGIC = b"DYNSNAP\x00"
+VERSION = 1
+_HEADER = struct.Struct("<8sII")
+_ALIGN = 8
+
+
+def _config_to_dict(cfg: SimConfig) -> dict:
+    return {
+        "mortality": {"class": type(cfg.mortality).__name__, "fields": asdict(cfg.mortality)},
+        "fertility": {
+            "class": type(cfg.fertility).__name__,
+            # JSON keys are strings; stored as pairs to keep the ints
+            "num_children_pd": list(cfg.fertility.num_children_pd.items()),
+        },
+        "playable_character_age_max": cfg.playable_character_age_max,
+    }
+
+
+def _config_from_dict(data: dict) -> SimConfig:
+    mortality_cls = getattr(mortality_config, data["mortality"]["class"], mortality_config.MortalityConfig)
+    mortality = mortality_cls(**{
+        name: tuple(value) if isinstance(value, list) else value
+        for name, value in data["mortality"]["fields"].items()
+    })
+    fertility_cls = getattr(fertility_config, data["fertility"]["class"], fertility_config.FertilityConfig)
+    fertility = fertility_cls(num_children_pd={int(k): p for k, p in data["fertility"]["num_children_pd"]})
+    return SimConfig(
+        mortality=mortality,
+        fertility=fertility,
+        playable_character_age_max=data["playable_character_age_max"],
+    )
+
+
+def save_snapshot(
+    dynasty: Sequence[Sequence[Person]],
+    path: str,
+    cfg: Optional[SimConfig] = None,
+    params: Optional[DynastyParams] = None,
+    seed: Optional[int] = None,
+) -> None:
+    """Write a dynasty (Person objects or PersonViews) and what produced it to a snapshot file."""
+    table, views = PersonTable.from_dynasty(dynasty)
+
+    generation_rows = array("i", (view.row for generation in views for view in generation))
+    generation_starts = array("i", [0])
+    for generation in views:
+        generation_starts.append(generation_starts[-1] + len(generation))
+
+    encoded = [s.encode("utf-8") for s in table.strings]
+    string_offsets = array("q", [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+
+    blocks: Dict[str, object] = {name: getattr(table, name) for name in _COLUMNS}
+    blocks["generation_rows"] = generation_rows
+    blocks["generation_starts"] = generation_starts
+    blocks["string_offsets"] = string_offsets
+    blocks["string_data"] = b"".join(encoded)
+
+    # The header's length depends on the offsets, so lay out the blocks after a fixed
+    # estimate and grow it until the metadata fits
+    reserve = 4096
+    while True:
+        offset = reserve
+        layout = {}
+        for name, block in blocks.items():
+            size = len(block) * block.itemsize if isinstance(block, array) else len(block)
+            typecode = block.typecode if isinstance(block, array) else "B"
+            layout[name] = {"offset": offset, "typecode": typecode, "length": len(block)}
+            offset += -(-size // _ALIGN) * _ALIGN
+        metadata = json.dumps({
+            "byteorder": sys.byteorder,
+            "itemsizes": {code: array(code).itemsize for code in "bhiq"},
+            "people": len(table),
+            "generations": len(views),
+            "seed": seed,
+            "params": asdict(params) if params is not None else None,
+            "config": _config_to_dict(cfg) if cfg is not None else None,
+            "blocks": layout,
+        }).encode("utf-8")
+        if _HEADER.size + len(metadata) <= reserve:
+            break
+        reserve *= 2
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(metadata)))
+        f.write(metadata)
+        for name, block in blocks.items():
+            f.seek(layout[name]["offset"])
+            f.write(block.tobytes() if isinstance(block, array) else block)
+        f.truncate(offset)
+
+
+class _SnapshotStrings:
+    """Sequence of the snapshot's strings, decoded on first access."""
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self._offsets = offsets
+        self._data = data
+        self._cache: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        value = self._cache.get(index)
+        if value is None:
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            value = str(self._data[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+            self._cache[index] = value
+        return value
+
+
+class SnapshotTable(PersonTable):
+    """Read-only PersonTable whose columns are memoryviews of a mapped snapshot."""
+
+    def __init__(self, columns: Dict[str, memoryview], strings: _SnapshotStrings):
+        for name, column in columns.items():
+            setattr(self, name, column)
+        self.strings = strings
+        self._string_index = {}
+        self._views = weakref.WeakValueDictionary()
+
+    def intern(self, value: Optional[str]) -> int:
+        raise TypeError("Snapshot tables are read-only")
+
+
+class DynastySnapshot:
+    """
+    A snapshot file mapped into memory.
+
+    Use as a context manager, or call close(). Views taken from it cannot be used
+    after it is closed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if not f.seek(0, 2):
+                raise ValueError(f"{path} is empty")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < _HEADER.size:
+                raise ValueError(f"{path} is not a dynasty snapshot")
+            magic, version, length = _HEADER.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a dynasty snapshot")
+            if version != VERSION:
+                raise ValueError(f"{path} is snapshot version {version}; this build reads version {VERSION}")
+            self.metadata: dict = json.loads(self._mmap[_HEADER.size:_HEADER.size + length])
+            itemsizes = {code: array(code).itemsize for code in "bhiq"}
+            if self.metadata["byteorder"] != sys.byteorder or self.metadata["itemsizes"] != itemsizes:
+                raise ValueError(f"{path} was written on a platform with a different byte order or integer sizes")
+        except Exception:
+            self._mmap.close()
+            raise
+
+        self._buffer = memoryview(self._mmap)
+        self._blocks: Dict[str, memoryview] = {}
+        for name, block in self.metadata["blocks"].items():
+            start = block["offset"]
+            raw = self._buffer[start:start + block["length"] * array(block["typecode"]).itemsize]
+            self._blocks[name] = raw if block["typecode"] == "B" else raw.cast(block["typecode"])
+
+        self.table = SnapshotTable(
+            {name: self._blocks[name] for name in _COLUMNS},
+            _SnapshotStrings(self._blocks["string_offsets"], self._blocks["string_data"]),
+        )
+
+    def __enter__(self) -> DynastySnapshot:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._mmap.closed:
+            return
+        self.table._views.clear()
+        for block in self._blocks.values():
+            block.release()
+        self._buffer.release()
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        """Number of people (members and wives)."""
+        return self.metadata["people"]
+
+    @property
+    def seed(self) -> Optional[int]:
+        return self.metadata["seed"]
+
+    @property
+    def params(self) -> Optional[DynastyParams]:
+        data = self.metadata["params"]
+        return DynastyParams(**data) if data is not None else None
+
+    @property
+    def config(self) -> Optional[SimConfig]:
+        data = self.metadata["config"]
+        return _config_from_dict(data) if data is not None else None
+
+    @property
+    def generation_count(self) -> int:
+        return self.metadata["generations"]
+
+    def generation(self, g: int) -> List[PersonView]:
+        """Members of generation g, as views."""
+        if not 0 <= g < self.generation_count:
+            raise ValueError(f"No generation {g} (snapshot has {self.generation_count})")
+        starts, rows = self._blocks["generation_starts"], self._blocks["generation_rows"]
+        return [self.table.view(rows[i]) for i in range(starts[g], starts[g + 1])]
+
+    def iter_generations(self) -> Iterator[List[PersonView]]:
+        for g in range(self.generation_count):
+            yield self.generation(g)
+
+    def generations(self) -> List[List[PersonView]]:
+        """The whole dynasty as views (the shape generate_dynasty returns)."""
+        return list(self.iter_generations())
+
+
+def load_snapshot(path: str) -> DynastySnapshot:
+    """Map a snapshot file written by save_snapshot."""
+    return DynastySnapshot(path)
+
+
+__all__ = ["DynastySnapshot", "MAGIC", "VERSION", "load_snapshot", "save_snapshot"]
@@ -3,7 +3,8 @@ from typing import List
 import random
 
 from config.mortality_config import MortalityConfig
-from config.other_constants import DAYS_IN_YEAR, DAYS_IN_MONTH
+from config.other_constants import DAYS_IN_YEAR
+from services.calendar_table import ck3_date
 
 # Calendar conversions
 def convert_calendar_years_to_days(year: int) -> int:
@@ -12,17 +13,7 @@ def convert_calendar_days_to_years(days: int) -> int:
     return (days - 1) // DAYS_IN_YEAR + 1
 def convert_calendar_days_to_CK3_date(days: int) -> str:
     # CK3 date format: "YYYY.MM.DD", where month and day are 1-justified
-    year = convert_calendar_days_to_years(days)
-    day_of_year = days - convert_calendar_years_to_days(year) + 1
-
-    month = 1
-    for dim in DAYS_IN_MONTH:
-        if day_of_year <= dim:
-            break
-        day_of_year -= dim
-        month += 1
-
-    return f"{year}.{month}.{day_of_year}"
+    return ck3_date(days)
 
 # Duration conversions
 def convert_years_to_days_duration(years: int) -> int:
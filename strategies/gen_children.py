@@ -1,27 +1,26 @@
-from typing import List, Optional
-import random
+from typing import List
 
 from models.person import Person
-from services.factory import PersonFactory
-from config.sim_config import SimConfig
 from config.other_constants import CHANCE_OF_SON
-from services.utils import sample_key_by_weights, generate_calendar_day_in_year, convert_calendar_days_to_years
+from services.generation_context import GenerationContext
+from services.utils import generate_calendar_day_in_year, convert_calendar_days_to_years
 from services.children_gen_utils import draw_children_with_exposure
 from strategies.gen_wife import gen_wife
 
 
-def gen_children(*, cfg: SimConfig, father: Person, end_date: int, rng: random.Random, male_only: bool = False, factory: Optional[PersonFactory] = None) -> List[Person]:
+def gen_children(*, ctx: GenerationContext, father: Person, male_only: bool = False) -> List[Person]:
     """
     Generate children for a father using the configured fertility settings.
     Handles exposure scaling and gap constraints internally.
     """
+    rng, end_date = ctx.rng, ctx.end_date
     children: List[Person] = []
     
     # Sample baseline number of children
-    baseline_k = sample_key_by_weights(cfg.fertility.num_children_pd, rng)
+    baseline_k = ctx.cfg.num_children.sample(rng)
     
     # Create mother
-    mother: Person = gen_wife(father=father, end_date=end_date, cfg=cfg, rng=rng)
+    mother: Person = gen_wife(ctx=ctx, father=father)
     
     # Get birth days with exposure scaling and gap enforcement
     children_birthdays = draw_children_with_exposure(
@@ -32,13 +31,8 @@ def gen_children(*, cfg: SimConfig, father: Person, end_date: int, rng: random.R
         baseline_k=baseline_k,
     )
     
-    # Create child persons, preserving culture and dynasty_name
-    child_factory = PersonFactory(
-        cfg=cfg,
-        rng=rng,
-        culture=factory.culture if factory else 'chinese',
-        dynasty_name=factory.dynasty_name if factory else None,
-    ) if factory else PersonFactory(cfg=cfg, rng=rng)
+    # Children keep the dynasty's culture and name
+    child_factory = ctx.factory()
     
     for birthday in children_birthdays:
         if birthday > end_date:
@@ -62,12 +56,12 @@ def gen_children(*, cfg: SimConfig, father: Person, end_date: int, rng: random.R
 """
 This strategy generates only sons.
 """
-def gen_children_male_only(*, cfg: SimConfig, father: Person, end_date: int, rng: random.Random, factory: Optional[PersonFactory] = None) -> List[Person]:
-    return gen_children(cfg=cfg, father=father, end_date=end_date, rng=rng, male_only=True, factory=factory)
+def gen_children_male_only(*, ctx: GenerationContext, father: Person) -> List[Person]:
+    return gen_children(ctx=ctx, father=father, male_only=True)
 
 
 """
 This strategy generates both sons and daughters normally.
 """
-def gen_children_normal(*, cfg: SimConfig, father: Person, end_date: int, rng: random.Random, factory: Optional[PersonFactory] = None) -> List[Person]:
-    return gen_children(cfg=cfg, father=father, end_date=end_date, rng=rng, factory=factory)
+def gen_children_normal(*, ctx: GenerationContext, father: Person) -> List[Person]:
+    return gen_children(ctx=ctx, father=father)
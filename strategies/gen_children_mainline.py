@@ -1,23 +1,20 @@
 from typing import List
-import random
 
 from models.person import Person
-from services.factory import PersonFactory
-from config.sim_config import SimConfig
-from config.fertility_config import FertilityConfig
-from config.mortality_config import MainlineMortalityConfig, NonMainlineMortilityConfig
-from config.other_constants import NUM_MAINLINE_CHILD_PD, FATHER_AGE_OFFSET_PD, MOTHER_FERTILITY_WINDOW
-from services.utils import sample_key_by_weights
-from services.children_gen_utils import draw_children_birth_years_exact_k
+from config.other_constants import MOTHER_FERTILITY_WINDOW, MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS
+from services.compiled_config import MORTALITY_MAINLINE, MORTALITY_NON_MAINLINE
+from services.generation_context import GenerationContext
+from services.children_gen_utils import draw_children_birth_years_exact_k, max_children_with_gap
 
 """
 This strategy generates only the single surviving line of male heirs. This should also NOT generate mothers/wives.
 """
-def gen_children_mainline(*, fcfg: FertilityConfig, father: Person, end_date: int, rng: random.Random, factory: PersonFactory = None) -> List[Person]:
+def gen_children_mainline(*, ctx: GenerationContext, father: Person) -> List[Person]:
+    cfg, rng, end_date = ctx.cfg, ctx.rng, ctx.end_date
     children: List[Person] = []
-    num_children = sample_key_by_weights(fcfg.num_children_pd, rng)
-    num_mainline_sons = sample_key_by_weights(NUM_MAINLINE_CHILD_PD, rng)
-    father_age_offset = sample_key_by_weights(FATHER_AGE_OFFSET_PD, rng)
+    num_children = cfg.num_children.sample(rng)
+    num_mainline_sons = cfg.num_mainline_children.sample(rng)
+    father_age_offset = cfg.father_age_offset.sample(rng)
 
     mother_age_at_fathers_death = father.death_year - father.birth_year - father_age_offset
     # In other iterations where there is a mother, we will also need to contend with her own death, but this is easy because it's a stored variable
@@ -26,6 +23,9 @@ def gen_children_mainline(*, fcfg: FertilityConfig, father: Person, end_date: in
     # Mother's birth year = father's birth year - father_age_offset
     mother_birth_year = father.birth_year - father_age_offset
     
+    # A father who dies young may not leave room for num_children with the sibling gap
+    num_children = min(num_children, max_children_with_gap(MOTHER_FERTILITY_WINDOW[0], fertility_end, MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS))
+
     # Get absolute birth days for children (already has gap enforcement built in)
     children_birthdays = draw_children_birth_years_exact_k(
         rng=rng,
@@ -37,19 +37,9 @@ def gen_children_mainline(*, fcfg: FertilityConfig, father: Person, end_date: in
     
     sons_birthdays = sorted(rng.sample(children_birthdays, k=min(num_mainline_sons, len(children_birthdays))))
 
-    # Create factories with appropriate mortality configs, but preserve culture and dynasty_name
-    non_main_factory = PersonFactory(
-        cfg=SimConfig(mortality=NonMainlineMortilityConfig(), fertility=fcfg),
-        rng=rng,
-        culture=factory.culture if factory else 'chinese',
-        dynasty_name=factory.dynasty_name if factory else None,
-    )
-    main_factory = PersonFactory(
-        cfg=SimConfig(mortality=MainlineMortalityConfig(), fertility=fcfg),
-        rng=rng,
-        culture=factory.culture if factory else 'chinese',
-        dynasty_name=factory.dynasty_name if factory else None,
-    )
+    # Mainline and non-mainline sons use their own mortality, but keep culture and dynasty_name
+    non_main_factory = ctx.factory(MORTALITY_NON_MAINLINE)
+    main_factory = ctx.factory(MORTALITY_MAINLINE)
     for birthday in sons_birthdays[:-1]:
         if birthday > end_date:
             break
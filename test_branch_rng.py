@@ -0,0 +1,92 @@
+"""
+Test per-person RNG keys and branch rerolls.
+"""
+
+import random
+
+from services.branch_rng import DEFAULT_SALT, ROOT_KEY, child_key, person_seed
+from services.simulation import generate_dynasty_run, reroll_branch
+from config.mortality_config import GenerousMortalityConfig
+from config.fertility_config import GenerousFertilityConfig
+from config.sim_config import SimConfig
+from config.other_constants import convert_calendar_years_to_days
+
+
+KWARGS = dict(
+    birth_year=1000,
+    male_only_start_date=convert_calendar_years_to_days(1030),
+    normal_start_date=convert_calendar_years_to_days(1060),
+    end_date=convert_calendar_years_to_days(1200),
+    cfg=SimConfig(mortality=GenerousMortalityConfig(), fertility=GenerousFertilityConfig()),
+    dynasty_name="Zhu",
+)
+
+
+def _shape(dynasty):
+    return [[(p.given_name, p.date_of_birth, p.date_of_death, len(p.children)) for p in gen] for gen in dynasty]
+
+
+def _descendants(person):
+    found, stack = [], list(person.children)
+    while stack:
+        p = stack.pop()
+        found.append(p)
+        stack.extend(p.children)
+    return found
+
+
+def _branch_root(run):
+    """A person a few generations down who has descendants."""
+    return next(p for p in run.generations[3] if p.children and any(c.children for c in p.children))
+
+
+def test_keys_are_distinct():
+    """Children of different fathers or at different indices get different keys and seeds."""
+    keys = {child_key(parent, index) for parent in range(50) for index in range(20)}
+    assert len(keys) == 1000 and ROOT_KEY not in keys
+    assert person_seed(1, 2) != person_seed(1, 2, salt=3)
+    print("✓ Person keys and seeds are distinct")
+
+
+def test_replaying_branch_is_identical():
+    """Regenerating a subtree in isolation with its own salt gives the same people."""
+    run = generate_dynasty_run(rng=random.Random(3), **KWARGS)
+    expected = _shape(run.generations)
+    replayed = reroll_branch(run, _branch_root(run), salt=DEFAULT_SALT)
+    assert _shape(replayed.generations) == expected
+    print("✓ Replaying a branch reproduces the dynasty")
+
+
+def test_reroll_branch_only_changes_descendants():
+    """Rerolling a branch keeps everyone outside it and resamples its descendants."""
+    run = generate_dynasty_run(rng=random.Random(3), **KWARGS)
+    root = _branch_root(run)
+    old_branch = [(p.given_name, p.date_of_birth) for p in _descendants(root)]
+    outside_ids = {id(p) for gen in run.generations for p in gen} - {id(p) for p in _descendants(root)}
+
+    rerolled = reroll_branch(run, root, rng=random.Random(123))
+    new_ids = {id(p) for gen in rerolled.generations for p in gen}
+    assert outside_ids <= new_ids
+    assert [(p.given_name, p.date_of_birth) for p in _descendants(root)] != old_branch
+    assert all(c.father is root for c in root.children)
+    print("✓ Branch reroll only replaces the branch")
+
+
+def test_rerolling_ancestor_drops_inner_salts():
+    """Replaying an ancestor of a rerolled branch forgets the inner reroll."""
+    run = generate_dynasty_run(rng=random.Random(3), **KWARGS)
+    original = _shape(run.generations)
+    rerolled = reroll_branch(run, _branch_root(run), rng=random.Random(123))
+    assert len(rerolled.branch_salts) == 1
+
+    again = reroll_branch(rerolled, rerolled.founder, salt=DEFAULT_SALT)
+    assert again.branch_salts == {ROOT_KEY: DEFAULT_SALT}
+    assert _shape(again.generations) == original
+    print("✓ Rerolling an ancestor drops salts set inside its branch")
+
+
+if __name__ == "__main__":
+    test_keys_are_distinct()
+    test_replaying_branch_is_identical()
+    test_reroll_branch_only_changes_descendants()
+    test_rerolling_ancestor_drops_inner_salts()
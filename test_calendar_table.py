@@ -0,0 +1,45 @@
+"""
+Test the precomputed calendar conversions.
+"""
+
+import pytest
+
+from config.other_constants import DAYS_IN_MONTH, DAYS_IN_YEAR, CK3_1066_START_DAY
+from services.calendar_table import ck3_date, day_to_date, days_to_dates, gedcom_date
+from services.utils import convert_calendar_years_to_days
+
+
+def _loop_date(absolute_day):
+    """Reference conversion walking the months."""
+    year = (absolute_day - 1) // DAYS_IN_YEAR + 1
+    day_of_year = (absolute_day - 1) % DAYS_IN_YEAR + 1
+    month = 1
+    for dim in DAYS_IN_MONTH:
+        if day_of_year <= dim:
+            break
+        day_of_year -= dim
+        month += 1
+    return year, month, day_of_year
+
+
+DAYS = range(convert_calendar_years_to_days(866), convert_calendar_years_to_days(869) + 5)
+
+
+def test_table_matches_month_walk():
+    for day in DAYS:
+        assert day_to_date(day) == _loop_date(day)
+    print(f"✓ {len(DAYS)} days match")
+
+
+def test_formatted_dates():
+    assert ck3_date(CK3_1066_START_DAY) == "1066.9.15"
+    assert gedcom_date(CK3_1066_START_DAY) == "15 SEP 1066"
+    assert ck3_date(convert_calendar_years_to_days(867)) == "867.1.1"
+    assert ck3_date(convert_calendar_years_to_days(868) - 1) == "867.12.31"
+    assert gedcom_date(convert_calendar_years_to_days(868) - 1) == "31 DEC 867"
+
+
+def test_vectorized_matches_scalar():
+    np = pytest.importorskip("numpy")
+    years, months, days = days_to_dates(np.arange(DAYS.start, DAYS.stop))
+    assert list(zip(years.tolist(), months.tolist(), days.tolist())) == [day_to_date(d) for d in DAYS]
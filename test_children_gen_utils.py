@@ -0,0 +1,79 @@
+"""
+Test the cached exact-k sibling sampler.
+"""
+
+import itertools
+import math
+import random
+
+import pytest
+
+from config.other_constants import CHILD_BY_MOTHER_AGE_PD, MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS
+from services.children_gen_utils import (
+    draw_children_birth_years_exact_k,
+    draw_children_birth_years_exact_k_batch,
+    get_exact_k_table,
+)
+
+
+def test_table_is_cached_per_key():
+    """The same key returns the same precompiled table."""
+    get_exact_k_table.cache_clear()
+    first = get_exact_k_table(14, 39, 4)
+    assert get_exact_k_table(14, 39, 4) is first
+    assert get_exact_k_table.cache_info().hits == 1
+    assert get_exact_k_table(14, 39, 5) is not first
+    print("✓ Exact-k tables are cached")
+
+
+def test_table_matches_enumeration():
+    """log_dp agrees with brute-force enumeration of gap-respecting age sets."""
+    start, stop, k = 20, 30, 3
+    table = get_exact_k_table(start, stop, k)
+    ages = [a for a in range(start, stop + 1) if CHILD_BY_MOTHER_AGE_PD.get(a, 0) > 0]
+    total = sum(
+        math.prod(CHILD_BY_MOTHER_AGE_PD[a] for a in combo)
+        for combo in itertools.combinations(ages, k)
+        if all(b - a >= MINIMUM_GAP_BETWEEN_SIBLINGS_YEARS for a, b in zip(combo, combo[1:]))
+    )
+    assert math.isclose(math.exp(table.log_dp[0][k]), total, rel_tol=1e-12)
+    print("✓ Log-space DP matches enumeration")
+
+
+def test_late_window_does_not_underflow():
+    """A low-weight window with the maximum k still samples exactly k ages."""
+    table = get_exact_k_table(30, 39, 5)
+    assert table.log_dp[0][5] > float("-inf")
+    rng = random.Random(1)
+    for _ in range(50):
+        days = draw_children_birth_years_exact_k(rng=rng, k=5, start_age=30, stop_age=39, mother_birth_year=1100)
+        assert len(days) == 5
+    print("✓ Late fertility window samples without underflow")
+
+
+def test_impossible_window_raises():
+    with pytest.raises(ValueError):
+        get_exact_k_table(14, 19, 5)
+
+
+def test_batch_matches_repeated_single_draws():
+    """The batch API consumes the RNG exactly like repeated single draws."""
+    mothers = [1100, 1105, 1110, 1111]
+    batch = draw_children_birth_years_exact_k_batch(
+        rng=random.Random(9), k=3, start_age=14, stop_age=39, mother_birth_years=mothers
+    )
+    rng = random.Random(9)
+    single = [
+        draw_children_birth_years_exact_k(rng=rng, k=3, start_age=14, stop_age=39, mother_birth_year=m)
+        for m in mothers
+    ]
+    assert batch == single
+    print("✓ Batch draws match single draws")
+
+
+if __name__ == "__main__":
+    test_table_is_cached_per_key()
+    test_table_matches_enumeration()
+    test_late_window_does_not_underflow()
+    test_impossible_window_raises()
+    test_batch_matches_repeated_single_draws()
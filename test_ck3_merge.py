@@ -0,0 +1,78 @@
+"""
+Test the CK3 history index and merging into existing history files.
+"""
+
+import os
+import random
+import tempfile
+
+import pytest
+
+from exporters.ck3_merge import CK3HistoryIndex, merge_into_ck3_history
+from exporters.export_to_ck3 import export_to_ck3
+from services.simulation import generate_dynasty
+from test_iter_dynasty import KWARGS
+
+END_DATE = KWARGS["end_date"]
+CK3_ARGS = ("Zhu", "chinese", "jingxue", True, END_DATE)
+MOD_TEXT = (
+    "# Hand-written characters\n"
+    "mod_1 = {\n"
+    "\tname = \"Brace { in a string\"  # and } in a comment\n"
+    "\t867.1.1 = { birth = yes }\n"
+    "}\n"
+)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_index_finds_top_level_blocks():
+    data = MOD_TEXT.encode("utf-8") + b"\nother = { a = { b = c } }\n"
+    index = CK3HistoryIndex(data)
+    assert list(index.blocks) == ["mod_1", "other"]
+    start, end = index.range("other")
+    assert data[start:end] == b"other = { a = { b = c } }"
+    with pytest.raises(ValueError):
+        CK3HistoryIndex(b"broken = { a = b\n")
+
+
+def test_merge_appends_replaces_and_prunes():
+    big = generate_dynasty(rng=random.Random(2), **KWARGS)
+    small = generate_dynasty(rng=random.Random(3), **KWARGS)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "characters.txt")
+        fresh = os.path.join(tmpdir, "fresh.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(MOD_TEXT)
+
+        # First merge only appends, after the hand-written block
+        result = merge_into_ck3_history(big, path, *CK3_ARGS)
+        assert not result.replaced and len(result.added) == len(CK3HistoryIndex.from_file(path)) - 1
+        export_to_ck3(big, fresh, *CK3_ARGS)
+        assert _read(path) == MOD_TEXT.encode("utf-8") + b"\n" + _read(fresh)
+
+        # Merging the same dynasty again changes nothing
+        result = merge_into_ck3_history(big, path, *CK3_ARGS)
+        assert not result.added and result.bytes_written == 0
+
+        # A smaller dynasty replaces the shared IDs and prunes the rest
+        result = merge_into_ck3_history(small, path, *CK3_ARGS, prune=True)
+        assert result.removed and not result.added
+        export_to_ck3(small, fresh, *CK3_ARGS)
+        assert _read(path) == MOD_TEXT.encode("utf-8") + b"\n" + _read(fresh)
+    print(f"✓ merged {len(result.replaced)} blocks and pruned {len(result.removed)}")
+
+
+def test_merge_collision_modes():
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "characters.txt")
+        export_to_ck3(dynasty, path, *CK3_ARGS)
+        before = _read(path)
+        with pytest.raises(ValueError):
+            merge_into_ck3_history(dynasty, path, *CK3_ARGS, on_collision="error")
+        result = merge_into_ck3_history(dynasty, path, "Zhu", "chinese", "catholic", True, END_DATE, on_collision="skip")
+        assert result.skipped and _read(path) == before
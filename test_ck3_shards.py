@@ -0,0 +1,63 @@
+"""
+Test the sharded CK3 history export.
+"""
+
+import gzip
+import json
+import random
+
+import pytest
+
+from exporters.ck3_merge import CK3HistoryIndex
+from exporters.ck3_shards import export_ck3_shards
+from exporters.export_to_ck3 import export_to_ck3
+from services.simulation import generate_dynasty
+from test_iter_dynasty import KWARGS
+
+ARGS = ("Zhu", "chinese", "catholic")
+
+
+def _blocks(data: bytes) -> dict:
+    index = CK3HistoryIndex(data)
+    return {key: data[start:end] for key, (start, end) in index.blocks.items()}
+
+
+@pytest.mark.parametrize("by", ["generation", "branch"])
+def test_shards_hold_the_single_file(tmp_path, by):
+    """Together the shards hold exactly the blocks of one export_to_ck3 file."""
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    single = tmp_path / "zhu.txt"
+    export_to_ck3(dynasty, str(single), *ARGS, end_date=KWARGS["end_date"])
+    expected = _blocks(single.read_bytes())
+
+    manifest = export_ck3_shards(dynasty, str(tmp_path / "shards"), *ARGS, by=by, end_date=KWARGS["end_date"])
+    found = {}
+    for shard in manifest.shards:
+        blocks = _blocks((tmp_path / "shards" / shard.file).read_bytes())
+        assert not found.keys() & blocks.keys()
+        assert sum(1 for key in blocks if "_wife_" in key) == shard.wives
+        found.update(blocks)
+    assert found == expected
+    assert manifest.characters == len(expected)
+
+    saved = json.loads((tmp_path / "shards" / "zhu_manifest.json").read_text(encoding="utf-8"))
+    assert saved["by"] == by and [s["file"] for s in saved["shards"]] == [s.file for s in manifest.shards]
+    if by == "generation":
+        assert [s.members for s in manifest.shards] == [len(g) for g in dynasty]
+    else:
+        assert manifest.shards[0].members == len(dynasty[0])
+        assert [s.root for s in manifest.shards[1:]] == [f"zhu_character_{i + 2}" for i in range(len(dynasty[1]))]
+    print(f"✓ {manifest.characters} characters in {len(manifest.shards)} {by} shards")
+
+
+def test_compressed_shards_replace_stale_ones(tmp_path):
+    dynasty = generate_dynasty(rng=random.Random(2), **KWARGS)
+    export_ck3_shards(dynasty, str(tmp_path), *ARGS, by="generation")
+    manifest = export_ck3_shards(dynasty, str(tmp_path), *ARGS, by="branch", compression="gzip")
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert names == sorted([s.file for s in manifest.shards] + ["zhu_manifest.json"])
+    with gzip.open(tmp_path / manifest.shards[0].file, "rb") as f:
+        assert f.read().startswith(b"zhu_character_1 = {")
+
+    with pytest.raises(ValueError):
+        export_ck3_shards(dynasty, str(tmp_path), *ARGS, by="house")
@@ -0,0 +1,59 @@
+"""
+Test the streaming CK3 history writer.
+"""
+
+import io
+import os
+import random
+import tempfile
+
+from exporters.export_to_ck3 import CK3HistoryWriter, export_to_ck3, write_ck3_history
+from services.simulation import generate_dynasty, iter_dynasty
+from test_iter_dynasty import KWARGS
+
+EXPORT_ARGS = ("Zhu", "chinese", "jingxue", True, KWARGS["end_date"])
+
+
+def test_stream_matches_file_export():
+    """Writing to a text stream gives the same text as export_to_ck3."""
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    buffer = io.StringIO()
+    chars = write_ck3_history(dynasty, buffer, *EXPORT_ARGS)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "zhu.txt")
+        export_to_ck3(dynasty, path, *EXPORT_ARGS)
+        with open(path, encoding="utf-8") as f:
+            expected = f.read()
+
+    assert buffer.getvalue() == expected
+    assert chars == len(expected)
+    # Members first, then wives
+    total = sum(len(g) for g in dynasty)
+    assert expected.index("zhu_wife_1 = {") > expected.index(f"zhu_character_{total} = {{")
+    print(f"✓ streamed {chars} characters identical to export_to_ck3")
+
+
+def test_streaming_generator_with_released_ids():
+    """A released iter_dynasty stream writes the same file while keeping few IDs."""
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    expected = io.StringIO()
+    write_ck3_history(dynasty, expected, *EXPORT_ARGS)
+
+    buffer = io.StringIO()
+    largest = 0
+    with CK3HistoryWriter(buffer, *EXPORT_ARGS, release_ids=True) as writer:
+        for generation in iter_dynasty(rng=random.Random(3), release_ancestors=True, **KWARGS):
+            writer.write_generation(generation)
+            largest = max(largest, len(writer._ids))
+
+    assert buffer.getvalue() == expected.getvalue()
+    total = sum(len(g) for g in dynasty)
+    assert largest < total
+    print(f"✓ at most {largest} IDs held for {total} members")
+
+
+def test_empty_dynasty_writes_nothing():
+    buffer = io.StringIO()
+    assert write_ck3_history([], buffer, *EXPORT_ARGS) == 0
+    assert buffer.getvalue() == ""
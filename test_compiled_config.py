@@ -0,0 +1,79 @@
+"""
+Test compiled sim configs and alias-table sampling.
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+import random
+
+import pytest
+
+from config.sim_config import SimConfig
+from config.mortality_config import NormalMortalityConfig, RealisticMortalityConfig, MortalityConfig
+from config.fertility_config import NormalFertilityConfig, GenerousFertilityConfig
+from services.compiled_config import (
+    MORTALITY_MAINLINE,
+    compile_sim_config,
+    ensure_compiled,
+)
+from services.sampling import AliasTable
+from services.utils import draw_age_at_death
+
+
+def test_alias_table_matches_distribution():
+    """Alias draws follow the source weights."""
+    pd = {1: 0.1, 2: 0.25, 3: 0.3, 4: 0.25, 5: 0.1}
+    table = AliasTable.from_pd(pd)
+    rng = random.Random(3)
+    n = 100_000
+    counts = Counter(table.sample(rng) for _ in range(n))
+    for key, p in pd.items():
+        assert abs(counts[key] / n - p) < 0.01
+    print("✓ Alias table samples match the distribution")
+
+
+def test_alias_table_rejects_bad_distributions():
+    with pytest.raises(ValueError):
+        AliasTable.from_pd({})
+    with pytest.raises(ValueError):
+        AliasTable.from_pd({1: 0.0, 2: 0.0})
+    with pytest.raises(ValueError):
+        AliasTable.from_pd({1: -0.5, 2: 1.5})
+
+
+def test_fingerprint_is_stable_and_config_sensitive():
+    """Equal configs share a fingerprint; different configs do not."""
+    a = compile_sim_config(SimConfig(mortality=NormalMortalityConfig(), fertility=NormalFertilityConfig()))
+    b = compile_sim_config(SimConfig(mortality=NormalMortalityConfig(), fertility=NormalFertilityConfig()))
+    c = compile_sim_config(SimConfig(mortality=RealisticMortalityConfig(), fertility=NormalFertilityConfig()))
+    d = compile_sim_config(SimConfig(mortality=NormalMortalityConfig(), fertility=GenerousFertilityConfig()))
+
+    assert a.fingerprint == b.fingerprint and a == b and hash(a) == hash(b)
+    assert len({a.fingerprint, c.fingerprint, d.fingerprint}) == 3
+    assert ensure_compiled(a) is a
+    print(f"✓ Config fingerprint {a.fingerprint[:12]} is stable")
+
+
+def test_mortality_profiles_and_validation():
+    """Variants swap only the mortality; invalid ranges are rejected at compile time."""
+    compiled = compile_sim_config(SimConfig(mortality=NormalMortalityConfig(), fertility=NormalFertilityConfig()))
+    mainline = compiled.with_mortality_profile(MORTALITY_MAINLINE)
+    assert mainline.num_children is compiled.num_children
+    assert mainline.mortality.early_probability == 0.0
+    assert 40 <= draw_age_at_death(mainline.mortality, random.Random(1)) <= 70
+
+    @dataclass(frozen=True)
+    class BrokenMortality(MortalityConfig):
+        early_range: tuple[int, int] = (30, 20)
+        normal_range: tuple[int, int] = (50, 70)
+        early_probability: float = 0.5
+
+    with pytest.raises(ValueError):
+        compile_sim_config(SimConfig(mortality=BrokenMortality(), fertility=NormalFertilityConfig()))
+
+
+if __name__ == "__main__":
+    test_alias_table_matches_distribution()
+    test_alias_table_rejects_bad_distributions()
+    test_fingerprint_is_stable_and_config_sensitive()
+    test_mortality_profiles_and_validation()
@@ -0,0 +1,49 @@
+"""
+Test compressed export output.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import random
+
+import pytest
+
+from exporters.export_all import export_all
+from exporters.output import compression_for_path, open_text_output
+from services.simulation import generate_dynasty
+from test_iter_dynasty import KWARGS
+
+OPENERS = {"gz": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+
+@pytest.mark.parametrize("extension", sorted(OPENERS))
+def test_compressed_matches_plain(tmp_path, extension):
+    """A .gz/.bz2/.xz export decompresses to the plain file."""
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    kwargs = dict(religion="catholic", end_date=KWARGS["end_date"], end_year=1200)
+    plain = {"gedcom": str(tmp_path / "zhu.ged"), "ck3": str(tmp_path / "zhu.txt")}
+    packed = {name: f"{path}.{extension}" for name, path in plain.items()}
+    export_all(dynasty, plain, "Zhu", "chinese", **kwargs)
+    export_all(dynasty, packed, "Zhu", "chinese", **kwargs)
+    for name in plain:
+        with open(plain[name], "rb") as f:
+            expected = f.read()
+        with OPENERS[extension](packed[name], "rb") as f:
+            assert f.read() == expected
+        assert os.path.getsize(packed[name]) < len(expected)
+
+
+def test_compression_choice(tmp_path):
+    assert compression_for_path("a/tree.GED.GZ") == "gzip"
+    assert compression_for_path("zhu.txt.xz") == "lzma"
+    assert compression_for_path("zhu.txt") is None
+
+    # An explicit codec wins over the extension
+    path = tmp_path / "zhu.txt"
+    with open_text_output(str(path), "bz2") as f:
+        f.write("zhu_character_1 = {\n}\n")
+    assert bz2.decompress(path.read_bytes()) == b"zhu_character_1 = {\n}\n"
+    with pytest.raises(ValueError):
+        open_text_output(str(path), "zip")
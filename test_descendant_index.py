@@ -0,0 +1,80 @@
+"""
+Test the single-pass descendant index.
+"""
+
+import random
+
+from models.person import Person
+from services.descendant_index import DescendantIndex
+from services.dynasty_metrics import calculate_dynasty_stats, has_living_descendant
+from services.simulation import generate_dynasty
+from config.mortality_config import GenerousMortalityConfig
+from config.fertility_config import GenerousFertilityConfig
+from config.sim_config import SimConfig
+from config.other_constants import convert_calendar_years_to_days
+
+
+END_DATE = convert_calendar_years_to_days(1200)
+
+
+def _dynasty(seed: int):
+    return generate_dynasty(
+        birth_year=1000,
+        male_only_start_date=convert_calendar_years_to_days(1030),
+        normal_start_date=convert_calendar_years_to_days(1060),
+        end_date=END_DATE,
+        cfg=SimConfig(mortality=GenerousMortalityConfig(), fertility=GenerousFertilityConfig()),
+        rng=random.Random(seed),
+        dynasty_name="Zhu",
+    )
+
+
+def _descendants(person):
+    found, stack = [], list(person.children)
+    while stack:
+        p = stack.pop()
+        found.append(p)
+        stack.extend(p.children)
+    return found
+
+
+def _depth(person):
+    return 1 + max(_depth(c) for c in person.children) if person.children else 0
+
+
+def test_index_matches_direct_traversal():
+    """Every figure in the index matches a direct walk of the subtree."""
+    dynasty = _dynasty(3)
+    index = DescendantIndex(dynasty)
+    assert len(index) == sum(map(len, dynasty))
+    for generation in dynasty:
+        for person in generation:
+            descendants = _descendants(person)
+            assert index.subtree_size(person) == len(descendants) + 1
+            assert index.living_descendants(person) == sum(1 for d in descendants if d.is_living_at_end)
+            assert index.max_depth(person) == _depth(person)
+            assert index.has_living_descendant(person) == has_living_descendant(person)
+    print(f"✓ Index matches direct traversal for {len(index)} people")
+
+
+def test_deep_line_does_not_recurse():
+    """A line far deeper than the recursion limit is indexed without recursion."""
+    dynasty = [[Person(given_name="Founder", female=False, birth_year=0, death_year=60, is_living_at_end=False)]]
+    for i in range(5000):
+        father = dynasty[-1][0]
+        child = Person(given_name=f"Heir {i}", female=False, birth_year=i, death_year=i + 60, is_living_at_end=(i == 4999), father=father)
+        father.children = [child]
+        dynasty.append([child])
+
+    index = DescendantIndex(dynasty)
+    founder = dynasty[0][0]
+    assert index.max_depth(founder) == 5000
+    assert index.living_descendants(founder) == 1
+    assert has_living_descendant(founder)
+    assert all(g["surviving_branches"] == 1 for g in calculate_dynasty_stats(dynasty, END_DATE)["generations"][:-1])
+    print("✓ Deep lines are indexed without hitting the recursion limit")
+
+
+if __name__ == "__main__":
+    test_index_matches_direct_traversal()
+    test_deep_line_does_not_recurse()
@@ -0,0 +1,84 @@
+"""
+Test ensemble statistics aggregation.
+"""
+
+import json
+import os
+import random
+import tempfile
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.ensemble import DynastyParams, run_ensemble
+from services.ensemble_stats import EnsembleAggregator, MetricDistribution
+from config.mortality_config import RealisticMortalityConfig
+from config.fertility_config import GenerousFertilityConfig
+from config.sim_config import SimConfig
+from config.other_constants import convert_calendar_years_to_days
+
+
+def test_moments_and_exact_quantiles():
+    """With unit-width bins, moments and quantiles match NumPy on the raw values."""
+    rng = random.Random(1)
+    values = [rng.randint(0, 200) for _ in range(10000)]
+    d = MetricDistribution()
+    for v in values:
+        d.add(v)
+
+    assert d.n == len(values)
+    assert abs(d.mean - np.mean(values)) < 1e-9
+    assert abs(d.std - np.std(values, ddof=1)) < 1e-9
+    assert d.width == 1
+    assert d.quantiles([0.0, 0.5, 1.0]) == [float(v) for v in np.quantile(values, [0.0, 0.5, 1.0], method="lower")]
+    print("✓ Moments and quantiles are exact for small values")
+
+
+def test_histogram_stays_bounded():
+    """Large values widen the bins instead of growing the histogram."""
+    rng = random.Random(2)
+    values = [int(rng.expovariate(1 / 5000)) for _ in range(20000)]
+    d = MetricDistribution(bins=64)
+    for v in values:
+        d.add(v)
+
+    assert len(d.counts) == 64 and d.width > 1
+    assert int(d.counts.sum()) == len(values)
+    for q, estimate in zip((0.1, 0.5, 0.9), d.quantiles((0.1, 0.5, 0.9))):
+        assert abs(estimate - np.quantile(values, q)) <= d.width
+    print(f"✓ Histogram kept 64 bins at width {d.width}")
+
+
+def test_aggregates_ensemble_runs():
+    """The aggregator folds ensemble stats, per-generation sizes included, and saves a report."""
+    cfg = SimConfig(mortality=RealisticMortalityConfig(), fertility=GenerousFertilityConfig())
+    params = DynastyParams(
+        birth_year=1100,
+        male_only_start_date=convert_calendar_years_to_days(1130),
+        normal_start_date=convert_calendar_years_to_days(1160),
+        end_date=convert_calendar_years_to_days(1220),
+    )
+    runs = [r.stats for r in run_ensemble(cfg, 20, seed=5, workers=1, params=params)]
+    aggregator = EnsembleAggregator()
+    aggregator.add_all(runs)
+
+    summary = aggregator.summary()
+    assert summary["runs"] == 20
+    assert abs(summary["metrics"]["total_people"]["mean"] - np.mean([s["total_people"] for s in runs])) < 1e-9
+    assert summary["generation_sizes"][0]["reached"] == 20
+    assert "gen 0 size" in aggregator.format_report()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "report.json")
+        aggregator.save(path)
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+    assert sum(report["metrics"]["total_alive_at_end"]["histogram"]["counts"]) == 20
+    print(aggregator.format_report())
+
+
+if __name__ == "__main__":
+    test_moments_and_exact_quantiles()
+    test_histogram_stays_bounded()
+    test_aggregates_ensemble_runs()
@@ -0,0 +1,57 @@
+"""
+Test exporting several formats from one shared export index.
+"""
+
+import os
+import random
+import tempfile
+
+import pytest
+
+from exporters.export_all import export_all
+from exporters.export_index import ExportIndex
+from exporters.export_to_ck3 import export_to_ck3
+from exporters.export_to_gedcom import export_to_gedcom
+from services.simulation import generate_dynasty
+from test_iter_dynasty import KWARGS
+
+END_DATE = KWARGS["end_date"]
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_export_all_matches_single_exports():
+    """Both files match what the separate exporters write."""
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = {"gedcom": os.path.join(tmpdir, "all.ged"), "ck3": os.path.join(tmpdir, "all.txt")}
+        written = export_all(dynasty, paths, "Zhu", "chinese", "jingxue", end_date=END_DATE, end_year=1200, include_death_for_living=True)
+        assert written == paths
+
+        export_to_gedcom(dynasty, os.path.join(tmpdir, "one.ged"), end_year=1200, culture="chinese", dynasty_name="Zhu")
+        export_to_ck3(dynasty, os.path.join(tmpdir, "one.txt"), "Zhu", "chinese", "jingxue", True, END_DATE)
+        assert _read(paths["gedcom"]) == _read(os.path.join(tmpdir, "one.ged"))
+        assert _read(paths["ck3"]) == _read(os.path.join(tmpdir, "one.txt"))
+    print("✓ export_all output matches the single-format exporters")
+
+
+def test_ck3_ids_from_index():
+    """The index numbers members and wives like the CK3 exporter."""
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    index = ExportIndex(dynasty)
+    members = [p for generation in dynasty for p in generation]
+    assert [index.people[i] for i in index.members] == members
+    assert [index.ordinal[i] for i in index.members] == list(range(1, len(members) + 1))
+    wives = [p.spouse for p in members if p.spouse is not None]
+    assert [index.people[i] for i in index.wives] == wives
+
+
+def test_export_all_rejects_bad_requests():
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    with pytest.raises(ValueError):
+        export_all(dynasty, {"csv": "out.csv"}, "Zhu", "chinese")
+    with pytest.raises(ValueError):
+        export_all(dynasty, {"ck3": "out.txt"}, "Zhu", "chinese")
@@ -0,0 +1,34 @@
+"""
+Test the export index shared by the exporters.
+"""
+
+import random
+
+from exporters.export_index import ExportIndex, collect_people
+from services.simulation import generate_dynasty
+from test_iter_dynasty import KWARGS
+
+
+def test_index_matches_people_and_links():
+    """Families, spouse links and child links agree with the Person objects."""
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    index = ExportIndex(dynasty)
+    people = index.people
+    assert [id(p) for p in people] == [id(p) for p in collect_people(dynasty)]
+
+    fathers = [p for p in people if p.children or (p.spouse is not None and not p.female)]
+    assert [people[fam.father] for fam in index.families] == fathers
+    for f, family in enumerate(index.families):
+        father = people[family.father]
+        assert family.children == [index.position(c) for c in father.children]
+        if father.spouse is not None:
+            assert people[family.wife] is father.spouse
+            assert index.spouse_families[family.wife] == [f]
+        assert f in index.spouse_families[family.father]
+        for c in family.children:
+            assert index.child_families[c] == [f]
+
+    # Founder and wives have no parent family
+    assert index.child_families[0] == []
+    assert sum(len(links) for links in index.child_families) == sum(len(fam.children) for fam in index.families)
+    print(f"✓ {len(index.families)} families over {len(index)} people")
@@ -0,0 +1,70 @@
+"""
+Test process-parallel frontier expansion.
+"""
+
+import random
+
+from models.person_table import PersonTable
+from services.simulation import generate_dynasty
+from config.mortality_config import GenerousMortalityConfig
+from config.fertility_config import GenerousFertilityConfig
+from config.sim_config import SimConfig
+from config.other_constants import convert_calendar_years_to_days
+
+
+KWARGS = dict(
+    birth_year=1000,
+    male_only_start_date=convert_calendar_years_to_days(1030),
+    normal_start_date=convert_calendar_years_to_days(1060),
+    end_date=convert_calendar_years_to_days(1200),
+    cfg=SimConfig(mortality=GenerousMortalityConfig(), fertility=GenerousFertilityConfig()),
+    dynasty_name="Zhu",
+)
+
+
+def _shape(dynasty):
+    return [
+        [
+            (p.given_name, p.date_of_birth, p.date_of_death, p.date_of_marriage, len(p.children),
+             p.spouse.given_name if p.spouse else None)
+            for p in gen
+        ]
+        for gen in dynasty
+    ]
+
+
+def test_parallel_matches_serial():
+    """Expanding frontiers in worker processes gives the serial dynasty."""
+    serial = generate_dynasty(rng=random.Random(3), **KWARGS)
+    parallel = generate_dynasty(rng=random.Random(3), workers=2, min_parallel_frontier=1, **KWARGS)
+    assert _shape(parallel) == _shape(serial)
+    print(f"✓ Parallel expansion matches serial over {sum(map(len, serial))} people")
+
+
+def test_parallel_links_point_into_tree():
+    """Merged children, wives and fathers are linked to the real fathers, not copies."""
+    dynasty = generate_dynasty(rng=random.Random(3), workers=2, min_parallel_frontier=1, **KWARGS)
+    for gen, next_gen in zip(dynasty, dynasty[1:]):
+        ids = {id(p) for p in gen}
+        assert all(id(child.father) in ids for child in next_gen)
+        for father in gen:
+            if father.spouse is not None:
+                assert father.spouse.spouse is father
+            assert all(child.mother is father.spouse for child in father.children if child.mother is not None)
+    print("✓ Parallel expansion links into the tree")
+
+
+def test_parallel_rejects_person_table():
+    """Worker processes cannot share a person table."""
+    try:
+        generate_dynasty(rng=random.Random(3), workers=2, person_table=PersonTable(), **KWARGS)
+    except ValueError:
+        print("✓ Person table rejected")
+    else:
+        raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    test_parallel_matches_serial()
+    test_parallel_links_point_into_tree()
+    test_parallel_rejects_person_table()
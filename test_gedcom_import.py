@@ -0,0 +1,110 @@
+"""
+Test the GEDCOM importer.
+"""
+
+import io
+import random
+
+import pytest
+
+from exporters.export_to_ck3 import write_ck3_history
+from exporters.export_to_gedcom import export_to_gedcom
+from importers.import_from_gedcom import import_from_gedcom, parse_gedcom_date, read_gedcom
+from services.calendar_table import date_to_day
+from services.simulation import generate_dynasty
+from test_iter_dynasty import KWARGS
+
+
+@pytest.mark.parametrize("culture", ["chinese", "english"])
+def test_round_trip(tmp_path, culture):
+    """Exporting an imported file gives the same file back."""
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    first, second = tmp_path / "first.ged", tmp_path / "second.ged"
+    export_to_gedcom(dynasty, str(first), end_year=1200, culture=culture, dynasty_name="Zhu")
+
+    imported = import_from_gedcom(str(first))
+    assert [len(g) for g in imported.generations] == [len(g) for g in dynasty]
+    founder = imported.generations[0][0]
+    assert founder.dynasty_name == "Zhu"
+    assert founder.date_of_birth == dynasty[0][0].date_of_birth
+
+    export_to_gedcom(imported.generations, str(second), end_year=1200, culture=culture, dynasty_name="Zhu")
+    assert second.read_text(encoding="utf-8") == first.read_text(encoding="utf-8")
+    print(f"✓ {len(imported.people)} people round-tripped")
+
+
+@pytest.mark.parametrize("seed", [0, 3])
+def test_round_trip_keeps_living_status(tmp_path, seed):
+    """
+    The imported tree gives the same CK3 history, living-death dates included.
+
+    Deaths later in the end year are in the GEDCOM file, so only the end date tells
+    those people apart from the dead.
+    """
+    end_date = KWARGS["end_date"]
+    dynasty = generate_dynasty(rng=random.Random(seed), **KWARGS)
+    path = tmp_path / "zhu.ged"
+    export_to_gedcom(dynasty, str(path), end_year=1200, dynasty_name="Zhu")
+    imported = import_from_gedcom(str(path), end_date)
+
+    def ck3(generations) -> str:
+        buffer = io.StringIO()
+        write_ck3_history(generations, buffer, "Zhu", "chinese", "catholic", True, end_date)
+        return buffer.getvalue()
+
+    expected, got = ck3(dynasty).splitlines(), ck3(imported.generations).splitlines()
+    assert len(got) == len(expected)
+    assert [(n, line) for n, (line, want) in enumerate(zip(got, expected), start=1) if line != want] == []
+    living = [p.is_living_at_end for g in dynasty for p in g]
+    assert [p.is_living_at_end for g in imported.generations for p in g] == living
+
+
+def test_forward_references():
+    """Families may come before the individuals they name."""
+    lines = [
+        "0 HEAD",
+        "0 @F1@ FAM",
+        "1 HUSB @I1@",
+        "1 WIFE @I2@",
+        "1 MARR",
+        "2 DATE 3 MAR 1020",
+        "1 CHIL @I3@",
+        "0 @I1@ INDI",
+        "1 NAME Li /Wang/",
+        "1 SEX M",
+        "1 BIRT",
+        "2 DATE ABT 1000",
+        "1 NOTE Age at death: 60 years",
+        "0 @I2@ INDI",
+        "1 NAME Mei /Wang/",
+        "2 _MARNM Wang",
+        "1 SEX F",
+        "0 @I3@ INDI",
+        "1 NAME Bo /Wang/",
+        "1 SEX M",
+        "1 BIRT",
+        "2 DATE 15 SEP 1022",
+        "0 TRLR",
+    ]
+    imported = read_gedcom(lines)
+    father, wife, child = (imported.people[x] for x in ("@I1@", "@I2@", "@I3@"))
+    assert imported.generations == [[father], [child]]
+    assert father.spouse is wife and wife.spouse is father
+    assert father.children == [child] and child.mother is wife
+    assert father.date_of_marriage == date_to_day(1020, 3, 3)
+    assert (father.birth_year, father.date_of_birth, father.death_year) == (1000, None, 1060)
+    assert wife.dynasty_name is None and child.dynasty_name == "Wang"
+    assert child.date_of_birth == date_to_day(1022, 9, 15)
+
+
+def test_dates():
+    assert parse_gedcom_date("15 SEP 1066") == (1066, date_to_day(1066, 9, 15))
+    assert parse_gedcom_date("ABT 1100") == (1100, None)
+    assert parse_gedcom_date("") == (None, None)
+
+
+def test_bad_input():
+    with pytest.raises(ValueError, match="level number"):
+        read_gedcom(["0 HEAD", "x NAME"])
+    with pytest.raises(ValueError, match="@I9@"):
+        read_gedcom(["0 @F1@ FAM", "1 HUSB @I9@"])
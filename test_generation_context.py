@@ -0,0 +1,55 @@
+"""
+Test the shared per-run generation context.
+"""
+
+import random
+
+from config.mortality_config import NormalMortalityConfig
+from config.fertility_config import NormalFertilityConfig
+from config.sim_config import SimConfig
+from config.other_constants import convert_calendar_years_to_days
+from services.compiled_config import MORTALITY_DEFAULT, MORTALITY_MAINLINE, MORTALITY_NON_MAINLINE
+from services.generation_context import GenerationContext
+from strategies.gen_children import gen_children_normal
+
+
+def _context(seed: int) -> GenerationContext:
+    return GenerationContext.create(
+        cfg=SimConfig(mortality=NormalMortalityConfig(), fertility=NormalFertilityConfig()),
+        end_date=convert_calendar_years_to_days(1300),
+        rng=random.Random(seed),
+        dynasty_name="Zhu",
+    )
+
+
+def test_context_shares_factories_and_names():
+    """One factory per mortality profile, all sharing the context's RNG and names."""
+    ctx = _context(1)
+    assert set(ctx.factories) == {MORTALITY_DEFAULT, MORTALITY_MAINLINE, MORTALITY_NON_MAINLINE}
+    for factory in list(ctx.factories.values()) + [ctx.wife_factory]:
+        assert factory.rng is ctx.rng
+        assert factory.name_provider is ctx.name_provider
+    assert ctx.factory(MORTALITY_MAINLINE).cfg.mortality.early_probability == 0.0
+    assert ctx.wife_factory.dynasty_name is None
+    print("✓ Generation context builds its factories once")
+
+
+def test_strategies_reuse_context_factories():
+    """Strategies create people through the context and reuse it across families."""
+    ctx = _context(2)
+    total = 0
+    for _ in range(20):
+        father = ctx.factory().create_male(birth_date=convert_calendar_years_to_days(1200), end_date=ctx.end_date)
+        children = gen_children_normal(ctx=ctx, father=father)
+        assert father.spouse is not None and father.spouse.dynasty_name is None
+        for child in children:
+            assert child.father is father and child.mother is father.spouse
+            assert child.dynasty_name == "Zhu"
+        total += len(children)
+    assert total > 0
+    print(f"✓ Strategies generated {total} children from one context")
+
+
+if __name__ == "__main__":
+    test_context_shares_factories_and_names()
+    test_strategies_reuse_context_factories()
@@ -0,0 +1,78 @@
+"""
+Test the opt-in timing and counter instrumentation.
+"""
+
+import json
+import os
+import random
+import tempfile
+
+from services import instrumentation
+from services.dynasty_metrics import calculate_dynasty_stats
+from services.simulation import generate_dynasty
+from exporters.export_to_gedcom import export_to_gedcom
+from config.mortality_config import GenerousMortalityConfig
+from config.fertility_config import GenerousFertilityConfig
+from config.sim_config import SimConfig
+from config.other_constants import convert_calendar_years_to_days
+
+
+END_DATE = convert_calendar_years_to_days(1200)
+
+
+def _generate():
+    return generate_dynasty(
+        birth_year=1000,
+        male_only_start_date=convert_calendar_years_to_days(1030),
+        normal_start_date=convert_calendar_years_to_days(1060),
+        end_date=END_DATE,
+        cfg=SimConfig(mortality=GenerousMortalityConfig(), fertility=GenerousFertilityConfig()),
+        rng=random.Random(3),
+        dynasty_name="Zhu",
+    )
+
+
+def test_disabled_records_nothing():
+    """With instrumentation off, generation leaves no stages or counters behind."""
+    instrumentation.disable()
+    instrumentation.reset()
+    _generate()
+    assert instrumentation.report() == {"stages": {}, "counters": {}}
+    print("✓ Disabled instrumentation records nothing")
+
+
+def test_enabled_records_pipeline():
+    """Stages and counters cover generation, strategies, sampling, stats and export."""
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        dynasty = _generate()
+        calculate_dynasty_stats(dynasty, END_DATE)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.ged")
+            export_to_gedcom(dynasty, path, end_year=1200, dynasty_name="Zhu")
+            size = os.path.getsize(path)
+            json_path = os.path.join(tmp, "profile.json")
+            instrumentation.save(json_path)
+            with open(json_path, encoding="utf-8") as f:
+                saved = json.load(f)
+    finally:
+        instrumentation.disable()
+
+    report = instrumentation.report()
+    assert saved == report
+    stages = report["stages"]
+    assert stages["generate_dynasty"]["calls"] == 1
+    for name in ("strategy.mainline", "strategy.normal", "draw_children_birth_years_exact_k", "calculate_dynasty_stats", "export_to_gedcom"):
+        assert stages[name]["calls"] > 0 and stages[name]["wall_seconds"] >= 0.0
+    assert report["counters"]["persons_created"] >= sum(map(len, dynasty))
+    assert report["counters"]["exact_k.samples"] == stages["draw_children_birth_years_exact_k"]["calls"]
+    assert report["counters"]["export.gedcom_bytes_written"] == size
+    assert "generate_dynasty" in instrumentation.format_report()
+    instrumentation.reset()
+    print("✓ Enabled instrumentation covers the pipeline")
+
+
+if __name__ == "__main__":
+    test_disabled_records_nothing()
+    test_enabled_records_pipeline()
@@ -0,0 +1,72 @@
+"""
+Test the streaming generation-by-generation dynasty iterator.
+"""
+
+import random
+
+from services.simulation import generate_dynasty, iter_dynasty
+from config.mortality_config import GenerousMortalityConfig
+from config.fertility_config import GenerousFertilityConfig
+from config.sim_config import SimConfig
+from config.other_constants import convert_calendar_years_to_days
+
+
+KWARGS = dict(
+    birth_year=1000,
+    male_only_start_date=convert_calendar_years_to_days(1030),
+    normal_start_date=convert_calendar_years_to_days(1060),
+    end_date=convert_calendar_years_to_days(1200),
+    cfg=SimConfig(mortality=GenerousMortalityConfig(), fertility=GenerousFertilityConfig()),
+    dynasty_name="Zhu",
+)
+
+
+def _shape(dynasty):
+    return [[(p.given_name, p.date_of_birth, p.date_of_death, len(p.children)) for p in gen] for gen in dynasty]
+
+
+def test_iterator_matches_generate_dynasty():
+    """Streaming yields the same generations as generate_dynasty for a seed."""
+    full = generate_dynasty(rng=random.Random(2), **KWARGS)
+    streamed = list(iter_dynasty(rng=random.Random(2), **KWARGS))
+    assert _shape(streamed) == _shape(full)
+    print(f"✓ iter_dynasty matches generate_dynasty over {len(full)} generations")
+
+
+def test_yielded_generations_are_finished():
+    """Each yielded generation already has its children attached."""
+    previous = None
+    for generation in iter_dynasty(rng=random.Random(3), **KWARGS):
+        if previous is not None:
+            assert [c for p in previous for c in p.children] == generation
+        previous = generation
+    print("✓ Yielded generations are finished")
+
+
+def test_release_ancestors_drops_parent_links():
+    """With release_ancestors, generations already passed lose their parent links."""
+    generations = []
+    for generation in iter_dynasty(rng=random.Random(3), release_ancestors=True, **KWARGS):
+        # Links are intact while the generation is being consumed
+        assert all(p.father is not None for p in generation) or not generations
+        generations.append(generation)
+
+    assert len(generations) > 3
+    for generation in generations[:-1]:
+        assert all(p.father is None and p.mother is None for p in generation)
+    print("✓ release_ancestors unlinks consumed generations")
+
+
+def test_max_generations_limits_expansion():
+    """max_generations stops expansion like generate_dynasty's cap."""
+    limited = list(iter_dynasty(rng=random.Random(3), max_generations=2, **KWARGS))
+    assert len(limited) <= 3
+    assert all(not p.children for p in limited[-1])
+    print("✓ max_generations caps the iterator")
+
+
+if __name__ == "__main__":
+    test_iterator_matches_generate_dynasty()
+    test_yielded_generations_are_finished()
+    test_release_ancestors_drops_parent_links()
+    test_max_generations_limits_expansion()
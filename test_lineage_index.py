@@ -0,0 +1,110 @@
+"""
+Test the Euler-tour lineage index.
+"""
+
+import random
+
+from models.person import Person
+from services.lineage_index import LineageIndex
+from services.simulation import generate_dynasty
+from config.mortality_config import GenerousMortalityConfig
+from config.fertility_config import GenerousFertilityConfig
+from config.sim_config import SimConfig
+from config.other_constants import convert_calendar_years_to_days
+
+
+def _dynasty(seed: int):
+    return generate_dynasty(
+        birth_year=1000,
+        male_only_start_date=convert_calendar_years_to_days(1030),
+        normal_start_date=convert_calendar_years_to_days(1060),
+        end_date=convert_calendar_years_to_days(1200),
+        cfg=SimConfig(mortality=GenerousMortalityConfig(), fertility=GenerousFertilityConfig()),
+        rng=random.Random(seed),
+        dynasty_name="Zhu",
+    )
+
+
+def _ancestors(person):
+    found = []
+    while person.father is not None:
+        person = person.father
+        found.append(person)
+    return found
+
+
+def _person(name, female=False, father=None):
+    person = Person(given_name=name, female=female, birth_year=0, death_year=60, is_living_at_end=False, father=father)
+    if father is not None:
+        father.children = list(father.children) + [person]
+    return person
+
+
+def test_queries_match_parent_walks():
+    """Ancestor, LCA and k-th ancestor queries agree with walking father links."""
+    dynasty = _dynasty(3)
+    index = LineageIndex(dynasty)
+    people = index.people
+    rng = random.Random(0)
+    for _ in range(500):
+        a, b = rng.choice(people), rng.choice(people)
+        chain_a, chain_b = [a] + _ancestors(a), [b] + _ancestors(b)
+        assert index.is_ancestor(a, b) == (a is not b and any(p is a for p in chain_b))
+        common = next(p for p in chain_a if any(p is q for q in chain_b))
+        assert index.lowest_common_ancestor(a, b) is common
+        for k, ancestor in enumerate(chain_a):
+            assert index.kth_ancestor(a, k) is ancestor
+        assert index.kth_ancestor(a, len(chain_a)) is None
+    print(f"✓ Lineage queries match father walks over {len(index)} members")
+
+
+def test_descendants_alive_on_day():
+    """Subtree slices hold exactly the descendants; the day filter uses birth and death days."""
+    dynasty = _dynasty(3)
+    index = LineageIndex(dynasty)
+    founder = dynasty[0][0]
+    assert index.descendant_count(founder) == len(index) - 1
+    day = convert_calendar_years_to_days(1150)
+    expected = [p for p in index.people[1:] if p.date_of_birth <= day < p.date_of_death]
+    assert sorted(map(id, index.descendants_alive_on(founder, day))) == sorted(map(id, expected))
+    assert index.person(1) is founder and index.number(founder) == 1
+    print("✓ Living descendants found through the Euler interval")
+
+
+def test_relationship_names():
+    """Relationships are named from the first person's point of view."""
+    root = _person("Root")
+    a, b = _person("A", father=root), _person("B", female=True, father=root)
+    a1, b1 = _person("A1", father=a), _person("B1", female=True, father=b)
+    a2 = _person("A2", father=a1)
+    stranger = _person("Stranger")
+    index = LineageIndex([[root, stranger], [a, b], [a1, b1], [a2]])
+
+    assert index.relationship(root, a2).describe() == "great-grandfather"
+    assert index.relationship(a2, a).describe() == "grandson"
+    assert index.relationship(b, a).describe() == "sister"
+    assert index.relationship(b, a1).describe() == "aunt"
+    assert index.relationship(a1, b1).describe() == "1st cousin"
+    assert index.relationship(a2, b1).describe() == "1st cousin once removed"
+    assert index.relationship(b1, a2).degree == 5
+    assert index.relationship(a2, stranger).describe() == "unrelated"
+    print("✓ Relationships are described correctly")
+
+
+def test_deep_line_is_indexed_iteratively():
+    """A line deeper than the recursion limit is indexed and queried."""
+    line = [_person("Founder")]
+    for i in range(3000):
+        line.append(_person(f"Heir {i}", father=line[-1]))
+    index = LineageIndex([[p] for p in line])
+    assert index.is_ancestor(line[0], line[-1])
+    assert index.kth_ancestor(line[-1], 2999) is line[1]
+    assert index.relationship(line[-1], line[0]).describe() == "great-" * 2998 + "grandson"
+    print("✓ Deep lines are indexed without recursion")
+
+
+if __name__ == "__main__":
+    test_queries_match_parent_walks()
+    test_descendants_alive_on_day()
+    test_relationship_names()
+    test_deep_line_is_indexed_iteratively()
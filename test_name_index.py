@@ -0,0 +1,67 @@
+"""
+Test the compiled name lists and culture discovery.
+"""
+
+import os
+import pickle
+import random
+
+import pytest
+
+from services.name_index import CACHE_DIRNAME, open_name_list
+from services.name_manager import NameManager
+
+
+def _write(path, names):
+    path.write_text("\n".join(names) + "\n", encoding="utf-8")
+
+
+def test_compiled_list_matches_lines():
+    """The compiled list holds the file's names and draws the same names for a seed."""
+    source = os.path.join(os.path.dirname(__file__), "namelists", "han_names_male.txt")
+    with open(source, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    names = open_name_list(source)
+    assert len(names) == len(lines)
+    assert list(names) == lines
+    assert names[-1] == lines[-1] and names[2:5] == lines[2:5]
+
+    a, b = random.Random(7), random.Random(7)
+    assert [a.choice(names) for _ in range(200)] == [b.choice(lines) for _ in range(200)]
+    assert list(pickle.loads(pickle.dumps(names))) == lines
+    with pytest.raises(IndexError):
+        names[len(lines)]
+
+
+def test_compiled_list_is_rebuilt_when_source_changes(tmp_path):
+    source = tmp_path / "norse_names_male.txt"
+    _write(source, ["Bjorn", "", "  Ulf  "])
+    names = open_name_list(str(source))
+    assert list(names) == ["Bjorn", "Ulf"]
+    assert (tmp_path / CACHE_DIRNAME / "norse_names_male.txt.idx").exists()
+
+    _write(source, ["Bjorn", "Ulf", "Sigurd", "Ragnvald"])
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert list(open_name_list(str(source))) == ["Bjorn", "Ulf", "Sigurd", "Ragnvald"]
+
+
+def test_cultures_are_discovered(tmp_path):
+    """Cultures come from the files present; a CK3 culture code prefix maps to its culture."""
+    NameManager.reset()
+    try:
+        assert NameManager.get_available_cultures() == ["chinese"]
+
+        _write(tmp_path / "han_names_male.txt", ["Li"])
+        _write(tmp_path / "han_names_female.txt", ["Mei"])
+        _write(tmp_path / "norse_names_male.txt", ["Bjorn"])
+        _write(tmp_path / "norse_names_female.txt", ["Astrid"])
+        _write(tmp_path / "french_names_male.txt", ["Louis"])
+        assert NameManager.get_available_cultures(str(tmp_path)) == ["chinese", "norse"]
+
+        provider = NameManager.load_culture("norse", base_path=str(tmp_path))
+        assert provider.get_random_female_name(random.Random(1)) == "Astrid"
+        with pytest.raises(FileNotFoundError, match="french"):
+            NameManager.load_culture("french", base_path=str(tmp_path))
+    finally:
+        NameManager.reset()
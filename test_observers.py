@@ -0,0 +1,82 @@
+"""
+Test generation observers and the online stats accumulator.
+"""
+
+import random
+
+from services.dynasty_metrics import calculate_dynasty_stats
+from services.observers import DynastyObserver, StatsAccumulator
+from services.simulation import generate_dynasty, iter_dynasty
+from config.mortality_config import GenerousMortalityConfig, NormalMortalityConfig
+from config.fertility_config import GenerousFertilityConfig, NormalFertilityConfig
+from config.sim_config import SimConfig
+from config.other_constants import convert_calendar_years_to_days
+
+
+END_DATE = convert_calendar_years_to_days(1200)
+KWARGS = dict(
+    birth_year=1000,
+    male_only_start_date=convert_calendar_years_to_days(1030),
+    normal_start_date=convert_calendar_years_to_days(1060),
+    end_date=END_DATE,
+    dynasty_name="Zhu",
+)
+CONFIGS = [
+    SimConfig(mortality=GenerousMortalityConfig(), fertility=GenerousFertilityConfig()),
+    SimConfig(mortality=NormalMortalityConfig(), fertility=NormalFertilityConfig()),
+]
+
+
+class Recorder(DynastyObserver):
+    def __init__(self):
+        self.people = []
+        self.generations = []
+
+    def on_person(self, person, generation, member=True):
+        self.people.append((generation, person.given_name, member))
+
+    def on_generation(self, generation, people):
+        self.generations.append((generation, len(people)))
+
+
+def test_accumulator_matches_calculate_dynasty_stats():
+    """Online stats equal the two-pass stats for the same dynasty."""
+    for cfg in CONFIGS:
+        for seed in range(6):
+            accumulator = StatsAccumulator(END_DATE)
+            dynasty = generate_dynasty(cfg=cfg, rng=random.Random(seed), observers=[accumulator], **KWARGS)
+            assert accumulator.result() == calculate_dynasty_stats(dynasty, END_DATE)
+    print("✓ Accumulated stats match calculate_dynasty_stats")
+
+
+def test_accumulator_works_with_released_ancestors():
+    """Stats are complete even when nothing keeps the dynasty alive."""
+    expected = calculate_dynasty_stats(generate_dynasty(cfg=CONFIGS[0], rng=random.Random(3), **KWARGS), END_DATE)
+    accumulator = StatsAccumulator(END_DATE)
+    for _ in iter_dynasty(cfg=CONFIGS[0], rng=random.Random(3), release_ancestors=True, max_generations=1000,
+                          observers=[accumulator], **KWARGS):
+        pass
+    assert accumulator.result() == expected
+    print("✓ Accumulator works with release_ancestors")
+
+
+def test_observer_sees_every_person_once():
+    """on_person fires for every member and their spouse, then on_generation once per generation."""
+    recorder = Recorder()
+    dynasty = generate_dynasty(cfg=CONFIGS[0], rng=random.Random(3), observers=[recorder], **KWARGS)
+    assert recorder.generations == [(i, len(gen)) for i, gen in enumerate(dynasty)]
+    expected = []
+    for i, gen in enumerate(dynasty):
+        for p in gen:
+            expected.append((i, p.given_name, True))
+            if p.spouse is not None:
+                expected.append((i, p.spouse.given_name, False))
+    assert recorder.people == expected
+    assert any(not member for _, _, member in recorder.people)
+    print(f"✓ Observer saw {len(recorder.people)} people")
+
+
+if __name__ == "__main__":
+    test_accumulator_matches_calculate_dynasty_stats()
+    test_accumulator_works_with_released_ancestors()
+    test_observer_sees_every_person_once()
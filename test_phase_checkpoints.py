@@ -0,0 +1,110 @@
+"""
+Test phase checkpoints and rerolling later strategy phases.
+"""
+
+import random
+
+from services.simulation import (
+    PHASE_MAINLINE,
+    PHASE_MALE_ONLY,
+    PHASE_NORMAL,
+    generate_dynasty,
+    generate_dynasty_run,
+    phase_of,
+    reroll_phase,
+)
+from config.mortality_config import GenerousMortalityConfig
+from config.fertility_config import GenerousFertilityConfig
+from config.sim_config import SimConfig
+from config.other_constants import convert_calendar_years_to_days
+
+
+KWARGS = dict(
+    birth_year=1000,
+    male_only_start_date=convert_calendar_years_to_days(1030),
+    normal_start_date=convert_calendar_years_to_days(1060),
+    end_date=convert_calendar_years_to_days(1200),
+    cfg=SimConfig(mortality=GenerousMortalityConfig(), fertility=GenerousFertilityConfig()),
+    dynasty_name="Zhu",
+)
+
+
+def _shape(dynasty):
+    return [[(p.given_name, p.date_of_birth, p.date_of_death, len(p.children)) for p in gen] for gen in dynasty]
+
+
+def _people_of_phases(run, phases):
+    """Everyone whose father was expanded by one of the given phases."""
+    return [
+        (p.given_name, p.date_of_birth)
+        for gen in run.generations[1:]
+        for p in gen
+        if phase_of(p.father, run.male_only_start_date, run.normal_start_date) in phases
+    ]
+
+
+def test_run_matches_generate_dynasty():
+    """generate_dynasty_run builds the same dynasty as generate_dynasty for a seed."""
+    run = generate_dynasty_run(rng=random.Random(3), **KWARGS)
+    assert _shape(run.generations) == _shape(generate_dynasty(rng=random.Random(3), **KWARGS))
+    assert run.founder is run.generations[0][0]
+    print(f"✓ Run matches generate_dynasty over {len(run.generations)} generations")
+
+
+def test_reroll_with_same_seeds_replays_phase():
+    """Rerolling a phase from its own checkpoint seed reproduces the dynasty."""
+    expected = _shape(generate_dynasty(rng=random.Random(3), **KWARGS))
+    run = generate_dynasty_run(rng=random.Random(3), **KWARGS)
+    replayed = reroll_phase(run, PHASE_MALE_ONLY, phase_seeds=run.phase_seeds)
+    assert _shape(replayed.generations) == expected
+    print("✓ Replaying from a checkpoint reproduces the dynasty")
+
+
+def test_reroll_keeps_earlier_phases():
+    """Rerolling the normal phase keeps every person made by the earlier phases."""
+    run = generate_dynasty_run(rng=random.Random(3), **KWARGS)
+    kept = _people_of_phases(run, (PHASE_MAINLINE, PHASE_MALE_ONLY))
+    old_seeds = dict(run.phase_seeds)
+
+    rerolled = reroll_phase(run, PHASE_NORMAL, rng=random.Random(99))
+    assert rerolled.founder is run.founder
+    assert _people_of_phases(rerolled, (PHASE_MAINLINE, PHASE_MALE_ONLY)) == kept
+    assert rerolled.phase_seeds[PHASE_MAINLINE] == old_seeds[PHASE_MAINLINE]
+    assert rerolled.phase_seeds[PHASE_MALE_ONLY] == old_seeds[PHASE_MALE_ONLY]
+    assert rerolled.phase_seeds[PHASE_NORMAL] != old_seeds[PHASE_NORMAL]
+
+    # Links in the rerolled tree are consistent
+    for gen, next_gen in zip(rerolled.generations, rerolled.generations[1:]):
+        assert [c for p in gen for c in p.children] == next_gen
+        assert all(c.father in gen for c in next_gen)
+    print("✓ Rerolling the normal phase keeps the mainline and male-only people")
+
+
+def test_reroll_matches_fresh_run_with_same_seeds():
+    """A reroll is the dynasty a fresh run would give with the new phase seeds."""
+    run = generate_dynasty_run(rng=random.Random(3), **KWARGS)
+    rerolled = reroll_phase(run, PHASE_MALE_ONLY, rng=random.Random(7))
+
+    fresh = generate_dynasty_run(rng=random.Random(3), **KWARGS)
+    fresh = reroll_phase(fresh, PHASE_MAINLINE, phase_seeds=rerolled.phase_seeds)
+    assert _shape(fresh.generations) == _shape(rerolled.generations)
+    print("✓ Reroll equals a fresh run with the same phase seeds")
+
+
+def test_reroll_rejects_unknown_phase():
+    """Unknown phase names are rejected."""
+    run = generate_dynasty_run(rng=random.Random(3), **KWARGS)
+    try:
+        reroll_phase(run, "feudal")
+    except ValueError:
+        print("✓ Unknown phase rejected")
+    else:
+        raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    test_run_matches_generate_dynasty()
+    test_reroll_with_same_seeds_replays_phase()
+    test_reroll_keeps_earlier_phases()
+    test_reroll_matches_fresh_run_with_same_seeds()
+    test_reroll_rejects_unknown_phase()
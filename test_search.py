@@ -0,0 +1,71 @@
+"""
+Test the parallel dynasty search.
+"""
+
+from services.ensemble import DynastyParams, derive_seed, generate_dynasty_from_seed
+from services.search import DynastyCriteria, SearchBudget, find_dynasty
+from config.mortality_config import NormalMortalityConfig
+from config.fertility_config import NormalFertilityConfig
+from config.sim_config import SimConfig
+from config.other_constants import DAYS_IN_YEAR, convert_calendar_years_to_days
+
+
+CFG = SimConfig(
+    mortality=NormalMortalityConfig(),
+    fertility=NormalFertilityConfig(),
+)
+PARAMS = DynastyParams(
+    birth_year=1000,
+    male_only_start_date=convert_calendar_years_to_days(1100),
+    normal_start_date=convert_calendar_years_to_days(1150),
+    end_date=convert_calendar_years_to_days(1230),
+    dynasty_name="Zhu",
+)
+
+
+def test_search_finds_same_match_with_any_worker_count():
+    """The first match depends only on the master seed, and it is regenerated from its seed."""
+    criteria = DynastyCriteria(min_playable_males=15, min_surviving_branches=4)
+    serial = find_dynasty(criteria, SearchBudget(max_candidates=200), cfg=CFG, params=PARAMS, seed=5, workers=1)
+    pooled = find_dynasty(criteria, SearchBudget(max_candidates=200), cfg=CFG, params=PARAMS, seed=5, workers=2, batch_size=3)
+
+    assert serial.matched and pooled.matched
+    assert serial.best == pooled.best
+    assert serial.best.seed == derive_seed(5, serial.best.index)
+    assert criteria.measure(serial.dynasty, PARAMS.end_date, CFG.playable_character_age_max) == serial.best.measures
+    assert 0.0 < serial.acceptance_rate <= 1.0
+    print(f"✓ Search matched candidate {serial.best.index} with 1 and 2 workers")
+
+
+def test_search_returns_closest_when_budget_runs_out():
+    """An unreachable target exhausts the budget and returns the closest candidate."""
+    criteria = DynastyCriteria(min_total_people=100_000)
+    result = find_dynasty(criteria, SearchBudget(max_candidates=6), cfg=CFG, params=PARAMS, seed=1, workers=1)
+
+    assert not result.matched
+    assert result.candidates == 6 and result.accepted == 0
+    assert result.stopped_by == "candidates"
+    sizes = [sum(len(g) for g in generate_dynasty_from_seed(CFG, PARAMS, derive_seed(1, i))) for i in range(6)]
+    assert result.best.measures["total_people"] == max(sizes)
+    print(f"✓ Search fell back to the largest of {result.candidates} candidates")
+
+
+
+def test_playable_males_exclude_older_men():
+    """Only living men under the playable age limit at the end date count."""
+    dynasty = generate_dynasty_from_seed(CFG, PARAMS, derive_seed(5, 2))
+    end_date = PARAMS.end_date
+    living = [p for g in dynasty for p in g if not p.female and p.is_living_at_end]
+    young = [p for p in living if end_date - p.date_of_birth < 30 * DAYS_IN_YEAR]
+    assert 0 < len(young) < len(living)
+
+    criteria = DynastyCriteria()
+    assert criteria.measure(dynasty, end_date)["playable_males"] == len(young)
+    assert criteria.measure(dynasty, end_date, playable_age_max=200)["playable_males"] == len(living)
+    print(f"✓ {len(young)} of {len(living)} living men are playable")
+
+
+if __name__ == "__main__":
+    test_search_finds_same_match_with_any_worker_count()
+    test_search_returns_closest_when_budget_runs_out()
+    test_playable_males_exclude_older_men()
@@ -0,0 +1,81 @@
+"""
+Test binary dynasty snapshots.
+"""
+
+import io
+import os
+import random
+import tempfile
+
+import pytest
+
+from exporters.export_to_ck3 import write_ck3_history
+from services.dynasty_metrics import calculate_dynasty_stats
+from services.ensemble import DynastyParams
+from services.simulation import generate_dynasty
+from services.snapshot import load_snapshot, save_snapshot
+from test_iter_dynasty import KWARGS
+
+END_DATE = KWARGS["end_date"]
+PARAMS = DynastyParams(
+    birth_year=KWARGS["birth_year"],
+    male_only_start_date=KWARGS["male_only_start_date"],
+    normal_start_date=KWARGS["normal_start_date"],
+    end_date=END_DATE,
+    dynasty_name="Zhu",
+)
+
+
+def _ck3(dynasty):
+    buffer = io.StringIO()
+    write_ck3_history(dynasty, buffer, "Zhu", "chinese", "jingxue", True, END_DATE)
+    return buffer.getvalue()
+
+
+def test_snapshot_round_trip():
+    """A loaded snapshot exports and measures like the dynasty it was saved from."""
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "zhu.snap")
+        save_snapshot(dynasty, path, cfg=KWARGS["cfg"], params=PARAMS, seed=3)
+
+        with load_snapshot(path) as snapshot:
+            assert snapshot.seed == 3
+            assert snapshot.params == PARAMS
+            assert snapshot.config == KWARGS["cfg"]
+            assert snapshot.generation_count == len(dynasty)
+            loaded = snapshot.generations()
+            assert [[p.name for p in g] for g in loaded] == [[p.name for p in g] for g in dynasty]
+            assert _ck3(loaded) == _ck3(dynasty)
+            assert calculate_dynasty_stats(loaded, END_DATE) == calculate_dynasty_stats(dynasty, END_DATE)
+            with pytest.raises(TypeError):
+                loaded[0][0].birth_year = 1
+    print(f"✓ round trip of {sum(len(g) for g in dynasty)} members")
+
+
+def test_regenerate_from_snapshot_metadata():
+    """The stored config, parameters and seed reproduce the dynasty."""
+    dynasty = generate_dynasty(rng=random.Random(3), **KWARGS)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "zhu.snap")
+        save_snapshot(dynasty, path, cfg=KWARGS["cfg"], params=PARAMS, seed=3)
+        with load_snapshot(path) as snapshot:
+            regenerated = generate_dynasty(
+                birth_year=snapshot.params.birth_year,
+                male_only_start_date=snapshot.params.male_only_start_date,
+                normal_start_date=snapshot.params.normal_start_date,
+                end_date=snapshot.params.end_date,
+                cfg=snapshot.config,
+                rng=random.Random(snapshot.seed),
+                dynasty_name=snapshot.params.dynasty_name,
+            )
+            assert _ck3(regenerated) == _ck3(snapshot.generations())
+
+
+def test_rejects_other_files():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "not.snap")
+        with open(path, "w") as f:
+            f.write("0 HEAD\n")
+        with pytest.raises(ValueError):
+            load_snapshot(path)